@@ -5,37 +5,106 @@
 The aim is to have isolated modules that contain both fortran and python code.
 Each module should be able to compile and run tests in isolation.
 
-This file scans each module for fortran files and builds the module.
-
-# TODO: What is the best way of flagging a directory for fortan compiling
-# TODO: What is the best way of identifying which files are python interfaces
+This file scans src for compile_map.json files and builds each module they describe.
+The `use` statements in the sources form a dependency graph between translation units.
+Independent units and modules are compiled concurrently on a worker pool.
+
+compile_map.json
+----------------
+mod_name: python module name
+libraries: fortran sources compiled to objects
+py_interface_files: fortran sources that get a python interface
+wrapper: "f2py" (default) or "f90wrap" for modules that use derived types
+f90flags: extra gfortran flags
+link_libraries: extra libraries to link against
+variants: {python module name: {"defines": [...]}} to build the module more than once
+    with different preprocessor defines
+
+Sources are compiled with -cpp so they can #include "file" relative to their own
+directory. Included files are part of the build cache key of the source.
+
+Build profiles
+--------------
+`build.py build --profile <name>` selects the optimisation flags from BUILD_PROFILES.
+The same flags are used to compile the objects and the f2py wrappers, and to link.
+Each built module contains a generated `build_info` module whose `build_profile`
+variable names the profile it was built with.
+
+Instrumentation
+---------------
+`build.py build --instrument` defines FORTPY_INSTRUMENT for every target so the
+kernels record call counts, timers and iteration counts (see fortpy.instrumentation).
+`build_info.instrumented` is 1 in modules built this way.
+The default build does not define it and compiles no instrumentation calls.
 
 """
 import click
 import sys
 import shutil
 import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from glob import glob
+from hashlib import sha256
 from warnings import warn
 import subprocess
 
+SRC_ROOT = "src"
+COMPILE_MAP_NAME = "compile_map.json"
 BUILD_DIR_NAME = "_build_dir"
+CACHE_FILE_NAME = "build_cache.json"
 CC = "gcc"
 F90 = "gfortran"
 PYTHON = "python"
 
 FPP = ["gfortran", "-E"]
 FPP_F90FLAGS = ["-x", "f95-cpp-input", "-fPIC"]
-F90FLAGS = ["-fPIC"]
+F90FLAGS = ["-fPIC", "-cpp"]
 FCOMP = "gfortran"
 LIBS = ""
 
-CFLAGS = ["-dPIC"]
-
 # UNAME = "$(shell uname)"
 
 LIBTOOL = ["ar", "src"]
 
 
+BUILD_PROFILES = {
+    # Unoptimised with runtime checks
+    "debug": {
+        "f90flags": ["-O0", "-g", "-fcheck=all", "-fbacktrace"],
+        "ldflags": [],
+    },
+    # Optimised and vectorised for any x86-64 CPU with link time optimisation
+    "release": {
+        "f90flags": ["-O3", "-flto"],
+        "ldflags": ["-flto"],
+    },
+    # release tuned to the CPU of the build machine. Not portable.
+    "native": {
+        "f90flags": ["-O3", "-march=native", "-flto"],
+        "ldflags": ["-flto"],
+    },
+    # native with IEEE semantics relaxed. Results may change and NaN checks are unreliable.
+    "fast-math": {
+        "f90flags": ["-O3", "-march=native", "-flto", "-ffast-math"],
+        "ldflags": ["-flto"],
+    },
+}
+DEFAULT_PROFILE = "release"
+
+# Generated in each build dir and wrapped into every module
+BUILD_INFO_SOURCE = "build_info.f90"
+BUILD_INFO_TEMPLATE = """! Generated by build.py
+module build_info
+    implicit none
+    character(len=16) :: build_profile = "{profile}"
+    integer :: instrumented = {instrumented}
+end module build_info
+"""
+
+
 # ======================================================================
 # PROJECT CONFIG, do not put spaced behind the variables
 # ======================================================================
@@ -43,41 +112,6 @@ LIBTOOL = ["ar", "src"]
 KIND_MAP = "kind_map"
 
 
-# =======================================================================
-#       List all source files required for the project
-# =======================================================================
-
-
-# names (without suffix), f90 sources
-LIBSRC_SOURCES = ["config", "external_state", "model_state", "pipeline"]
-
-# file names
-LIBSRC_FILES = [f"{f}.f90" for f in LIBSRC_SOURCES]
-
-# object files
-LIBSRC_OBJECTS = [f"{f}.o" for f in LIBSRC_SOURCES]
-
-# only used when cleaning up
-LIBSRC_FPP_FILES = [f"{f}.fpp" for f in LIBSRC_SOURCES]
-
-
-# =======================================================================
-#       List all source files that require a Python interface
-# =======================================================================
-
-# names (without suffix), f90 sources
-LIBSRC_WRAP_SOURCES = ["config", "external_state", "model_state", "pipeline"]
-
-# file names
-LIBSRC_WRAP_FILES = [f"{f}.f90" for f in LIBSRC_WRAP_SOURCES]
-
-# object files
-LIBSRC_WRAP_OBJECTS = [f"{f}.o" for f in LIBSRC_WRAP_SOURCES]
-
-# only used when cleaning up
-LIBSRC_WRAP_FPP_FILES = [f"{f}.fpp" for f in LIBSRC_WRAP_SOURCES]
-
-
 # =======================================================================
 #                 Relevant suffixes
 # =======================================================================
@@ -92,59 +126,268 @@ SUFFIXES = [".f90", ".fpp"]
 SRC_DIR = "./"
 
 
-def run_subprocess(cmd, cwd=".", strict=True):
+def run_subprocess(cmd, cwd=".", strict=True, env=None):
+    # Single write per line as commands run on several workers
     try:
-        print("cmd: [" + " ".join(cmd) + "]")
+        print("cmd: [" + " ".join(cmd) + "]\n", end="")
     except TypeError as e:
-        print(cmd)
-    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd) as p:
-        p.wait()
+        print(f"{cmd}\n", end="")
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env) as p:
+        # communicate rather than wait so large compiler output cannot fill the pipe
+        _, stderr = p.communicate()
         if p.returncode != 0:
             warn(f"cmd: [" + " ".join(cmd) +
-                 "] failed {p.stderr.read().decode('utf-8')}")
+                 f"] failed {stderr.decode('utf-8')}")
             if strict:
                 raise Exception("Process Failed")
 
 
-def libsrc_a_files(mod_path, build_dir):
-    print("====== Building libsrc files =====")
-    f90_0_files(mod_path, build_dir)
-    cmd = LIBTOOL + ["libsrc.a"] + LIBSRC_OBJECTS
-    run_subprocess(cmd, cwd=build_dir)
-    # ${LIBTOOL} $@ $?
+def hash_inputs(files, *args):
+    """Hash the contents of files together with any other build inputs (commands, flags)."""
+    h = sha256()
+    for f in files:
+        with open(f, 'rb') as fp:
+            h.update(fp.read())
+    h.update(json.dumps(args).encode('utf-8'))
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Input hashes of each build step stored in the build dir.
+
+    A step is skipped when the hash of its inputs matches the hash stored when it last
+    ran and all of the outputs it produced still exist.
+    """
+
+    def __init__(self, build_dir, enabled=True):
+        self.path = f"{build_dir}/{CACHE_FILE_NAME}"
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+        self.lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def is_fresh(self, step, key):
+        entry = self.entries.get(step)
+        fresh = self.enabled and entry is not None and entry["key"] == key and \
+            all(os.path.exists(f) for f in entry["outputs"])
+        if fresh:
+            print(f"cache hit: {step}\n", end="")
+            self.hits.append(step)
+        else:
+            self.misses.append(step)
+        return fresh
+
+    def store(self, step, key, outputs):
+        # Steps of one module finish on different workers
+        with self.lock:
+            self.entries[step] = {"key": key, "outputs": outputs}
+            # Save after every step so a failed build keeps the steps that finished
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f, indent=1)
+
+    def report(self, name):
+        print(f"====== Build cache {name}: {len(self.hits)} hits, {len(self.misses)} misses =====")
+        if self.misses:
+            print("rebuilt: " + " ".join(self.misses))
+
+
+class BuildTarget:
+    """A python module built from one compile_map.json with one set of defines."""
+
+    def __init__(self, name, mod_name, mod_path, compile_info, defines, profile, use_cache=True,
+                 instrument=False):
+        self.name = name
+        self.mod_name = mod_name
+        self.mod_path = mod_path
+        self.build_dir = f"{mod_path}/{BUILD_DIR_NAME}/{name}"
+        self.wrapper = compile_info.get('wrapper', 'f2py')
+        self.libraries = compile_info['libraries']
+        self.py_interface_files = compile_info['py_interface_files']
+        self.f90flags = compile_info.get('f90flags', [])
+        self.link_libraries = [f"-l{lib}" for lib in compile_info.get('link_libraries', [])]
+        self.instrument = instrument
+        self.defines = [f"-D{d}" for d in defines + (["FORTPY_INSTRUMENT"] if instrument else [])]
+        self.profile = profile
+        self.profile_f90flags = BUILD_PROFILES[profile]["f90flags"]
+        self.profile_ldflags = BUILD_PROFILES[profile]["ldflags"]
+        os.makedirs(self.build_dir, exist_ok=True)
+        shutil.copyfile(KIND_MAP, f"{self.build_dir}/{KIND_MAP}")
+        self.write_build_info()
+        self.cache = BuildCache(self.build_dir, enabled=use_cache)
+
+    def write_build_info(self):
+        build_info = BUILD_INFO_TEMPLATE.format(
+            profile=self.profile, instrumented=int(self.instrument))
+        path = f"{self.build_dir}/{BUILD_INFO_SOURCE}"
+        if os.path.exists(path):
+            with open(path) as f:
+                if f.read() == build_info:
+                    return
+        with open(path, 'w') as f:
+            f.write(build_info)
+
+    @property
+    def object_sources(self):
+        """Sources compiled to objects. f90wrap also needs objects for the interface files."""
+        if self.wrapper == 'f90wrap':
+            return self.libraries + self.py_interface_files + [BUILD_INFO_SOURCE]
+        return self.libraries
+
+    @property
+    def link_env(self):
+        """Environment for the f2py link with the profile link flags added to LDFLAGS."""
+        ldflags = " ".join([os.environ.get("LDFLAGS", "")] + self.profile_ldflags).strip()
+        return {**os.environ, "LDFLAGS": ldflags}
+
+    def source_path(self, source):
+        if source == BUILD_INFO_SOURCE:
+            return f"{self.build_dir}/{source}"
+        return f"{self.mod_path}/{source}"
+
+    def object_file(self, source):
+        return f"{self.build_dir}/{os.path.splitext(source)[0]}.o"
 
 
-def f90_fpp_files(mod_path, build_dir):
-    print("====== Building fpp files =====")
-    for (fin, fout) in zip(LIBSRC_FILES, LIBSRC_FPP_FILES):
-        cmd = FPP + FPP_F90FLAGS + \
-            [f"-J{BUILD_DIR_NAME}"] + [fin] + ["-o"] + [fout]
-        run_subprocess(cmd, cwd=mod_path)
-        shutil.move(f"{mod_path}/{fout}", f"{build_dir}/{fout}")
-        # ${FPP} ${FPP_F90FLAGS} $<  -o $@
-    print("====== ================ =====")
-
-
-def f90_0_files(mod_path, build_dir):
-    print("====== Building o files =====")
-    for f, o in zip(LIBSRC_FILES, LIBSRC_OBJECTS):
-        cmd = [F90] + F90FLAGS + \
-            [f"-J{BUILD_DIR_NAME}"] + ["-c"] + [f] + ["-o"] + [o]
-        run_subprocess(cmd, cwd=mod_path)
-        shutil.move(f"{mod_path}/{o}", f"{build_dir}/{o}")
+def get_fortran_modules():
+    """Find every compile_map.json under SRC_ROOT.
+
+    Returns a list of (mod_name, mod_path, compile_info)
+    """
+    modules = []
+    for dr, _, flist in sorted(os.walk(SRC_ROOT)):
+        if COMPILE_MAP_NAME in flist:
+            with open(f"{dr}/{COMPILE_MAP_NAME}") as compile_map_r:
+                compile_info = json.load(compile_map_r)
+            modules.append((compile_info['mod_name'], dr, compile_info))
+    return modules
+
+
+def get_build_targets(profile=DEFAULT_PROFILE, use_cache=True, instrument=False):
+    targets = []
+    for mod_name, mod_path, compile_info in get_fortran_modules():
+        # Each variant is built as its own python module with its own preprocessor defines
+        # e.g. fewert (single precision) and fewert64 (double precision)
+        variants = compile_info.get('variants', {mod_name: {'defines': []}})
+        for variant_name, variant in variants.items():
+            targets.append(BuildTarget(
+                variant_name, mod_name, mod_path, compile_info, variant['defines'], profile,
+                use_cache, instrument))
+    return targets
+
+
+MODULE_RE = re.compile(r"^\s*module\s+(?!procedure\b)(\w+)", re.IGNORECASE)
+USE_RE = re.compile(r"^\s*use\s*(?:,\s*(\w+)\s*)?(?:::)?\s*(\w+)", re.IGNORECASE)
+INCLUDE_RE = re.compile(r'^\s*#\s*include\s+"([^"]+)"')
+
+
+def get_module_dependencies(source_path):
+    """Return the modules defined and the non intrinsic modules used by a fortran source."""
+    defined = set()
+    used = set()
+    with open(source_path) as f:
+        for line in f:
+            line = line.split('!')[0]
+            m = MODULE_RE.match(line)
+            if m:
+                defined.add(m.group(1).lower())
+            m = USE_RE.match(line)
+            if m and (m.group(1) or '').lower() != 'intrinsic':
+                used.add(m.group(2).lower())
+    return defined, used - defined
+
+
+def source_files(source_path):
+    """The source and every file it #includes, which together decide what it compiles to."""
+    files = [source_path]
+    with open(source_path) as f:
+        for line in f:
+            m = INCLUDE_RE.match(line)
+            if m:
+                files += source_files(f"{os.path.dirname(source_path)}/{m.group(1)}")
+    return files
+
+
+def run_task_graph(tasks, jobs):
+    """Run each task once every task it depends on has finished.
+
+    Parameters
+    ----------
+    tasks: Dict[str, Tuple[Callable, List[str]]]
+        task name -> (function, names of the tasks it depends on)
+    jobs: int
+        number of tasks to run at once
+    """
+    pending = dict(tasks)
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(jobs) as pool:
+        while pending or running:
+            ready = [n for n, (_, deps) in pending.items() if all(d in done for d in deps)]
+            for n in ready:
+                running[pool.submit(pending.pop(n)[0])] = n
+            if not running:
+                raise Exception(f"Dependency cycle between {list(pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for f in finished:
+                n = running.pop(f)
+                f.result()
+                done.add(n)
+
+
+def compile_object(target, source, include_dirs, dep_keys, keys):
+    obj = target.object_file(source)
+    cmd = [F90] + F90FLAGS + target.profile_f90flags + target.f90flags + target.defines + \
+        [f"-I{d}" for d in include_dirs] + \
+        ["-J", target.build_dir, "-c", target.source_path(source), "-o", obj]
+    # Keyed on the objects it uses as a change to them can change their .mod files
+    key = hash_inputs(source_files(target.source_path(source)) + [KIND_MAP],
+                      cmd, [keys[d] for d in dep_keys])
+    keys[f"{target.name}:{source}"] = key
+    if not target.cache.is_fresh(os.path.basename(obj), key):
+        run_subprocess(cmd)
+        target.cache.store(os.path.basename(obj), key, [obj])
     # ${F90} ${F90FLAGS} -c $< -o $@
-    print("====== ================ =====")
 
 
-def c_o_files(mod_path, build_dir):
-    print("====== Building c files =====")
-    cmd = [CC] + CFLAGS + ["-c"] + ["-o"] + LIBSRC_OBJECTS
-    run_subprocess(cmd, cwd=build_dir)
-    # ${CC} ${CFLAGS} -c $< -o $@
-    print("====== ================ =====")
+def libsrc_a_files(target, object_keys):
+    key = hash_inputs([], LIBTOOL, object_keys)
+    if not target.cache.is_fresh("libsrc.a", key):
+        objects = [os.path.basename(target.object_file(f)) for f in target.object_sources]
+        cmd = LIBTOOL + ["libsrc.a"] + objects
+        run_subprocess(cmd, cwd=target.build_dir)
+        target.cache.store("libsrc.a", key, [f"{target.build_dir}/libsrc.a"])
+    # ${LIBTOOL} $@ $?
+    return key
+
+
+def f90_fpp_file(target, source):
+    fout = f"{os.path.splitext(source)[0]}.fpp"
+    cmd = FPP + FPP_F90FLAGS + target.defines + \
+        [target.source_path(source), "-o", f"{target.build_dir}/{fout}"]
+    key = hash_inputs(source_files(target.source_path(source)), cmd)
+    if not target.cache.is_fresh(fout, key):
+        run_subprocess(cmd)
+        target.cache.store(fout, key, [f"{target.build_dir}/{fout}"])
+    # ${FPP} ${FPP_F90FLAGS} $<  -o $@
+
+
+def f2py_interface_file(target, source):
+    # Preprocess the python interface files so f2py sees literal REAL kinds
+    out = f"{target.build_dir}/{source}"
+    cmd = ['gfortran', '-E', '-P', '-cpp'] + target.defines + [f"{target.mod_path}/{source}", '-o', out]
+    key = hash_inputs(source_files(f"{target.mod_path}/{source}"), cmd)
+    if not target.cache.is_fresh(source, key):
+        run_subprocess(cmd)
+        target.cache.store(source, key, [out])
 
 
 def move_compiled_files(mod_name, mod_path, build_dir):
+    """Install the built module into mod_path and return the installed files."""
     so_file = next((f for f in os.listdir(build_dir) if f.endswith('.so')))
     os.makedirs(f"{mod_path}/_{mod_name}", exist_ok=True)
     shutil.move(f"{build_dir}/{so_file}", f"{mod_path}/_{mod_name}/{so_file}")
@@ -163,34 +406,110 @@ def move_compiled_files(mod_name, mod_path, build_dir):
                  "# -----------------#"]
         f.write("\n".join(lines))
 
-    shutil.move(f"{build_dir}/{mod_name}.py", f"{mod_path}/f_{mod_name}.py")
+    # Copied rather than moved so the f90wrap outputs stay in the build cache
+    shutil.copyfile(f"{build_dir}/{mod_name}.py", f"{mod_path}/f_{mod_name}.py")
+    return [f"{mod_path}/_{mod_name}/{so_file}", f"{mod_path}/f_{mod_name}.py"]
 
 
-def build_so_files(mod_name, mod_path, build_dir):
-    print("====== Building so files =====")
-    libsrc_a_files(mod_path, build_dir)
+def build_f90wrap_so_files(target, keys):
+    print(f"====== Building so files {target.name} =====\n", end="")
+    build_dir = target.build_dir
+    mod_name = target.mod_name
+    libsrc_key = libsrc_a_files(target, [keys[f"{target.name}:{f}"] for f in target.object_sources])
 
-    c_o_files(mod_path, build_dir)
-
-    f90_fpp_files(mod_path, build_dir)
     # === Build so file
-    cmd = ["f90wrap", "-m", mod_name] + \
-        LIBSRC_WRAP_FPP_FILES + ["-k", KIND_MAP, "-v"]
-    # f90wrap -m ${PYTHON_MODN} ${LIBSRC_WRAP_FPP_FILES} -k ${KIND_MAP} -v
-    run_subprocess(cmd, cwd=build_dir)
+    wrap_sources = target.object_sources
+    fpp_files = [f"{os.path.splitext(f)[0]}.fpp" for f in wrap_sources]
+    cmd = ["f90wrap", "-m", mod_name] + fpp_files + ["-k", KIND_MAP, "-v"]
+    out_files = [f"f90wrap_{f}" for f in wrap_sources]
+    wrap_key = hash_inputs([f"{build_dir}/{f}" for f in fpp_files] + [KIND_MAP], cmd)
+    if not target.cache.is_fresh("f90wrap", wrap_key):
+        # f90wrap -m ${PYTHON_MODN} ${LIBSRC_WRAP_FPP_FILES} -k ${KIND_MAP} -v
+        run_subprocess(cmd, cwd=build_dir)
+        target.cache.store("f90wrap", wrap_key,
+                           [f"{build_dir}/{f}" for f in out_files + [f"{mod_name}.py"]])
 
-    out_files = [f"f90wrap_{f}" for f in LIBSRC_WRAP_FILES]
     cmd = ["f2py-f90wrap", f"--fcompiler={FCOMP}", "--build-dir",
-           ".", "-c", "-m", f"_{mod_name}", f"-L.", "-lsrc"] + out_files
-    # f2py-f90wrap --fcompiler=gfortran --build-dir . -c -m _pipelinedemo -L. -lsrc f90wrap*.f90
-    run_subprocess(cmd, cwd=build_dir)
-    move_compiled_files(mod_name, mod_path, build_dir)
-
-    # # === Build so pkg file
-    # # TODO: Implement building package file
-    # # f90wrap -m ${PYTHON_MODN}_pkg ${LIBSRC_WRAP_FPP_FILES} -k ${KIND_MAP} -v -P
-    # # f2py-f90wrap --fcompiler=$(FCOMP) --build-dir . -c -m _${PYTHON_MODN}_pkg -L. -lsrc f90wrap*.f90
-    # print("====== ================ =====")
+           ".", "-c", "-m", f"_{mod_name}", f"-L.", "-lsrc",
+           f"--f90flags={' '.join(target.profile_f90flags + target.f90flags)}"] + out_files
+    link_key = hash_inputs([KIND_MAP], cmd, target.profile_ldflags, wrap_key, libsrc_key)
+    if not target.cache.is_fresh("link", link_key):
+        # f2py-f90wrap --fcompiler=gfortran --build-dir . -c -m _pipelinedemo -L. -lsrc f90wrap*.f90
+        run_subprocess(cmd, cwd=build_dir, env=target.link_env)
+        target.cache.store("link", link_key, move_compiled_files(mod_name, target.mod_path, build_dir))
+
+
+def build_f2py_so_files(target, keys):
+    print(f"====== Building so files {target.name} =====\n", end="")
+    objects = [target.object_file(f) for f in target.libraries]
+    py_interface_files = [f"{target.build_dir}/{f}" for f in
+                          target.py_interface_files + [BUILD_INFO_SOURCE]]
+    f2py_flags = [f"--f90flags={' '.join(target.profile_f90flags + target.f90flags)}"]
+    cmd = ['f2py', '-c', '--build-dir', target.build_dir, '--f2cmap', KIND_MAP,
+           f'-I{target.build_dir}'] + f2py_flags + target.link_libraries + \
+        ['-m', target.name] + py_interface_files + objects
+    link_key = hash_inputs(py_interface_files + [KIND_MAP], cmd, target.profile_ldflags,
+                           [keys[f"{target.name}:{f}"] for f in target.libraries])
+    if not target.cache.is_fresh("link", link_key):
+        # f2py skips the link if the module is newer than the interface files, even
+        # when a library object changed, so remove the old module first
+        for so_file in glob(f"{target.name}.*.so"):
+            os.remove(so_file)
+        # The module is written to the current directory
+        run_subprocess(cmd, env=target.link_env)
+        so_file = max(glob(f"{target.name}.*.so"), key=os.path.getmtime)
+        target.cache.store("link", link_key, [so_file])
+
+
+def get_build_tasks(targets):
+    """Build the task graph for all targets.
+
+    Objects depend on the objects that define the modules they use, searching their own
+    target first. Each target's link depends on all of its objects and preprocessed files.
+    """
+    keys = {}
+    module_sources = {}
+    target_sources = {}
+    for target in targets:
+        for source in target.object_sources:
+            defined, used = get_module_dependencies(target.source_path(source))
+            target_sources[(target.name, source)] = used
+            for m in defined:
+                module_sources.setdefault(m, {})[target.name] = (target, source)
+
+    tasks = {}
+    for target in targets:
+        link_deps = []
+        for source in target.object_sources:
+            deps = []
+            # Sorted so the cache key of the object does not depend on set order
+            for m in sorted(target_sources[(target.name, source)]):
+                providers = module_sources.get(m)
+                if not providers:
+                    continue  # intrinsic or external module e.g. omp_lib
+                dep_target, dep_source = providers.get(target.name, next(iter(providers.values())))
+                deps.append((dep_target, dep_source))
+            include_dirs = sorted({t.build_dir for t, _ in deps if t is not target})
+            dep_names = [f"{t.name}:{s}" for t, s in deps]
+            task_name = f"{target.name}:{source}"
+            tasks[task_name] = (
+                lambda t=target, s=source, i=include_dirs, d=dep_names:
+                    compile_object(t, s, i, d, keys),
+                dep_names)
+            link_deps.append(task_name)
+
+        if target.wrapper == 'f90wrap':
+            preprocess, build_so_files = f90_fpp_file, build_f90wrap_so_files
+            preprocess_sources = target.object_sources
+        else:
+            preprocess, build_so_files = f2py_interface_file, build_f2py_so_files
+            preprocess_sources = target.py_interface_files
+        for source in preprocess_sources:
+            task_name = f"{target.name}:preprocess:{source}"
+            tasks[task_name] = (lambda t=target, s=source, p=preprocess: p(t, s), [])
+            link_deps.append(task_name)
+        tasks[f"{target.name}:link"] = (lambda t=target, b=build_so_files: b(t, keys), link_deps)
+    return tasks
 
 
 @click.group()
@@ -198,21 +517,29 @@ def cli():
     pass
 
 
-def get_fortran_modules():
-    return [("pipeline", "src/pipeline")]
-
-
 @cli.command()
 @click.option("--cleanup", default=False, help="Cleanup build dir after build.")
+@click.option("--no-cache", is_flag=True, default=False,
+              help="Rebuild every step, ignoring the build cache.")
+@click.option("--jobs", "-j", default=os.cpu_count(), help="Number of parallel build jobs.")
+@click.option("--profile", type=click.Choice(list(BUILD_PROFILES)), default=DEFAULT_PROFILE,
+              help="Compiler optimisation profile.")
+@click.option("--instrument", is_flag=True, default=False,
+              help="Record kernel call counts, timers and iteration counts (FORTPY_INSTRUMENT).")
 def build(
     cleanup=False,
+    no_cache=False,
+    jobs=None,
+    profile=DEFAULT_PROFILE,
+    instrument=False,
 ):
-    f_module_paths = get_fortran_modules()
-    for (mod_name, mod_path) in f_module_paths:
-        build_dir = f"{mod_path}/{BUILD_DIR_NAME}"
-        os.makedirs(build_dir, exist_ok=True)
-        shutil.copyfile(KIND_MAP, f"{build_dir}/{KIND_MAP}")
-        build_so_files(mod_name, mod_path, build_dir)
+    print(f"====== Build profile {profile}: {' '.join(BUILD_PROFILES[profile]['f90flags'])} =====")
+    if instrument:
+        print("====== Instrumented build (FORTPY_INSTRUMENT) =====")
+    targets = get_build_targets(profile=profile, use_cache=not no_cache, instrument=instrument)
+    run_task_graph(get_build_tasks(targets), jobs)
+    for target in targets:
+        target.cache.report(target.name)
     if cleanup:
         _clean()
 
@@ -220,7 +547,7 @@ def build(
 def _clean():
     print("Cleaning Dir")
     f_module_paths = get_fortran_modules()
-    for (mod_name, mod_path) in f_module_paths:
+    for (mod_name, mod_path, _) in f_module_paths:
         build_dir = f"{mod_path}/{BUILD_DIR_NAME}"
         try:
             shutil.rmtree(build_dir)
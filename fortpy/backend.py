@@ -0,0 +1,68 @@
+"""Select the fewert build to use at import.
+
+fewert is built in single (fewert) and double (fewert64) precision. The precision
+is chosen with the FORTPY_EWERT_PRECISION environment variable ("single" or "double")
+or by passing it to :func:`load_fewert`.
+"""
+from importlib import import_module
+import os
+import numpy as np
+
+PRECISION_ENV_VAR = "FORTPY_EWERT_PRECISION"
+DEFAULT_PRECISION = "single"
+
+PRECISION_MODULES = {
+    "single": "fewert",
+    "double": "fewert64",
+}
+
+PRECISION_DTYPES = {
+    "single": np.float32,
+    "double": np.float64,
+}
+
+
+def get_precision(precision: str = None) -> str:
+    """Get the requested fewert precision, falling back to FORTPY_EWERT_PRECISION."""
+    precision = precision or os.environ.get(PRECISION_ENV_VAR, DEFAULT_PRECISION)
+    if precision not in PRECISION_MODULES:
+        raise ValueError(
+            f"Unknown fewert precision {precision}. Expected one of {list(PRECISION_MODULES)}")
+    return precision
+
+
+def load_fewert(precision: str = None):
+    """Import the ewert fortran module built with the given precision."""
+    return import_module(PRECISION_MODULES[get_precision(precision)]).ewert
+
+
+def get_build_profile(precision: str = None) -> str:
+    """The build.py profile (debug, release, native or fast-math) the fewert build used."""
+    build_info = import_module(PRECISION_MODULES[get_precision(precision)]).build_info
+    return bytes(build_info.build_profile).decode().strip()
+
+
+def is_instrumented(precision: str = None) -> bool:
+    """True if the fewert build was made with `build.py build --instrument`."""
+    build_info = import_module(PRECISION_MODULES[get_precision(precision)]).build_info
+    return bool(build_info.instrumented)
+
+
+def real_dtype(precision: str = None) -> type:
+    """The numpy dtype matching the fewert REAL kind for the given precision."""
+    return PRECISION_DTYPES[get_precision(precision)]
+
+
+def set_num_threads(num_threads: int, precision: str = None):
+    """Set the number of OpenMP threads used by the fewert batched entry points.
+
+    The batched entry points release the GIL for the whole call so other python threads
+    keep running while they execute. 0 resets to the OpenMP default (OMP_NUM_THREADS or
+    all cores).
+    """
+    load_fewert(precision).set_num_threads(num_threads)
+
+
+def get_num_threads(precision: str = None) -> int:
+    """The number of OpenMP threads the fewert batched entry points will use."""
+    return int(load_fewert(precision).get_num_threads())
@@ -0,0 +1,8 @@
+"""Benchmarks of the fewert entry points with pyDO3SE as an optional baseline.
+
+Run from the command line::
+
+    python -m fortpy.benchmarks run -n 1 -n 100 -n 10000 -o bench.json
+    python -m fortpy.benchmarks compare baseline.json bench.json
+
+"""
@@ -0,0 +1,143 @@
+"""Command line interface for the ewert benchmarks."""
+from dataclasses import replace
+from warnings import warn
+import sys
+import click
+
+from fortpy.benchmarks.cases import CASES, BenchmarkConfig
+from fortpy.benchmarks.inputs import DEFAULT_MODEL_OPTIONS, sample_constant_inputs
+from fortpy import backend
+from fortpy.boundary_profiler import BoundaryProfiler
+from fortpy.benchmarks.runner import (
+    compare_results,
+    get_metadata,
+    load_results,
+    run_case,
+    save_results,
+)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("list")
+def list_cases():
+    """List the benchmark cases."""
+    for case in CASES.values():
+        baseline = " (python baseline)" if case.python_baseline else ""
+        print(f"{case.name:26} {case.description}{baseline}")
+
+
+@cli.command()
+@click.option("--size", "-n", "sizes", type=int, multiple=True, default=[1, 100, 10000],
+              help="Number of elements per run. Can be given more than once.")
+@click.option("--case", "-c", "case_names", multiple=True,
+              help="Case to run. Can be given more than once. Defaults to all fewert cases.")
+@click.option("--python-baseline", is_flag=True, default=False,
+              help="Also run the pyDO3SE cases.")
+@click.option("--repeat", "-r", default=10, help="Number of timing samples.")
+@click.option("--min-sample-time", default=0.01, help="Minimum time of each sample [s].")
+@click.option("--precision", default=None, help="fewert precision (single or double).")
+@click.option("--max-iterations", default=20, help="Maximum iterations of the CO2 loop.")
+@click.option("--tolerance", default=0.001, help="c_i convergence tolerance.")
+@click.option("--seed", default=0, help="Input sampling seed.")
+@click.option("--output", "-o", default=None, help="JSON file to write the results to.")
+@click.option("--full-night-recovery/--midnight-recovery", default=True,
+              help="Recover fO3_d every night hour or only at hr 0.")
+@click.option("--O3-damage/--no-O3-damage", "O3_damage", default=True,
+              help="Run with or without ozone damage.")
+@click.option("--f-vpd-method", default="photosynthesis",
+              help="photosynthesis calculates f_VPD in the loop, anything else uses the f_VPD input.")
+def run(sizes, case_names, python_baseline, repeat, min_sample_time, precision,
+        max_iterations, tolerance, seed, output, full_night_recovery, O3_damage, f_vpd_method):
+    """Run the benchmarks."""
+    config = BenchmarkConfig(
+        precision=precision,
+        model_options=replace(
+            DEFAULT_MODEL_OPTIONS,
+            opt_full_night_recovery=full_night_recovery,
+            use_O3_damage=O3_damage,
+            f_VPD_method=f_vpd_method,
+        ),
+        max_iterations=max_iterations,
+        tolerance=tolerance,
+    )
+    cases = [CASES[name] for name in case_names] if case_names else \
+        [c for c in CASES.values() if python_baseline or not c.python_baseline]
+    results = []
+    for case in cases:
+        for n in sizes:
+            try:
+                result = run_case(case, n, config, repeat, min_sample_time, seed)
+            except ImportError as e:
+                warn(f"Skipping {case.name}: {e}")
+                break
+            results.append(result)
+            per_call = result["per_call"]
+            per_iteration = ""
+            if "per_iteration" in result:
+                per_iteration = f" per iteration: {result['per_iteration']['p50']:.3e}s"
+            print(f"{case.name:26} n={n:<8} p50: {per_call['p50']:.3e}s "
+                  f"p95: {per_call['p95']:.3e}s "
+                  f"per element: {result['per_element']['p50']:.3e}s{per_iteration}")
+    if output:
+        save_results(output, get_metadata(config), results)
+        print(f"Results written to {output}")
+
+
+@cli.command()
+@click.argument("baseline")
+@click.argument("current")
+@click.option("--stat", default="p50", help="Statistic to compare e.g. p50, p95, mean.")
+@click.option("--threshold", default=0.1,
+              help="Exit with an error if any case is slower by more than this fraction.")
+def compare(baseline, current, stat, threshold):
+    """Compare two result files and fail on regressions."""
+    comparison = compare_results(load_results(baseline), load_results(current), stat)
+    regressed = False
+    for c in comparison:
+        flag = ""
+        if c["ratio"] > 1 + threshold:
+            flag = " REGRESSION"
+            regressed = True
+        print(f"{c['case']:26} n={c['n']:<8} {c['baseline']:.3e}s -> {c['current']:.3e}s "
+              f"x{c['ratio']:.2f}{flag}")
+    if regressed:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--size", "-n", default=100, help="Number of elements per run.")
+@click.option("--case", "-c", "case_names", multiple=True,
+              help="Case to profile. Can be given more than once. Defaults to all fewert cases.")
+@click.option("--repeat", "-r", default=10, help="Number of runs of each case.")
+@click.option("--precision", default=None, help="fewert precision (single or double).")
+@click.option("--max-iterations", default=20, help="Maximum iterations of the CO2 loop.")
+@click.option("--tolerance", default=0.001, help="c_i convergence tolerance.")
+@click.option("--seed", default=0, help="Input sampling seed.")
+def profile(size, case_names, repeat, precision, max_iterations, tolerance, seed):
+    """Split the time of each fewert entry point into kernel and marshalling time.
+
+    Build with `python build.py build --instrument` to get the kernel time.
+    """
+    config = BenchmarkConfig(
+        precision=precision,
+        model_options=DEFAULT_MODEL_OPTIONS,
+        max_iterations=max_iterations,
+        tolerance=tolerance,
+    )
+    cases = [CASES[name] for name in case_names] if case_names else \
+        [c for c in CASES.values() if c.name.startswith("fewert.")]
+    packed = sample_constant_inputs(size, seed, backend.real_dtype(precision))
+    with BoundaryProfiler(precision) as profiler:
+        for case in cases:
+            fn = case.setup(packed, config)
+            for _ in range(repeat):
+                fn()
+    print(profiler.format_table())
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,336 @@
+"""Benchmark cases for the ewert CO2 loop.
+
+Each case runs n elements of the same randomised inputs so per element times are
+comparable between the scalar, packed, batched and series entry points.
+"""
+from dataclasses import dataclass, astuple
+from typing import Callable, Dict
+import numpy as np
+
+from fortpy.backend import load_fewert, real_dtype
+from fortpy.ewert_types import (
+    ModelOptions,
+    CO2_CONSTANT_LOOP_INPUTS_FIELDS,
+    kernel_options,
+    unpack_constant_inputs,
+    empty_co2_loop_state_records,
+    records_as_fortran_buffer,
+)
+from fortpy.benchmarks.inputs import initial_loop_state
+
+
+@dataclass
+class BenchmarkConfig:
+    """Settings shared by every case in a benchmark run."""
+
+    precision: str = None
+    model_options: ModelOptions = None
+    max_iterations: int = 20
+    tolerance: float = 0.001
+
+
+@dataclass
+class BenchmarkCase:
+    """A benchmark case.
+
+    Parameters
+    ----------
+    name: str
+        unique case name
+    description: str
+        what a single run of the case does
+    setup: Callable[[np.ndarray, BenchmarkConfig], Callable[[], object]]
+        takes the (N_CO2_CONSTANT_LOOP_INPUTS, n) packed inputs and returns the function to time
+    python_baseline: bool
+        True for the pyDO3SE cases which are only run when requested
+    fixed_iterations: bool
+        True if every element runs exactly max_iterations c_i iterations so the
+        per iteration time is the per element time / max_iterations
+    """
+
+    name: str
+    description: str
+    setup: Callable[[np.ndarray, BenchmarkConfig], Callable[[], object]]
+    python_baseline: bool = False
+    fixed_iterations: bool = False
+
+
+def _scalar_inputs(packed: np.ndarray):
+    return [unpack_constant_inputs(packed[:, i]) for i in range(packed.shape[1])]
+
+
+def _setup_fewert_iteration(packed, config):
+    fewert = load_fewert(config.precision)
+    state = initial_loop_state()
+    opt = config.model_options.opt_full_night_recovery
+    options = kernel_options(config.model_options)
+    inputs = [astuple(ci) for ci in _scalar_inputs(packed)]
+
+    def run():
+        for ci in inputs:
+            fewert.co2_concentration_in_stomata_iteration(
+                *ci, state.c_i, state.g_sto, opt, **options)
+    return run
+
+
+def _setup_fewert_loop(packed, config):
+    fewert = load_fewert(config.precision)
+    state = initial_loop_state()
+    opt = config.model_options.opt_full_night_recovery
+    options = kernel_options(config.model_options)
+    inputs = [astuple(ci) for ci in _scalar_inputs(packed)]
+
+    def run():
+        for ci in inputs:
+            fewert.co2_concentration_in_stomata_loop(
+                *ci, state.c_i, state.g_sto, opt, config.max_iterations,
+                tolerance=config.tolerance, **options)
+    return run
+
+
+def _setup_fewert_loop_packed(packed, config):
+    fewert = load_fewert(config.precision)
+    state = initial_loop_state()
+    opt = config.model_options.opt_full_night_recovery
+    options = kernel_options(config.model_options)
+    columns = [np.ascontiguousarray(packed[:, i]) for i in range(packed.shape[1])]
+
+    def run():
+        for params in columns:
+            fewert.co2_concentration_in_stomata_loop_packed(
+                params, state.c_i, state.g_sto, opt, config.max_iterations,
+                tolerance=config.tolerance, **options)
+    return run
+
+
+def _batch_arrays(packed, dtype):
+    rows = {name: np.ascontiguousarray(packed[i], dtype=dtype)
+            for i, name in enumerate(CO2_CONSTANT_LOOP_INPUTS_FIELDS)}
+    rows["is_daylight"] = rows["is_daylight"] != 0
+    rows["hr"] = rows["hr"].astype(np.int32)
+    return rows
+
+
+def _setup_fewert_loop_batch(packed, config):
+    fewert = load_fewert(config.precision)
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    n = packed.shape[1]
+    rows = _batch_arrays(packed, dtype)
+    args = [rows[name] for name in CO2_CONSTANT_LOOP_INPUTS_FIELDS]
+    c_i_in = np.full(n, state.c_i, dtype=dtype)
+    g_sto_in = np.full(n, state.g_sto, dtype=dtype)
+
+    def run():
+        fewert.co2_concentration_in_stomata_loop_batch(
+            *args, c_i_in, g_sto_in, config.model_options.opt_full_night_recovery,
+            config.max_iterations, tolerance=config.tolerance,
+            **kernel_options(config.model_options))
+    return run
+
+
+def _setup_fewert_loop_batch_into(packed, config):
+    fewert = load_fewert(config.precision)
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    n = packed.shape[1]
+    params = np.asfortranarray(packed, dtype=dtype)
+    c_i_in = np.full(n, state.c_i, dtype=dtype)
+    g_sto_in = np.full(n, state.g_sto, dtype=dtype)
+    out = records_as_fortran_buffer(empty_co2_loop_state_records(n, dtype))
+
+    def run():
+        fewert.co2_concentration_in_stomata_loop_batch_into(
+            params, c_i_in, g_sto_in, config.model_options.opt_full_night_recovery,
+            config.max_iterations, out, tolerance=config.tolerance,
+            **kernel_options(config.model_options))
+    return run
+
+
+def _setup_fewert_loop_iterations(packed, config):
+    fewert = load_fewert(config.precision)
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    n = packed.shape[1]
+    params = np.asfortranarray(packed, dtype=dtype)
+    c_i_in = np.full(n, state.c_i, dtype=dtype)
+    g_sto_in = np.full(n, state.g_sto, dtype=dtype)
+    out = records_as_fortran_buffer(empty_co2_loop_state_records(n, dtype))
+
+    def run():
+        # c_i_diff is never below a zero tolerance so no element exits early
+        fewert.co2_concentration_in_stomata_loop_batch_into(
+            params, c_i_in, g_sto_in, config.model_options.opt_full_night_recovery,
+            config.max_iterations, out, tolerance=0.0,
+            **kernel_options(config.model_options))
+    return run
+
+
+def _setup_fewert_hourly_series(packed, config):
+    from fortpy.ewert_batch import HOURLY_FORCING_FIELDS, SERIES_PARAMETER_FIELDS
+    fewert = load_fewert(config.precision)
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    rows = _batch_arrays(packed, dtype)
+    forcing = [rows[name] for name in HOURLY_FORCING_FIELDS]
+    # The series parameters are constant so the first element's values are used
+    parameters = [float(rows[name][0]) for name in SERIES_PARAMETER_FIELDS]
+    out = records_as_fortran_buffer(empty_co2_loop_state_records(packed.shape[1], dtype))
+
+    def run():
+        fewert.run_hourly_series_into(
+            *forcing, *parameters, float(rows["fO3_d_prev"][0]),
+            state.c_i, state.g_sto, config.model_options.opt_full_night_recovery,
+            config.max_iterations, out, tolerance=config.tolerance,
+            **kernel_options(config.model_options))
+    return run
+
+
+def _setup_ctypes_point(packed, config):
+    from fortpy.ewert_c import EwertC
+    state = initial_loop_state()
+    ewert = EwertC(config.model_options, config.precision, config.max_iterations,
+                   config.tolerance)
+    ewert.c_i_in, ewert.g_sto_in = state.c_i, state.g_sto
+    columns = [np.ascontiguousarray(packed[:, i], dtype=ewert.dtype)
+               for i in range(packed.shape[1])]
+    return ewert, columns
+
+
+def _setup_ctypes_iteration(packed, config):
+    ewert, columns = _setup_ctypes_point(packed, config)
+    params = ewert.params
+
+    def run():
+        for column in columns:
+            params[:] = column
+            ewert.iteration()
+    return run
+
+
+def _setup_ctypes_loop(packed, config):
+    ewert, columns = _setup_ctypes_point(packed, config)
+    params = ewert.params
+
+    def run():
+        for column in columns:
+            params[:] = column
+            ewert.loop()
+    return run
+
+
+def _setup_ctypes_loop_batch(packed, config):
+    from fortpy.ewert_c import EwertC
+    ewert = EwertC(config.model_options, config.precision, config.max_iterations,
+                   config.tolerance)
+    state = initial_loop_state()
+    n = packed.shape[1]
+    params = np.asfortranarray(packed, dtype=ewert.dtype)
+    c_i_in = np.full(n, state.c_i, dtype=ewert.dtype)
+    g_sto_in = np.full(n, state.g_sto, dtype=ewert.dtype)
+    out = records_as_fortran_buffer(empty_co2_loop_state_records(n, ewert.dtype))
+
+    def run():
+        ewert.loop_batch(params, c_i_in, g_sto_in, out)
+    return run
+
+
+def _setup_numpy_loop_batch(packed, config):
+    from fortpy import ewert_numpy
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    params = np.asarray(packed, dtype=dtype)
+
+    def run():
+        ewert_numpy.co2_concentration_in_stomata_loop_batch(
+            params, state.c_i, state.g_sto, config.model_options.opt_full_night_recovery,
+            config.max_iterations, tolerance=config.tolerance,
+            **kernel_options(config.model_options))
+    return run
+
+
+def _setup_pyDO3SE_iteration(packed, config):
+    from pyDO3SE.plugins.gsto.ewert import ewert as pyEwert
+    state = initial_loop_state()
+    inputs = _scalar_inputs(packed)
+
+    def run():
+        for ci in inputs:
+            pyEwert.co2_concentration_in_stomata_iteration(ci, state, config.model_options)
+    return run
+
+
+def _setup_pyDO3SE_loop(packed, config):
+    from pyDO3SE.plugins.gsto.ewert import ewert as pyEwert
+    inputs = _scalar_inputs(packed)
+
+    def run():
+        for ci in inputs:
+            state = initial_loop_state()
+            diff = np.inf
+            iterations = 0
+            while diff > config.tolerance and iterations < config.max_iterations:
+                state = pyEwert.co2_concentration_in_stomata_iteration(
+                    ci, state, config.model_options)
+                diff = state.c_i_diff
+                iterations += 1
+    return run
+
+
+CASES: Dict[str, BenchmarkCase] = {c.name: c for c in [
+    BenchmarkCase(
+        "fewert.iteration",
+        "one co2_concentration_in_stomata_iteration call per element",
+        _setup_fewert_iteration),
+    BenchmarkCase(
+        "fewert.loop",
+        "one co2_concentration_in_stomata_loop call per element",
+        _setup_fewert_loop),
+    BenchmarkCase(
+        "fewert.loop_packed",
+        "one co2_concentration_in_stomata_loop_packed call per element",
+        _setup_fewert_loop_packed),
+    BenchmarkCase(
+        "fewert.loop_batch",
+        "one co2_concentration_in_stomata_loop_batch call for all elements",
+        _setup_fewert_loop_batch),
+    BenchmarkCase(
+        "fewert.loop_batch_into",
+        "one co2_concentration_in_stomata_loop_batch_into call into a reused buffer",
+        _setup_fewert_loop_batch_into),
+    BenchmarkCase(
+        "fewert.loop_iterations",
+        "co2_concentration_in_stomata_loop_batch_into running max_iterations for every element",
+        _setup_fewert_loop_iterations,
+        fixed_iterations=True),
+    BenchmarkCase(
+        "fewert.hourly_series",
+        "one run_hourly_series_into call with one hour per element",
+        _setup_fewert_hourly_series),
+    BenchmarkCase(
+        "ctypes.iteration",
+        "one fortpy.ewert_c iteration call per element",
+        _setup_ctypes_iteration),
+    BenchmarkCase(
+        "ctypes.loop",
+        "one fortpy.ewert_c loop call per element",
+        _setup_ctypes_loop),
+    BenchmarkCase(
+        "ctypes.loop_batch",
+        "one fortpy.ewert_c loop_batch call into a reused buffer",
+        _setup_ctypes_loop_batch),
+    BenchmarkCase(
+        "numpy.loop_batch",
+        "fortpy.ewert_numpy co2_concentration_in_stomata_loop_batch for all elements",
+        _setup_numpy_loop_batch),
+    BenchmarkCase(
+        "pyDO3SE.iteration",
+        "one pyDO3SE co2_concentration_in_stomata_iteration call per element",
+        _setup_pyDO3SE_iteration,
+        python_baseline=True),
+    BenchmarkCase(
+        "pyDO3SE.loop",
+        "pyDO3SE co2_concentration_in_stomata_iteration until converged per element",
+        _setup_pyDO3SE_loop,
+        python_baseline=True),
+]}
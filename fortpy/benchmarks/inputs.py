@@ -0,0 +1,88 @@
+"""Randomised valid inputs for the ewert CO2 loop."""
+import numpy as np
+
+from fortpy.ewert_types import (
+    CO2_CONSTANT_LOOP_INPUTS_FIELDS,
+    N_CO2_CONSTANT_LOOP_INPUTS,
+    CO2_loop_State,
+    ModelOptions,
+)
+
+T_LEM_CONSTANT = 0.15
+T_LSE_CONSTANT = 0.33
+
+INPUT_RANGES = {
+    "c_a": (350.0, 450.0),
+    "g_bl": (5e5, 2e6),
+    "g_sto_0": (10000.0, 30000.0),
+    "m": (6.0, 10.0),
+    "D_0": (2.0, 2.5),
+    "O3up": (0.0, 40.0),
+    "O3up_acc": (0.0, 5000.0),
+    "fO3_d_prev": (0.8, 1.0),
+    "td_dd": (0.0, 900.0),
+    "gamma_1": (0.04, 0.08),
+    "gamma_2": (0.003, 0.006),
+    "gamma_3": (0.3, 0.7),
+    "t_l_estimate": (600.0, 1000.0),
+    "Gamma": (30.0, 40.0),
+    "Gamma_star": (30.0, 40.0),
+    "V_cmax": (60.0, 140.0),
+    "K_C": (200.0, 300.0),
+    "K_O": (200.0, 250.0),
+    "J": (150.0, 350.0),
+    "R_d": (0.2, 0.6),
+    "e_sat_i": (1500.0, 3500.0),
+    "f_SW": (0.5, 1.0),
+}
+"""Uniform sampling ranges of the independent constant loop inputs."""
+
+
+def sample_constant_inputs(n: int, seed: int = 0, dtype=np.float32) -> np.ndarray:
+    """Sample n valid constant loop inputs.
+
+    The leaf lifespan phases are derived from t_l_estimate, e_a is below e_sat_i and
+    f_VPD is left at 1.0 as it is calculated inside the loop.
+
+    Returns
+    -------
+    np.ndarray
+        (N_CO2_CONSTANT_LOOP_INPUTS, n) Fortran ordered packed inputs
+        (see fortpy.ewert_types.pack_constant_inputs_batch)
+
+    """
+    rng = np.random.default_rng(seed)
+    values = {name: rng.uniform(low, high, n) for name, (low, high) in INPUT_RANGES.items()}
+    values["e_a"] = values["e_sat_i"] * rng.uniform(0.2, 0.95, n)
+    values["is_daylight"] = (rng.random(n) > 0.3).astype(float)
+    values["hr"] = rng.integers(0, 24, n).astype(float)
+    values["f_VPD"] = np.ones(n)
+    t_l = values["t_l_estimate"]
+    values["t_lse_constant"] = np.full(n, T_LSE_CONSTANT)
+    values["t_lem"] = t_l * T_LEM_CONSTANT
+    values["t_lma"] = t_l - values["t_lem"]
+    values["t_lse"] = values["t_lma"] * T_LSE_CONSTANT
+    values["t_lep"] = t_l - (values["t_lem"] + values["t_lse"])
+
+    packed = np.empty((N_CO2_CONSTANT_LOOP_INPUTS, n), dtype=dtype, order="F")
+    for i, name in enumerate(CO2_CONSTANT_LOOP_INPUTS_FIELDS):
+        packed[i] = values[name]
+    return packed
+
+
+def initial_loop_state() -> CO2_loop_State:
+    return CO2_loop_State(
+        c_i=0.0,
+        c_i_diff=0,
+        g_sto=20000,
+        A_n=0,
+        fO3_d=1.0,
+        fO3_h=1.0,
+    )
+
+
+DEFAULT_MODEL_OPTIONS = ModelOptions(
+    use_O3_damage=True,
+    opt_full_night_recovery=True,
+    f_VPD_method="photosynthesis",
+)
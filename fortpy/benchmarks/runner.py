@@ -0,0 +1,135 @@
+"""Time benchmark cases and summarise the timings as percentiles."""
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List
+import json
+import os
+import platform
+import subprocess
+import numpy as np
+
+from fortpy import backend
+from fortpy.benchmarks.cases import BenchmarkCase, BenchmarkConfig
+from fortpy.benchmarks.inputs import sample_constant_inputs
+
+PERCENTILES = [0, 5, 25, 50, 75, 95, 99, 100]
+
+
+def time_function(fn: Callable[[], object], repeat: int, min_sample_time: float) -> np.ndarray:
+    """Time fn repeat times after a warmup call.
+
+    Each sample calls fn enough times to take at least min_sample_time so fast functions
+    are not dominated by timer resolution.
+
+    Returns
+    -------
+    np.ndarray
+        time per call of each sample [s]
+
+    """
+    fn()
+    start = perf_counter()
+    fn()
+    number = max(1, int(min_sample_time / max(perf_counter() - start, 1e-9)))
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            fn()
+        samples[i] = (perf_counter() - start) / number
+    return samples
+
+
+def summarise(samples: np.ndarray) -> Dict[str, float]:
+    summary = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(samples, PERCENTILES))}
+    summary["mean"] = float(samples.mean())
+    summary["std"] = float(samples.std())
+    return summary
+
+
+def run_case(
+    case: BenchmarkCase,
+    n: int,
+    config: BenchmarkConfig,
+    repeat: int = 10,
+    min_sample_time: float = 0.01,
+    seed: int = 0,
+) -> Dict:
+    """Time a case over n sampled inputs and return its result record."""
+    packed = sample_constant_inputs(n, seed, backend.real_dtype(config.precision))
+    samples = time_function(case.setup(packed, config), repeat, min_sample_time)
+    per_call = summarise(samples)
+    result = {
+        "case": case.name,
+        "n": n,
+        "repeat": repeat,
+        "per_call": per_call,
+        "per_element": {k: v / n for k, v in per_call.items()},
+        "elements_per_second": n / per_call["p50"],
+    }
+    if case.fixed_iterations:
+        result["per_iteration"] = {k: v / (n * config.max_iterations) for k, v in per_call.items()}
+    return result
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_metadata(config: BenchmarkConfig) -> Dict:
+    """Describe the environment so results from different commits can be compared."""
+    metadata = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "precision": backend.get_precision(config.precision),
+        "max_iterations": config.max_iterations,
+        "tolerance": config.tolerance,
+        "opt_full_night_recovery": config.model_options.opt_full_night_recovery,
+        "use_O3_damage": config.model_options.use_O3_damage,
+        "f_VPD_method": config.model_options.f_VPD_method,
+    }
+    try:
+        metadata["build_profile"] = backend.get_build_profile(config.precision)
+        metadata["num_threads"] = backend.get_num_threads(config.precision)
+    except (ImportError, AttributeError):
+        metadata["build_profile"] = None
+    return metadata
+
+
+def save_results(path: str, metadata: Dict, results: List[Dict]):
+    with open(path, "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict, current: Dict, stat: str = "p50") -> List[Dict]:
+    """Ratio of current to baseline per call time for every case and size in both."""
+    baseline_results = {(r["case"], r["n"]): r for r in baseline["results"]}
+    comparison = []
+    for r in current["results"]:
+        b = baseline_results.get((r["case"], r["n"]))
+        if b is None:
+            continue
+        comparison.append({
+            "case": r["case"],
+            "n": r["n"],
+            "baseline": b["per_call"][stat],
+            "current": r["per_call"][stat],
+            "ratio": r["per_call"][stat] / b["per_call"][stat],
+        })
+    return comparison
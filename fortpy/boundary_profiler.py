@@ -0,0 +1,241 @@
+"""Split the time of python calls into Fortran between the kernel and the binding.
+
+While a BoundaryProfiler is active every fewert entry point looked up through
+fortpy.backend.load_fewert or called by fortpy.ewert_batch, and every
+``_pipeline.f90wrap_*`` routine is wrapped with a timer. Each entry point gets a row of:
+
+- total: wall time of the python call
+- kernel: the Fortran side of the call, from the entry_point timer of an instrumented
+  build (``python build.py build --instrument``, see fortpy.instrumentation)
+- marshalling: total - kernel, the f2py argument conversion, copies and call overhead
+- copies: input arrays f2py copies as their dtype or memory order does not match
+  the Fortran argument
+- outputs: arrays f2py allocates for the intent(out) results
+
+Without an instrumented build, and for the pipeline which has no instrumentation,
+only the total time and the copy counts are reported. The instrumented kernels
+are slower than the default build but the marshalling time is not affected.
+Calls through a reference to fewert taken before the profiler started
+(e.g. ``from fewert import ewert``) are not seen.
+
+Example
+-------
+    with BoundaryProfiler() as profiler:
+        fewert = load_fewert()
+        ...  # run fewert
+    print(profiler.format_table())
+
+"""
+from dataclasses import dataclass
+from importlib import import_module
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+import re
+import numpy as np
+
+from fortpy import backend
+from fortpy.instrumentation import TIMERS
+
+ENTRY_POINT_TIMER = TIMERS.index("entry_point")
+
+UNPROFILED = {"get_instrumentation", "reset_instrumentation"}
+"""fewert routines the profiler calls itself."""
+
+FEWERT_REFERENCES = [("fortpy.ewert_batch", "fewert")]
+"""Module attributes that hold the fewert Fortran module from import time."""
+
+_SECTION_RE = re.compile(r"^(Parameters|Other Parameters|Returns)$")
+_ARGUMENT_RE = re.compile(r"^(\w+) : ")
+_INPUT_ARRAY_RE = re.compile(r"^(\w+) : (?:input|in/output) rank-(\d+) array\('(\w)'\)")
+_OUTPUT_ARRAY_RE = re.compile(r"^(\w+) : rank-\d+ array")
+
+
+@dataclass
+class F2pySignature:
+    """The arguments of an f2py routine parsed from its docstring.
+
+    Parameters
+    ----------
+    arguments: List[str]
+        argument names in positional order
+    input_arrays: Dict[str, Tuple[int, np.dtype]]
+        rank and dtype of each array argument
+    n_output_arrays: int
+        number of arrays returned
+    """
+
+    arguments: List[str]
+    input_arrays: Dict[str, Tuple[int, np.dtype]]
+    n_output_arrays: int
+
+
+def parse_f2py_signature(doc: str) -> F2pySignature:
+    arguments = []
+    input_arrays = {}
+    n_output_arrays = 0
+    section = None
+    for line in (doc or "").splitlines():
+        m = _SECTION_RE.match(line)
+        if m:
+            section = m.group(1)
+        elif section == "Returns":
+            n_output_arrays += bool(_OUTPUT_ARRAY_RE.match(line))
+        elif section and _ARGUMENT_RE.match(line):
+            arguments.append(_ARGUMENT_RE.match(line).group(1))
+            m = _INPUT_ARRAY_RE.match(line)
+            if m:
+                input_arrays[m.group(1)] = (int(m.group(2)), np.dtype(m.group(3)))
+    return F2pySignature(arguments, input_arrays, n_output_arrays)
+
+
+def count_copies(signature: F2pySignature, args: tuple, kwargs: dict) -> int:
+    """Number of array arguments f2py has to copy before calling Fortran."""
+    values = dict(zip(signature.arguments, args), **kwargs)
+    copies = 0
+    for name, (rank, dtype) in signature.input_arrays.items():
+        if name not in values:
+            continue
+        value = values[name]
+        if not isinstance(value, np.ndarray) or value.dtype != dtype:
+            copies += 1
+        elif not (value.flags.f_contiguous if rank > 1 else value.flags.contiguous):
+            copies += 1
+    return copies
+
+
+@dataclass
+class EntryPointStats:
+    """Accumulated boundary timings of one entry point.
+
+    kernel_seconds is None when the entry point has no Fortran side timer.
+    """
+
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    kernel_seconds: float = None
+    copies: int = 0
+    outputs: int = 0
+
+    @property
+    def marshalling_seconds(self) -> float:
+        return None if self.kernel_seconds is None else self.seconds - self.kernel_seconds
+
+
+class _ProfiledFortranModule:
+    """Stands in for an f2py Fortran module object, whose routines can not be replaced."""
+
+    def __init__(self, module, wrap: Callable):
+        self._module = module
+        self._wrap = wrap
+        self._wrapped: Dict[str, Callable] = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if name in UNPROFILED or not callable(attr):
+            return attr
+        if name not in self._wrapped:
+            self._wrapped[name] = self._wrap(name, attr)
+        return self._wrapped[name]
+
+
+class BoundaryProfiler:
+    """Time the fewert and pipeline entry points called inside a with block.
+
+    Parameters
+    ----------
+    precision: str
+        fewert precision to profile
+    pipeline: bool
+        also profile the _pipeline.f90wrap_* routines if the pipeline is built
+
+    """
+
+    def __init__(self, precision: str = None, pipeline: bool = True):
+        self.precision = backend.get_precision(precision)
+        self.instrumented = backend.is_instrumented(self.precision)
+        self.pipeline = pipeline
+        self.stats: Dict[str, EntryPointStats] = {}
+        self._restore: List[Tuple[Any, str, Any]] = []
+
+    def __enter__(self):
+        module = import_module(backend.PRECISION_MODULES[self.precision])
+        self._fewert = module.ewert
+        if self.instrumented:
+            self._clock_rate = float(self._fewert.get_instrumentation()[4])
+        profiled = _ProfiledFortranModule(
+            self._fewert,
+            lambda name, fn: self._wrap(f"{module.__name__}.{name}", fn, self.instrumented))
+        module.ewert = profiled
+        self._restore.append((module, "ewert", self._fewert))
+        for module_name, name in FEWERT_REFERENCES:
+            holder = import_module(module_name)
+            # Only replaced if it was loaded with the profiled precision
+            if getattr(holder, name, None) is self._fewert:
+                setattr(holder, name, profiled)
+                self._restore.append((holder, name, self._fewert))
+        if self.pipeline:
+            try:
+                # f_pipeline puts _pipeline on the path
+                import_module("src.pipeline.f_pipeline")
+                _pipeline = import_module("_pipeline")
+            except ImportError:
+                _pipeline = None
+            for name in dir(_pipeline) if _pipeline else []:
+                if name.startswith("f90wrap_"):
+                    fn = getattr(_pipeline, name)
+                    setattr(_pipeline, name, self._wrap(f"_pipeline.{name}", fn, False))
+                    self._restore.append((_pipeline, name, fn))
+        return self
+
+    def __exit__(self, *exc_info):
+        for obj, name, original in reversed(self._restore):
+            setattr(obj, name, original)
+        self._restore = []
+
+    def _entry_ticks(self) -> int:
+        return int(self._fewert.get_instrumentation()[1][ENTRY_POINT_TIMER])
+
+    def _wrap(self, name: str, fn: Callable, kernel_timer: bool) -> Callable:
+        signature = parse_f2py_signature(fn.__doc__)
+        entry_ticks = self._entry_ticks if kernel_timer else None
+
+        def profiled(*args, **kwargs):
+            copies = count_copies(signature, args, kwargs)
+            ticks = entry_ticks() if entry_ticks else 0
+            start = perf_counter()
+            result = fn(*args, **kwargs)
+            seconds = perf_counter() - start
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = EntryPointStats(
+                    name, kernel_seconds=0.0 if entry_ticks else None)
+            if entry_ticks:
+                stats.kernel_seconds += (entry_ticks() - ticks) / self._clock_rate
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.copies += copies
+            stats.outputs += signature.n_output_arrays
+            return result
+        return profiled
+
+    def format_table(self) -> str:
+        """Per call times [us] and copies of every entry point called, slowest first."""
+        def us(seconds, calls):
+            return "-" if seconds is None else f"{seconds / calls * 1e6:.3f}"
+
+        rows = [["entry point", "calls", "total [us]", "kernel [us]", "marshalling [us]",
+                 "copies", "outputs"]]
+        for s in sorted(self.stats.values(), key=lambda s: -s.seconds):
+            rows.append([s.name, str(s.calls), us(s.seconds, s.calls),
+                         us(s.kernel_seconds, s.calls), us(s.marshalling_seconds, s.calls),
+                         f"{s.copies / s.calls:g}", f"{s.outputs / s.calls:g}"])
+        widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join([r[0].ljust(widths[0])] + [v.rjust(w) for v, w in zip(r[1:], widths[1:])])
+                 for r in rows]
+        if not self.instrumented:
+            lines.append("kernel time needs an instrumented build: python build.py build --instrument")
+        else:
+            # The helper timers run inside the entry point timer but outside the binding
+            lines.append("kernel time includes the instrumentation timers, marshalling does not")
+        return "\n".join(lines)
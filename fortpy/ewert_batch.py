@@ -0,0 +1,227 @@
+"""Batched and hourly series fewert runs that write into structured numpy arrays.
+
+Results are written by Fortran straight into a CO2_loop_State structured array.
+Pass the array from a previous call as ``out`` to reuse it between timesteps.
+Use :func:`fortpy.ewert_types.as_columns` for named column views.
+The fewert precision is selected at import (see fortpy.backend).
+When fewert is not built the NumPy port in fortpy.ewert_numpy is used instead.
+"""
+from typing import Dict
+import numpy as np
+
+from fortpy import ewert_numpy
+from fortpy.backend import get_precision, load_fewert, real_dtype
+from fortpy.ewert_types import (
+    CO2_Constant_Loop_Inputs,
+    ModelOptions,
+    SOLVER_RELAXATION,
+    co2_loop_state_dtype,
+    empty_co2_loop_state_records,
+    kernel_options,
+    records_as_fortran_buffer,
+)
+
+PRECISION = get_precision()
+REAL_DTYPE = real_dtype(PRECISION)
+try:
+    fewert = load_fewert(PRECISION)
+except ImportError:
+    fewert = None
+BACKEND = "numpy" if fewert is None else "fewert"
+
+
+HOURLY_FORCING_FIELDS = [
+    "c_a",
+    "e_a",
+    "g_bl",
+    "O3up",
+    "O3up_acc",
+    "td_dd",
+    "is_daylight",
+    "Gamma",
+    "Gamma_star",
+    "V_cmax",
+    "K_C",
+    "K_O",
+    "J",
+    "R_d",
+    "e_sat_i",
+    "hr",
+    "f_SW",
+    "f_VPD",
+]
+"""Inputs to run_hourly_series that change every hour."""
+
+SERIES_PARAMETER_FIELDS = [
+    "g_sto_0",
+    "m",
+    "D_0",
+    "gamma_1",
+    "gamma_2",
+    "gamma_3",
+    "t_lse_constant",
+    "t_l_estimate",
+    "t_lem",
+    "t_lep",
+    "t_lse",
+    "t_lma",
+]
+"""Inputs to run_hourly_series that are constant over the series."""
+
+
+def _get_out_buffer(out: np.ndarray, n: int) -> np.ndarray:
+    if out is None:
+        out = empty_co2_loop_state_records(n, REAL_DTYPE)
+    expected_dtype = co2_loop_state_dtype(REAL_DTYPE)
+    if out.dtype != expected_dtype:
+        raise ValueError(f"out has dtype {out.dtype} but {expected_dtype} is expected")
+    if len(out) != n:
+        raise ValueError(f"out has length {len(out)} but {n} results are expected")
+    return out
+
+
+def run_batch(
+    params: np.ndarray,
+    c_i_in: np.ndarray,
+    g_sto_in: np.ndarray,
+    model_options: ModelOptions,
+    max_iterations: int,
+    tolerance: float = 0.001,
+    damping: float = 0.5,
+    solver: int = SOLVER_RELAXATION,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Run the CO2 loop over a batch of packed inputs.
+
+    Parameters
+    ----------
+    params: np.ndarray
+        (N_CO2_CONSTANT_LOOP_INPUTS, n) packed inputs from pack_constant_inputs_batch
+    c_i_in: np.ndarray
+        initial c_i for each element
+    g_sto_in: np.ndarray
+        initial g_sto for each element
+    model_options: ModelOptions
+        ewert model options
+    max_iterations: int
+        maximum iterations of the CO2 loop
+    tolerance: float
+        c_i_diff convergence tolerance
+    damping: float
+        relaxation factor for the c_i update
+    solver: int
+        SOLVER_RELAXATION or SOLVER_SECANT
+    out: np.ndarray
+        Optional CO2_loop_State structured array of length n to write into
+
+    Returns
+    -------
+    np.ndarray
+        CO2_loop_State structured array with one record per element
+
+    """
+    out = _get_out_buffer(out, params.shape[1])
+    if fewert is None:
+        records_as_fortran_buffer(out)[...] = ewert_numpy.co2_concentration_in_stomata_loop_batch(
+            np.asarray(params, dtype=REAL_DTYPE),
+            c_i_in,
+            g_sto_in,
+            model_options.opt_full_night_recovery,
+            max_iterations,
+            tolerance=tolerance,
+            damping=damping,
+            solver=solver,
+            **kernel_options(model_options),
+        )[0].T
+        return out
+    fewert.co2_concentration_in_stomata_loop_batch_into(
+        params,
+        c_i_in,
+        g_sto_in,
+        model_options.opt_full_night_recovery,
+        max_iterations,
+        records_as_fortran_buffer(out),
+        tolerance=tolerance,
+        damping=damping,
+        solver=solver,
+        **kernel_options(model_options),
+    )
+    return out
+
+
+def run_hourly_series(
+    forcing: Dict[str, np.ndarray],
+    constant_inputs: CO2_Constant_Loop_Inputs,
+    c_i_in: float,
+    g_sto_in: float,
+    model_options: ModelOptions,
+    max_iterations: int,
+    tolerance: float = 0.001,
+    damping: float = 0.5,
+    solver: int = SOLVER_RELAXATION,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Run the CO2 loop over consecutive hours carrying the ozone state between hours.
+
+    Parameters
+    ----------
+    forcing: Dict[str, np.ndarray]
+        hourly arrays for every field in HOURLY_FORCING_FIELDS
+    constant_inputs: CO2_Constant_Loop_Inputs
+        provides the SERIES_PARAMETER_FIELDS. fO3_d_prev is the initial ozone
+        damage state. The hourly fields are ignored.
+    c_i_in: float
+        initial c_i for each hour
+    g_sto_in: float
+        initial g_sto for each hour
+    model_options: ModelOptions
+        ewert model options
+    max_iterations: int
+        maximum iterations of the CO2 loop
+    tolerance: float
+        c_i_diff convergence tolerance
+    damping: float
+        relaxation factor for the c_i update
+    solver: int
+        SOLVER_RELAXATION or SOLVER_SECANT
+    out: np.ndarray
+        Optional CO2_loop_State structured array with one record per hour to write into
+
+    Returns
+    -------
+    np.ndarray
+        CO2_loop_State structured array with one record per hour
+
+    """
+    out = _get_out_buffer(out, len(forcing["hr"]))
+    if fewert is None:
+        records_as_fortran_buffer(out)[...] = ewert_numpy.run_hourly_series(
+            forcing,
+            {name: getattr(constant_inputs, name) for name in SERIES_PARAMETER_FIELDS},
+            constant_inputs.fO3_d_prev,
+            c_i_in,
+            g_sto_in,
+            model_options.opt_full_night_recovery,
+            max_iterations,
+            tolerance=tolerance,
+            damping=damping,
+            solver=solver,
+            dtype=REAL_DTYPE,
+            **kernel_options(model_options),
+        ).T
+        return out
+    fewert.run_hourly_series_into(
+        *[forcing[name] for name in HOURLY_FORCING_FIELDS],
+        *[getattr(constant_inputs, name) for name in SERIES_PARAMETER_FIELDS],
+        constant_inputs.fO3_d_prev,
+        c_i_in,
+        g_sto_in,
+        model_options.opt_full_night_recovery,
+        max_iterations,
+        records_as_fortran_buffer(out),
+        tolerance=tolerance,
+        damping=damping,
+        solver=solver,
+        **kernel_options(model_options),
+    )
+    return out
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from fortpy import ewert_batch
+from fortpy.benchmarks.inputs import DEFAULT_MODEL_OPTIONS, sample_constant_inputs
+from fortpy.ewert_batch import REAL_DTYPE
+from fortpy.ewert_types import empty_co2_loop_state_records
+
+N = 4
+
+
+def run_batch(out):
+    return ewert_batch.run_batch(
+        sample_constant_inputs(N, 0, REAL_DTYPE),
+        np.zeros(N, dtype=REAL_DTYPE),
+        np.full(N, 20000.0, dtype=REAL_DTYPE),
+        DEFAULT_MODEL_OPTIONS,
+        20,
+        out=out,
+    )
+
+
+def test_run_batch_writes_into_out():
+    out = empty_co2_loop_state_records(N, REAL_DTYPE)
+    assert run_batch(out) is out
+
+
+def test_run_batch_rejects_wrong_out_dtype():
+    wrong_dtype = np.float64 if REAL_DTYPE == np.float32 else np.float32
+    with pytest.raises(ValueError, match="dtype"):
+        run_batch(empty_co2_loop_state_records(N, wrong_dtype))
+    with pytest.raises(ValueError, match="dtype"):
+        run_batch(np.zeros(N, dtype=REAL_DTYPE))
+
+
+def test_run_batch_rejects_wrong_out_length():
+    with pytest.raises(ValueError, match="length"):
+        run_batch(empty_co2_loop_state_records(N + 1, REAL_DTYPE))
@@ -0,0 +1,187 @@
+"""Call the bind(C) ewert entry points through ctypes without the f2py wrappers.
+
+The f2py wrappers parse keyword arguments and convert every argument on each call.
+EwertC calls the ewert_c routines linked into fewert. The single point calls pass one
+pointer to an Ewert_C_Point it allocates once and exposes through numpy views, so a
+call only pays for a one argument ctypes call.
+
+Example
+-------
+    ewert = EwertC(DEFAULT_MODEL_OPTIONS)
+    ewert.params[:] = pack_constant_inputs(constant_inputs)
+    ewert.c_i_in, ewert.g_sto_in = 0.0, 20000.0
+    out = ewert.loop()  # CO2_loop_State values, overwritten by the next call
+
+"""
+from importlib import import_module
+from typing import Dict
+import ctypes
+import numpy as np
+
+from fortpy import backend
+from fortpy.ewert_types import (
+    N_CO2_CONSTANT_LOOP_INPUTS,
+    ModelOptions,
+    SOLVER_RELAXATION,
+    kernel_options,
+)
+
+N_ITERATION_OUTPUTS = 18
+N_LOOP_OUTPUTS = 19
+
+_C_REAL: Dict[type, type] = {
+    np.float32: ctypes.c_float,
+    np.float64: ctypes.c_double,
+}
+
+
+def point_struct(real_type) -> type:
+    """ctypes layout of Ewert_C_Point (and Ewert_C_Options) in ewert_c.f90 for a REAL kind."""
+    class EwertCOptions(ctypes.Structure):
+        _fields_ = [
+            ("opt_full_night_recovery", ctypes.c_int),
+            ("use_O3_damage", ctypes.c_int),
+            ("precomputed_f_VPD", ctypes.c_int),
+            ("max_iterations", ctypes.c_int),
+            ("solver", ctypes.c_int),
+            ("num_threads", ctypes.c_int),
+            ("tolerance", real_type),
+            ("damping", real_type),
+        ]
+
+    class EwertCPoint(ctypes.Structure):
+        _fields_ = [
+            ("options", EwertCOptions),
+            ("params", real_type * N_CO2_CONSTANT_LOOP_INPUTS),
+            ("c_i_in", real_type),
+            ("g_sto_in", real_type),
+            ("out", real_type * N_LOOP_OUTPUTS),
+        ]
+    return EwertCPoint
+
+
+class EwertC:
+    """Preallocated buffers and ctypes bindings of the ewert_c entry points.
+
+    Write the inputs into params (packed in the order of CO2_CONSTANT_LOOP_INPUTS_FIELDS)
+    and set c_i_in and g_sto_in, then call iteration or loop. They return a view of
+    the output buffer, which the next call overwrites.
+
+    Parameters
+    ----------
+    model_options: ModelOptions
+        model options of every call
+    precision: str
+        fewert precision (see fortpy.backend)
+    max_iterations: int
+        maximum iterations of the c_i loop
+    tolerance: float
+        c_i convergence tolerance
+    damping: float
+        relaxation damping of the c_i update
+    solver: int
+        SOLVER_RELAXATION or SOLVER_SECANT
+    num_threads: int
+        OpenMP threads of loop_batch. 0 uses the OpenMP default.
+
+    """
+
+    def __init__(
+        self,
+        model_options: ModelOptions,
+        precision: str = None,
+        max_iterations: int = 20,
+        tolerance: float = 0.001,
+        damping: float = 0.5,
+        solver: int = SOLVER_RELAXATION,
+        num_threads: int = 0,
+    ):
+        precision = backend.get_precision(precision)
+        self.dtype = backend.real_dtype(precision)
+        # dlopen of the already imported extension returns its handle
+        lib = ctypes.CDLL(import_module(backend.PRECISION_MODULES[precision]).__file__)
+        options = kernel_options(model_options)
+        self._point = point_struct(_C_REAL[self.dtype])()
+        self.options = self._point.options
+        self.options.opt_full_night_recovery = model_options.opt_full_night_recovery
+        self.options.use_O3_damage = options["use_o3_damage"]
+        self.options.precomputed_f_VPD = options["precomputed_f_vpd"]
+        self.options.max_iterations = max_iterations
+        self.options.solver = solver
+        self.options.num_threads = num_threads
+        self.options.tolerance = tolerance
+        self.options.damping = damping
+        # Views of the Ewert_C_Point arrays so writing them does not copy
+        self.params = np.ctypeslib.as_array(self._point.params)
+        self.out = np.ctypeslib.as_array(self._point.out)
+        self._iteration_out = self.out[:N_ITERATION_OUTPUTS]
+
+        self._point_ref = ctypes.byref(self._point)
+        self._iteration = lib.ewert_iteration
+        self._loop = lib.ewert_loop
+        self._loop_batch = lib.ewert_loop_batch
+        for fn in [self._iteration, self._loop, self._loop_batch]:
+            fn.restype = None
+
+    @property
+    def c_i_in(self) -> float:
+        return self._point.c_i_in
+
+    @c_i_in.setter
+    def c_i_in(self, value: float):
+        self._point.c_i_in = value
+
+    @property
+    def g_sto_in(self) -> float:
+        return self._point.g_sto_in
+
+    @g_sto_in.setter
+    def g_sto_in(self, value: float):
+        self._point.g_sto_in = value
+
+    def iteration(self) -> np.ndarray:
+        """co2_concentration_in_stomata_iteration of params, c_i_in and g_sto_in."""
+        self._iteration(self._point_ref)
+        return self._iteration_out
+
+    def loop(self) -> np.ndarray:
+        """co2_concentration_in_stomata_loop of params, c_i_in and g_sto_in."""
+        self._loop(self._point_ref)
+        return self.out
+
+    def loop_batch(
+        self,
+        params: np.ndarray,
+        c_i_in: np.ndarray,
+        g_sto_in: np.ndarray,
+        out: np.ndarray = None,
+    ) -> np.ndarray:
+        """co2_concentration_in_stomata_loop_batch_into of every column of params.
+
+        Parameters
+        ----------
+        params: np.ndarray
+            (N_CO2_CONSTANT_LOOP_INPUTS, n) Fortran ordered packed inputs
+        c_i_in: np.ndarray
+            (n) initial c_i
+        g_sto_in: np.ndarray
+            (n) initial g_sto
+        out: np.ndarray
+            (N_LOOP_OUTPUTS, n) Fortran ordered buffer to write into e.g. from
+            records_as_fortran_buffer. Allocated if not given.
+
+        """
+        n = params.shape[1]
+        if out is None:
+            out = np.empty((N_LOOP_OUTPUTS, n), dtype=self.dtype, order="F")
+        arrays = [(params, (N_CO2_CONSTANT_LOOP_INPUTS, n)), (c_i_in, (n,)),
+                  (g_sto_in, (n,)), (out, (N_LOOP_OUTPUTS, n))]
+        for a, shape in arrays:
+            if a.dtype != self.dtype or a.shape != shape or not a.flags.f_contiguous:
+                raise ValueError(
+                    f"Expected a Fortran ordered {self.dtype.__name__} array of shape {shape} "
+                    f"but got {a.dtype} {a.shape}")
+        self._loop_batch(ctypes.c_int(n), ctypes.c_void_p(params.ctypes.data),
+                         ctypes.c_void_p(c_i_in.ctypes.data), ctypes.c_void_p(g_sto_in.ctypes.data),
+                         ctypes.byref(self.options), ctypes.c_void_p(out.ctypes.data))
+        return out
@@ -0,0 +1,104 @@
+from dataclasses import astuple
+import numpy as np
+import pytest
+
+from fortpy.backend import PRECISION_MODULES, load_fewert, real_dtype
+from fortpy.benchmarks.inputs import sample_constant_inputs
+from fortpy.ewert_c import EwertC
+from fortpy.ewert_types import (
+    ModelOptions,
+    SOLVER_RELAXATION,
+    SOLVER_SECANT,
+    kernel_options,
+    unpack_constant_inputs,
+)
+
+N = 50
+MAX_ITERATIONS = 20
+TOLERANCE = 0.001
+C_I_IN = 10.0
+G_STO_IN = 20000.0
+
+MODEL_OPTIONS = [
+    ModelOptions(opt_full_night_recovery=True),
+    ModelOptions(opt_full_night_recovery=False, use_O3_damage=False),
+    ModelOptions(f_VPD_method="input"),
+]
+MODEL_OPTIONS_IDS = ["full_night_recovery", "no_o3", "fixed_fvpd"]
+
+
+@pytest.fixture(params=["single", "double"])
+def precision(request):
+    pytest.importorskip(PRECISION_MODULES[request.param])
+    return request.param
+
+
+@pytest.mark.parametrize("model_options", MODEL_OPTIONS, ids=MODEL_OPTIONS_IDS)
+def test_iteration_matches_f2py(precision, model_options):
+    fewert = load_fewert(precision)
+    params = sample_constant_inputs(N, 0, real_dtype(precision))
+    ewert = EwertC(model_options, precision)
+    ewert.c_i_in, ewert.g_sto_in = C_I_IN, G_STO_IN
+    for i in range(N):
+        ewert.params[:] = params[:, i]
+        expected = fewert.co2_concentration_in_stomata_iteration(
+            *astuple(unpack_constant_inputs(params[:, i])),
+            C_I_IN,
+            G_STO_IN,
+            model_options.opt_full_night_recovery,
+            **kernel_options(model_options),
+        )
+        np.testing.assert_array_equal(ewert.iteration(), expected)
+
+
+@pytest.mark.parametrize("model_options", MODEL_OPTIONS, ids=MODEL_OPTIONS_IDS)
+@pytest.mark.parametrize("solver", [SOLVER_RELAXATION, SOLVER_SECANT])
+def test_loop_and_loop_batch_match_f2py(precision, solver, model_options):
+    fewert = load_fewert(precision)
+    dtype = real_dtype(precision)
+    params = sample_constant_inputs(N, 0, dtype)
+    c_i_in = np.full(N, C_I_IN, dtype=dtype)
+    g_sto_in = np.full(N, G_STO_IN, dtype=dtype)
+    ewert = EwertC(
+        model_options, precision, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE,
+        solver=solver)
+    ewert.c_i_in, ewert.g_sto_in = C_I_IN, G_STO_IN
+
+    expected = np.empty((len(ewert.out), N), dtype=dtype, order="F")
+    fewert.co2_concentration_in_stomata_loop_batch_into(
+        params,
+        c_i_in,
+        g_sto_in,
+        model_options.opt_full_night_recovery,
+        MAX_ITERATIONS,
+        expected,
+        tolerance=TOLERANCE,
+        solver=solver,
+        **kernel_options(model_options),
+    )
+    np.testing.assert_array_equal(ewert.loop_batch(params, c_i_in, g_sto_in), expected)
+
+    for i in range(N):
+        ewert.params[:] = params[:, i]
+        expected_packed = fewert.co2_concentration_in_stomata_loop_packed(
+            np.ascontiguousarray(params[:, i]),
+            C_I_IN,
+            G_STO_IN,
+            model_options.opt_full_night_recovery,
+            MAX_ITERATIONS,
+            tolerance=TOLERANCE,
+            solver=solver,
+            **kernel_options(model_options),
+        )
+        np.testing.assert_array_equal(ewert.loop(), expected_packed)
+        np.testing.assert_array_equal(expected[:, i], expected_packed)
+
+
+def test_loop_batch_rejects_wrong_dtype(precision):
+    ewert = EwertC(ModelOptions(), precision)
+    wrong_dtype = np.float64 if real_dtype(precision) == np.float32 else np.float32
+    params = sample_constant_inputs(3, 0, wrong_dtype)
+    c_i_in = np.full(3, C_I_IN, dtype=wrong_dtype)
+    g_sto_in = np.full(3, G_STO_IN, dtype=wrong_dtype)
+    with pytest.raises(ValueError, match="Fortran ordered"):
+        ewert.loop_batch(params, c_i_in, g_sto_in)
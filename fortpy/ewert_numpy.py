@@ -0,0 +1,564 @@
+"""NumPy port of src/ewert/ewert_helpers.f90 and the fewert CO2 loop.
+
+Every function takes and returns arrays with one element per input so a whole batch is
+evaluated in a few vectorised operations. This is the fallback when the fewert extension
+is not built and the reference implementation for parity tests.
+
+Calculations run in the dtype of the inputs. Pass float32 arrays to reproduce the single
+precision fewert build and float64 arrays for fewert64.
+
+The output layouts match fewert:
+invariants: f_LS, f_LA, fO3_d, fO3_h, fO3_l, t_lep_ozone, t_lma_ozone, t_lse_ozone, t_l_ozone
+coefficients: the Timestep_Coefficients fields (see TIMESTEP_COEFFICIENTS_FIELDS)
+loop out: the CO2_loop_State fields (see fortpy.ewert_types.CO2_LOOP_STATE_FIELDS)
+"""
+from dataclasses import dataclass
+from typing import Dict, Tuple, Union
+import numpy as np
+
+from fortpy.ewert_types import (
+    CO2_CONSTANT_LOOP_INPUTS_FIELDS,
+    CO2_LOOP_STATE_FIELDS,
+    SOLVER_RELAXATION,
+    SOLVER_SECANT,
+)
+
+N_INVARIANTS = 9
+TIMESTEP_COEFFICIENTS_FIELDS = [
+    "A_p",
+    "K_C_O",
+    "A_j_Gamma_star",
+    "g_sto_0_mol",
+    "g_bl_mol",
+    "r_bl",
+    "r_bl_mol",
+    "e_sat_i_kPa",
+    "g_bl_e_a",
+]
+N_TIMESTEP_COEFFICIENTS = len(TIMESTEP_COEFFICIENTS_FIELDS)
+N_LOOP_OUT = len(CO2_LOOP_STATE_FIELDS)
+G_STO_SETTLED_ULPS = 4  # see the solver comment in ewert_kernels.f90
+
+A_J_A = 4.0  # electron requirement for NADPH formation
+A_J_B = 8.0  # electron requirement for ATP formation
+O_I = 210.0  # O2 concentration [mmol/mol]
+
+
+@dataclass
+class Damage_Factors:
+    fO3_h: np.ndarray
+    fO3_d: np.ndarray
+    fO3_l: np.ndarray
+    f_LA: np.ndarray
+    rO3: np.ndarray
+
+
+@dataclass
+class Leaf_Life_Span_Values:
+    t_lma: np.ndarray
+    t_lse: np.ndarray
+    t_lep: np.ndarray
+    t_l: np.ndarray
+
+
+@dataclass
+class CO2_assimilation_rate_factors:
+    A_c: np.ndarray
+    A_j: np.ndarray
+    A_p: np.ndarray
+    A_n: np.ndarray
+    A_n_limit_factor: np.ndarray
+
+
+def calc_fO3_h(O3up, gamma_1, gamma_2):
+    lower_bound = gamma_1 / gamma_2
+    upper_bound = (1 + gamma_1) / gamma_2
+    return np.where(
+        O3up <= lower_bound, 1,
+        np.where(O3up >= upper_bound, 0, 1 + gamma_1 - gamma_2 * O3up)).astype(O3up.dtype)
+
+
+def calc_f_LA(t_lem, t_lma, td_dd):
+    lower_bound = t_lem
+    upper_bound = t_lem + t_lma
+    return np.where(
+        td_dd <= lower_bound, 1,
+        np.where(td_dd >= upper_bound, 0, 1 - (td_dd - t_lem) / t_lma)).astype(td_dd.dtype)
+
+
+def calc_ozone_damage_factors(
+    gamma_1,
+    gamma_2,
+    gamma_3,
+    O3up,
+    O3up_acc,
+    fO3_d_prev,
+    td_dd,
+    t_lem,
+    t_lma,
+    is_daylight,
+    hr,
+    opt_full_night_recovery: bool,
+) -> Damage_Factors:
+    fO3_h = calc_fO3_h(O3up, gamma_1, gamma_2)
+    f_LA = calc_f_LA(t_lem, t_lma, td_dd)
+    rO3 = fO3_d_prev + (1 - fO3_d_prev) * f_LA  # eq 13
+
+    fO3_d_base = fO3_d_prev * fO3_h  # eq 11 fO3_d degrades during the day
+    fO3_d_night = rO3 * fO3_h  # eq 12  fO3_d recovers during the night
+    recovers = ~np.asarray(is_daylight, dtype=bool) if opt_full_night_recovery else hr == 0
+    fO3_d = np.where(recovers, fO3_d_night, fO3_d_base)
+    fO3_l = 1 - (gamma_3 * (O3up_acc / 1000))  # eq 17 note conversion to umol
+    return Damage_Factors(fO3_h, fO3_d, fO3_l, f_LA, rO3)
+
+
+def calc_ozone_impact_on_lifespan(
+    t_lse_constant,
+    t_lep,
+    t_lse,
+    t_lem,
+    fO3_l,
+) -> Leaf_Life_Span_Values:
+    t_lma_O3 = (t_lep + t_lse) * fO3_l  # eq 16 reduces estimated leaf age by accumulated fst
+    t_lse_O3 = t_lse_constant * t_lma_O3  # make senescing period 0.33 * life span of mature leaf
+    # non senescing period assumed to be remaining time
+    t_lep_O3 = t_lma_O3 - t_lse_O3
+    t_l_O3 = t_lem + t_lma_O3
+    return Leaf_Life_Span_Values(t_lma=t_lma_O3, t_lse=t_lse_O3, t_lep=t_lep_O3, t_l=t_l_O3)
+
+
+def calc_senescence_factor(td_dd, t_l_O3, t_lem, t_lep_O3, t_lse_O3):
+    s_signal = t_lem + t_lep_O3  # new senescense signal
+    return np.where(
+        td_dd <= s_signal, 1,
+        np.where(td_dd >= t_l_O3, 0,
+                 1 - ((td_dd - t_lem - t_lep_O3) / t_lse_O3))).astype(td_dd.dtype)
+
+
+def calc_timestep_coefficients(V_cmax, Gamma_star, K_C, K_O, g_sto_0, g_bl, e_a, e_sat_i):
+    """Terms of the c_i iteration that do not change over the c_i loop.
+
+    Returns
+    -------
+    np.ndarray
+        (n, N_TIMESTEP_COEFFICIENTS) coefficients in the fewert layout
+
+    """
+    # Unit conversions
+    # Equation 5 is in mol
+    # Convert from umol to mol
+    g_bl_mol = g_bl * 1e-6
+    return np.stack([
+        0.5 * V_cmax,
+        K_C * (1 + (O_I / K_O)),
+        A_J_B * Gamma_star,
+        g_sto_0 * 1e-6,
+        g_bl_mol,
+        1.37 / g_bl,
+        1.37 / g_bl_mol,
+        e_sat_i * 1e-3,
+        g_bl_mol * (e_a * 1e-3),
+    ], axis=1)
+
+
+def unpack_timestep_coefficients(coefficients: np.ndarray) -> Dict[str, np.ndarray]:
+    """Name the columns of (n, N_TIMESTEP_COEFFICIENTS) coefficients without copying."""
+    return {name: coefficients[:, i] for i, name in enumerate(TIMESTEP_COEFFICIENTS_FIELDS)}
+
+
+def calc_CO2_assimilation_rate(
+    c_i_in,
+    V_cmax,
+    Gamma_star,
+    coefficients: Dict[str, np.ndarray],
+    fO3_d,
+    f_LS,
+    J,
+    R_d,
+) -> CO2_assimilation_rate_factors:
+    A_c = V_cmax * ((c_i_in - Gamma_star) /
+                    (c_i_in + coefficients["K_C_O"])) * fO3_d * f_LS
+    A_j = J * ((c_i_in - Gamma_star) / ((A_J_A * c_i_in) + coefficients["A_j_Gamma_star"]))
+    A_p = coefficients["A_p"]
+    A_n = np.minimum(np.minimum(A_c, A_j), A_p) - R_d
+    return CO2_assimilation_rate_factors(
+        A_c=A_c, A_j=A_j, A_p=A_p, A_n=A_n, A_n_limit_factor=np.zeros_like(A_n))
+
+
+def calc_humidity_defecit_fVPD(g_sto_in, coefficients: Dict[str, np.ndarray], D_0):
+    # Unit conversions
+    # Equation 5 is in mol
+    # Convert from umol to mol
+    g_sto_in_mol = g_sto_in * 1e-6
+    e_sat_i_kPa = coefficients["e_sat_i_kPa"]
+    # Surface humidity (Unitless)
+    h_s = (g_sto_in_mol * e_sat_i_kPa + coefficients["g_bl_e_a"]) / \
+        (e_sat_i_kPa * (g_sto_in_mol + coefficients["g_bl_mol"]))
+    # Convert relative humidity to VPD
+    d_s = e_sat_i_kPa - (e_sat_i_kPa * h_s)
+    return 1 / (1 + (d_s / D_0))
+
+
+def calc_stomatal_conductance(coefficients: Dict[str, np.ndarray], m, Gamma, c_a, A_n, f_SW, f_VPD):
+    # Surface CO2. g_bl converted from H2O to CO2
+    c_s = c_a - (A_n * coefficients["r_bl_mol"])
+    # Equation 5 from Ewert paper and Leuning 1995
+    g_eq_top = m * A_n * f_SW * f_VPD  # micro mol/(m^2*s)
+    g_eq_bottom = (c_s - Gamma)
+    g_sto_out_mol = coefficients["g_sto_0_mol"] + (g_eq_top / g_eq_bottom)
+    # Convert from mol to umol
+    return g_sto_out_mol * 1e6
+
+
+def calc_CO2_supply(A_n, c_a, g_sto, coefficients: Dict[str, np.ndarray]):
+    # g_bl is converted from H2O to CO2 using Dratio
+    return c_a - ((A_n * (1 / g_sto + coefficients["r_bl"])) * 1e6)
+
+
+def unpack_CO2_constant_loop_inputs(params: np.ndarray) -> Dict[str, np.ndarray]:
+    """Name the rows of (N_CO2_CONSTANT_LOOP_INPUTS, n) packed inputs without copying."""
+    return {name: params[i] for i, name in enumerate(CO2_CONSTANT_LOOP_INPUTS_FIELDS)}
+
+
+def co2_concentration_in_stomata_invariants(
+    inputs: Dict[str, np.ndarray],
+    opt_full_night_recovery: bool,
+    use_o3_damage: bool = True,
+) -> np.ndarray:
+    """Factors that do not depend on c_i or g_sto.
+
+    Without ozone damage fO3_h, fO3_d and fO3_l are 1 as in fewert calc_loop_invariants_no_O3.
+
+    Returns
+    -------
+    np.ndarray
+        (n, N_INVARIANTS) invariants in the fewert layout
+
+    """
+    if use_o3_damage:
+        ozone_damage_factors = calc_ozone_damage_factors(
+            gamma_1=inputs["gamma_1"],
+            gamma_2=inputs["gamma_2"],
+            gamma_3=inputs["gamma_3"],
+            O3up=inputs["O3up"],
+            O3up_acc=inputs["O3up_acc"],
+            fO3_d_prev=inputs["fO3_d_prev"],
+            td_dd=inputs["td_dd"],
+            t_lem=inputs["t_lem"],
+            t_lma=inputs["t_lma"],
+            is_daylight=inputs["is_daylight"] != 0,
+            hr=inputs["hr"],
+            opt_full_night_recovery=opt_full_night_recovery,
+        )
+    else:
+        ones = np.ones_like(inputs["td_dd"])
+        ozone_damage_factors = Damage_Factors(
+            fO3_h=ones,
+            fO3_d=ones,
+            fO3_l=ones,
+            f_LA=calc_f_LA(inputs["t_lem"], inputs["t_lma"], inputs["td_dd"]),
+            rO3=ones,
+        )
+    lifespan_with_ozone = calc_ozone_impact_on_lifespan(
+        t_lse_constant=inputs["t_lse_constant"],
+        t_lep=inputs["t_lep"],
+        t_lse=inputs["t_lse"],
+        t_lem=inputs["t_lem"],
+        fO3_l=ozone_damage_factors.fO3_l,
+    )
+    f_LS = calc_senescence_factor(
+        td_dd=inputs["td_dd"],
+        t_l_O3=lifespan_with_ozone.t_l,
+        t_lem=inputs["t_lem"],
+        t_lep_O3=lifespan_with_ozone.t_lep,
+        t_lse_O3=lifespan_with_ozone.t_lse,
+    )
+    return np.stack([
+        f_LS,
+        ozone_damage_factors.f_LA,
+        ozone_damage_factors.fO3_d,
+        ozone_damage_factors.fO3_h,
+        ozone_damage_factors.fO3_l,
+        lifespan_with_ozone.t_lep,
+        lifespan_with_ozone.t_lma,
+        lifespan_with_ozone.t_lse,
+        lifespan_with_ozone.t_l,
+    ], axis=1)
+
+
+def co2_concentration_in_stomata_coefficients(inputs: Dict[str, np.ndarray]) -> np.ndarray:
+    """Terms of the c_i iteration that do not depend on c_i or g_sto.
+
+    Returns
+    -------
+    np.ndarray
+        (n, N_TIMESTEP_COEFFICIENTS) coefficients in the fewert layout
+
+    """
+    return calc_timestep_coefficients(
+        V_cmax=inputs["V_cmax"],
+        Gamma_star=inputs["Gamma_star"],
+        K_C=inputs["K_C"],
+        K_O=inputs["K_O"],
+        g_sto_0=inputs["g_sto_0"],
+        g_bl=inputs["g_bl"],
+        e_a=inputs["e_a"],
+        e_sat_i=inputs["e_sat_i"],
+    )
+
+
+def co2_concentration_in_stomata_inner_iteration(
+    inputs: Dict[str, np.ndarray],
+    coefficients: np.ndarray,
+    invariants: np.ndarray,
+    c_i_in: np.ndarray,
+    g_sto_in: np.ndarray,
+    damping: float = 0.5,
+    precomputed_f_vpd: bool = False,
+) -> np.ndarray:
+    """A single c_i iteration using precalculated coefficients and invariants.
+
+    With precomputed_f_vpd f_VPD is taken from the inputs instead of calculated from g_sto_in.
+
+    Returns
+    -------
+    np.ndarray
+        (n, N_LOOP_OUT - 1) output in the fewert iteration layout
+
+    """
+    timestep_coefficients = unpack_timestep_coefficients(coefficients)
+    co2_assimilation_rate_values = calc_CO2_assimilation_rate(
+        c_i_in=c_i_in,
+        V_cmax=inputs["V_cmax"],
+        Gamma_star=inputs["Gamma_star"],
+        coefficients=timestep_coefficients,
+        fO3_d=invariants[:, 2],
+        f_LS=invariants[:, 0],
+        J=inputs["J"],
+        R_d=inputs["R_d"],
+    )
+    if precomputed_f_vpd:
+        f_VPD = inputs["f_VPD"]
+    else:
+        f_VPD = calc_humidity_defecit_fVPD(
+            g_sto_in=g_sto_in,
+            coefficients=timestep_coefficients,
+            D_0=inputs["D_0"],
+        )
+    g_sto = calc_stomatal_conductance(
+        coefficients=timestep_coefficients,
+        m=inputs["m"],
+        Gamma=inputs["Gamma"],
+        c_a=inputs["c_a"],
+        A_n=co2_assimilation_rate_values.A_n,
+        f_SW=inputs["f_SW"],
+        f_VPD=f_VPD,
+    )
+    co2_supply = calc_CO2_supply(
+        A_n=co2_assimilation_rate_values.A_n,
+        c_a=inputs["c_a"],
+        g_sto=g_sto,
+        coefficients=timestep_coefficients,
+    )
+
+    out = np.empty((len(c_i_in), N_LOOP_OUT - 1), dtype=c_i_in.dtype)
+    out[:, 0] = c_i_in - (c_i_in - co2_supply) * damping
+    out[:, 1] = np.abs(c_i_in - co2_supply)
+    out[:, 2] = g_sto
+    out[:, 3:5] = invariants[:, 0:2]
+    out[:, 5] = co2_assimilation_rate_values.A_n
+    out[:, 6] = co2_assimilation_rate_values.A_c
+    out[:, 7] = co2_assimilation_rate_values.A_p
+    out[:, 8] = co2_assimilation_rate_values.A_j
+    out[:, 9] = co2_assimilation_rate_values.A_n_limit_factor
+    out[:, 10:17] = invariants[:, 2:9]
+    out[:, 17] = f_VPD
+    return out
+
+
+def _co2_concentration_in_stomata_loop(
+    inputs: Dict[str, np.ndarray],
+    coefficients: np.ndarray,
+    invariants: np.ndarray,
+    c_i_in: np.ndarray,
+    g_sto_in: np.ndarray,
+    max_iterations: int,
+    tolerance: float,
+    damping: float,
+    solver: int,
+    precomputed_f_vpd: bool,
+) -> np.ndarray:
+    n = len(c_i_in)
+    dtype = c_i_in.dtype
+    out = np.zeros((n, N_LOOP_OUT), dtype=dtype)
+    out[:, 0] = c_i_in
+    out[:, 2] = g_sto_in
+    secant = solver == SOLVER_SECANT
+    # The secant solver takes the undamped co2 supply from each iteration
+    step_damping = 1.0 if secant else damping
+    c_i_prev = c_i_in.copy()
+    residual_prev = np.zeros(n, dtype=dtype)
+
+    # Only the elements that have not converged are evaluated each iteration
+    active = np.arange(n)
+    for k in range(1, max_iterations + 1):
+        if active.size == 0:
+            break
+        c_i = out[active, 0]
+        g_sto = out[active, 2]
+        step = co2_concentration_in_stomata_inner_iteration(
+            {name: values[active] for name, values in inputs.items()},
+            coefficients[active],
+            invariants[active],
+            c_i,
+            g_sto,
+            step_damping,
+            precomputed_f_vpd,
+        )
+        if secant:
+            residual = step[:, 0] - c_i
+            previous = residual_prev[active]
+            use_secant = (k > 1) & (residual != previous)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                c_i_secant = c_i - residual * (c_i - c_i_prev[active]) / (residual - previous)
+            step[:, 0] = np.where(use_secant, c_i_secant, c_i + damping * residual)
+            c_i_prev[active] = c_i
+            residual_prev[active] = residual
+        out[active, :N_LOOP_OUT - 1] = step
+        out[active, N_LOOP_OUT - 1] = k
+        done = step[:, 1] < tolerance
+        if secant:
+            g_sto_step = np.abs(step[:, 2] - g_sto)
+            done &= (g_sto_step * np.maximum(np.abs(c_i), 1) < tolerance * np.abs(step[:, 2])) | \
+                (g_sto_step <= G_STO_SETTLED_ULPS * np.spacing(step[:, 2]))
+        active = active[~done]
+    return out
+
+
+def co2_concentration_in_stomata_loop_batch(
+    params: np.ndarray,
+    c_i_in: Union[float, np.ndarray],
+    g_sto_in: Union[float, np.ndarray],
+    opt_full_night_recovery: bool,
+    max_iterations: int,
+    tolerance: float = 0.001,
+    damping: float = 0.5,
+    solver: int = SOLVER_RELAXATION,
+    use_o3_damage: bool = True,
+    precomputed_f_vpd: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Run the CO2 loop over a batch of packed inputs.
+
+    Equivalent to fewert co2_concentration_in_stomata_loop_batch_into with one row per element.
+
+    Parameters
+    ----------
+    params: np.ndarray
+        (N_CO2_CONSTANT_LOOP_INPUTS, n) packed inputs
+    c_i_in: Union[float, np.ndarray]
+        initial c_i for each element, or one value for all elements
+    g_sto_in: Union[float, np.ndarray]
+        initial g_sto for each element, or one value for all elements
+    opt_full_night_recovery: bool
+        If True leaf recovers every none daylight hour, else only at hr==0
+    max_iterations: int
+        maximum iterations of the CO2 loop
+    tolerance: float
+        c_i_diff convergence tolerance
+    damping: float
+        relaxation factor for the c_i update
+    solver: int
+        SOLVER_RELAXATION or SOLVER_SECANT
+    use_o3_damage: bool
+        If False fO3_h, fO3_d and fO3_l are 1
+    precomputed_f_vpd: bool
+        If True use the f_VPD input instead of calculating it every iteration
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        (n, N_LOOP_OUT) output, iterations and converged for each element
+
+    """
+    dtype = params.dtype
+    inputs = unpack_CO2_constant_loop_inputs(params)
+    out = _co2_concentration_in_stomata_loop(
+        inputs,
+        co2_concentration_in_stomata_coefficients(inputs),
+        co2_concentration_in_stomata_invariants(inputs, opt_full_night_recovery, use_o3_damage),
+        np.broadcast_to(np.asarray(c_i_in, dtype=dtype), params.shape[1:]).copy(),
+        np.broadcast_to(np.asarray(g_sto_in, dtype=dtype), params.shape[1:]).copy(),
+        max_iterations,
+        tolerance,
+        damping,
+        solver,
+        precomputed_f_vpd,
+    )
+    return out, np.rint(out[:, -1]).astype(np.int32), out[:, 1] < tolerance
+
+
+def run_hourly_series(
+    forcing: Dict[str, np.ndarray],
+    parameters: Dict[str, float],
+    fO3_d_0: float,
+    c_i_in: float,
+    g_sto_in: float,
+    opt_full_night_recovery: bool,
+    max_iterations: int,
+    tolerance: float = 0.001,
+    damping: float = 0.5,
+    solver: int = SOLVER_RELAXATION,
+    use_o3_damage: bool = True,
+    precomputed_f_vpd: bool = False,
+    dtype=np.float32,
+) -> np.ndarray:
+    """Run the CO2 loop over consecutive hours carrying the ozone state between hours.
+
+    Equivalent to fewert run_hourly_series_into. Only fO3_d carries between hours so it is
+    stepped through the hours first and every hour's c_i loop then runs as one batch.
+
+    Parameters
+    ----------
+    forcing: Dict[str, np.ndarray]
+        hourly arrays for every field in fortpy.ewert_batch.HOURLY_FORCING_FIELDS
+    parameters: Dict[str, float]
+        values for every field in fortpy.ewert_batch.SERIES_PARAMETER_FIELDS
+    fO3_d_0: float
+        fO3_d before the first hour
+
+    Returns
+    -------
+    np.ndarray
+        (nt, N_LOOP_OUT) output with one row per hour
+
+    """
+    inputs = {name: np.asarray(values, dtype=dtype) for name, values in forcing.items()}
+    nt = len(inputs["hr"])
+    for name, value in parameters.items():
+        inputs[name] = np.full(nt, value, dtype=dtype)
+    # Without ozone damage fO3_d is 1 every hour and fO3_d_prev is unused
+    fO3_d_prev = np.ones(nt, dtype=dtype)
+    if use_o3_damage:
+        fO3_h = calc_fO3_h(inputs["O3up"], inputs["gamma_1"], inputs["gamma_2"])
+        f_LA = calc_f_LA(inputs["t_lem"], inputs["t_lma"], inputs["td_dd"])
+        recovers = inputs["is_daylight"] == 0 if opt_full_night_recovery else inputs["hr"] == 0
+        fO3_d = dtype(fO3_d_0)
+        one = dtype(1)
+        # Scalar steps in dtype so each hour is rounded as in calc_ozone_damage_factors
+        for k, (h, la, r) in enumerate(zip(fO3_h, f_LA, recovers)):
+            fO3_d_prev[k] = fO3_d
+            fO3_d = (fO3_d + (one - fO3_d) * la) * h if r else fO3_d * h
+    inputs["fO3_d_prev"] = fO3_d_prev
+
+    return _co2_concentration_in_stomata_loop(
+        inputs,
+        co2_concentration_in_stomata_coefficients(inputs),
+        co2_concentration_in_stomata_invariants(inputs, opt_full_night_recovery, use_o3_damage),
+        np.full(nt, c_i_in, dtype=dtype),
+        np.full(nt, g_sto_in, dtype=dtype),
+        max_iterations,
+        tolerance,
+        damping,
+        solver,
+        precomputed_f_vpd,
+    )
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from fortpy import ewert_numpy
+from fortpy.backend import PRECISION_MODULES, get_build_profile, load_fewert, real_dtype
+from fortpy.benchmarks.inputs import sample_constant_inputs
+from fortpy.ewert_batch import HOURLY_FORCING_FIELDS, SERIES_PARAMETER_FIELDS
+from fortpy.ewert_types import (
+    CO2_CONSTANT_LOOP_INPUTS_FIELDS,
+    ModelOptions,
+    SOLVER_RELAXATION,
+    SOLVER_SECANT,
+    empty_co2_loop_state_records,
+    kernel_options,
+    records_as_fortran_buffer,
+    unpack_constant_inputs,
+)
+
+N_HOURS = 500
+MAX_ITERATIONS = 20
+
+
+def sample_series(dtype, seed=0):
+    """Hourly forcing and the constant inputs of a N_HOURS series."""
+    params = sample_constant_inputs(N_HOURS, seed, dtype)
+    rows = {name: params[i] for i, name in enumerate(CO2_CONSTANT_LOOP_INPUTS_FIELDS)}
+    forcing = {name: rows[name] for name in HOURLY_FORCING_FIELDS}
+    forcing["O3up_acc"] = np.cumsum(rows["O3up"]).astype(dtype)
+    forcing["is_daylight"] = rows["is_daylight"] != 0
+    forcing["hr"] = np.arange(N_HOURS, dtype=np.int32) % 24
+    return forcing, unpack_constant_inputs(params[:, 0])
+
+
+@pytest.mark.parametrize("model_options", [
+    ModelOptions(opt_full_night_recovery=True),
+    ModelOptions(opt_full_night_recovery=False),
+    ModelOptions(use_O3_damage=False, f_VPD_method="input"),
+], ids=["full_night_recovery", "midnight_recovery", "no_o3_fixed_fvpd"])
+@pytest.mark.parametrize("solver", [SOLVER_RELAXATION, SOLVER_SECANT])
+@pytest.mark.parametrize("precision", ["single", "double"])
+def test_run_hourly_series_matches_fewert(precision, solver, model_options):
+    pytest.importorskip(PRECISION_MODULES[precision])
+    if get_build_profile(precision) == "fast-math":
+        pytest.skip("fast-math builds do not round as the NumPy port does")
+    dtype = real_dtype(precision)
+    forcing, constant_inputs = sample_series(dtype)
+
+    out = empty_co2_loop_state_records(N_HOURS, dtype)
+    load_fewert(precision).run_hourly_series_into(
+        *[forcing[name] for name in HOURLY_FORCING_FIELDS],
+        *[getattr(constant_inputs, name) for name in SERIES_PARAMETER_FIELDS],
+        constant_inputs.fO3_d_prev,
+        0.0,
+        20000.0,
+        model_options.opt_full_night_recovery,
+        MAX_ITERATIONS,
+        records_as_fortran_buffer(out),
+        solver=solver,
+        **kernel_options(model_options),
+    )
+    expected = ewert_numpy.run_hourly_series(
+        forcing,
+        {name: getattr(constant_inputs, name) for name in SERIES_PARAMETER_FIELDS},
+        constant_inputs.fO3_d_prev,
+        0.0,
+        20000.0,
+        model_options.opt_full_night_recovery,
+        MAX_ITERATIONS,
+        solver=solver,
+        dtype=dtype,
+        **kernel_options(model_options),
+    )
+
+    # The port evaluates every expression in the same order and dtype so they agree exactly
+    np.testing.assert_array_equal(records_as_fortran_buffer(out).T, expected)
@@ -0,0 +1,298 @@
+"""Python mirrors of the types in src/ewert/ewert_types.f90.
+
+The fewert ``*_packed`` entry points take the constant loop inputs as a single
+float vector. The layout is the field order of CO2_Constant_Loop_Inputs (see
+CO2_CONSTANT_LOOP_INPUTS_FIELDS). is_daylight is stored as 1.0/0.0 and hr as a
+whole number.
+"""
+from dataclasses import dataclass, fields, astuple
+from typing import Dict, List, Sequence
+import numpy as np
+
+
+@dataclass
+class ModelOptions:
+    """Ewert model options.
+
+    opt_full_night_recovery: bool
+        If True leaf recovers every none daylight hour, else only at hr==0
+    use_O3_damage: bool
+        If true pass O3_acc and O3 into model which enables fO3_d and f_LS
+    f_VPD_method: str
+        If "photosynthesis" then f_VPD is calculated internally else should be provided as input
+    """
+    opt_full_night_recovery: bool = False
+    use_O3_damage: bool = True
+    f_VPD_method: str = "photosynthesis"
+
+
+SOLVER_RELAXATION = 0
+"""Damped fixed point update of c_i, the solver argument of the fewert loop entry points."""
+SOLVER_SECANT = 1
+"""Secant root find of co2_supply - c_i."""
+
+
+def kernel_options(model_options: ModelOptions) -> Dict[str, bool]:
+    """The fewert loop keyword arguments that select the kernel for model_options.
+
+    The names are lower case as f2py exposes them. opt_full_night_recovery is
+    positional in every fewert loop entry point so it is not included.
+    """
+    return {
+        "use_o3_damage": model_options.use_O3_damage,
+        "precomputed_f_vpd": model_options.f_VPD_method != "photosynthesis",
+    }
+
+
+@dataclass
+class CO2_loop_State:
+    """Variables that change over the CO2 convergence loop.
+
+    Parameters
+    ----------
+    c_i: float
+        CO2 concentration inside stomata [umol CO2]
+    c_i_diff: float
+        difference in c_i between iterations [ppm]
+    g_sto: float
+        stomatal conductance within the loop [umol/ m^2/s gsto]
+    f_LS: float
+        factor effect of leaf senescence on A_c [Dimensionless][0-1]
+    f_LA: float
+        factor effect of ... [Dimensionless][0-1]
+    A_n: float
+        eq 1 - CO2 Assimilation Rate  [umol m-2 s-1 CO2]
+    A_c: float
+        eq 8 - Rubisco activity limited rate of photosynthesis [umol m-2 s-1 CO2]
+    A_p: float
+        eq ? - Triose phosphate utilisation limited assimilation rate [umol m-2 s-1 CO2]
+    A_j: float
+        eq 3 - RuBP regeneration (electron transport) limited assimilation rate (A_q in paper)
+         [umol m-2 s-1 CO2]
+    A_n_limit_factor: str
+        The factor that has limited CO2 assimilation (A_c/A_j/A_p)
+    fO3_d: float
+        Hourly accumulated ozone impace factor [dimensionless][0-1] ___
+    fO3_h: float
+        Hourly ozone impace factor [dimensionless][0-1] ___
+    fO3_l: float
+        Ozone exposure [umol/m^2 gsto]
+    iterations: float
+        Number of iterations in convergence loop
+    t_lep_ozone: float
+        ozone adjusted t_lep
+    t_lma_ozone: float
+        ozone adjusted t_lma
+    t_lse_ozone: float
+        ozone adjusted t_lse
+    t_l_ozone: float
+        ozone adjusted t_l
+    f_VPD: float
+        Humidity Function (Leuning 1995)
+    """
+
+    c_i: float
+    c_i_diff: float
+    g_sto: float
+    f_LS: float = 0.0
+    f_LA: float = 0.0
+    A_n: float = 0.0
+    A_c: float = 0.0
+    A_p: float = 0.0
+    A_j: float = 0.0
+    A_n_limit_factor: str = None
+    fO3_d: float = 1.0
+    fO3_h: float = 1.0
+    fO3_l: float = 0.0
+    t_lep_ozone: float = None
+    t_lma_ozone: float = None
+    t_lse_ozone: float = None
+    t_l_ozone: float = None
+    f_VPD: float = None
+    iterations: int = 0
+
+
+@dataclass
+class CO2_Constant_Loop_Inputs():
+    """Inputs to the CO2_convergence loop that remain constant throughout loop.
+
+    Parameters
+    ------
+    D_0: float
+        "The VPD at which g_sto is reduced by a factor of 2" [Pa] (Leuning et al. 1998)
+    c_a: float
+        CO2 concentration [ppm]
+    e_a: float
+        Ambient vapour pressure [Pa]
+    g_bl: float
+        Boundary layer conductance to H2O vapour [umol m-2 PLA s-1 H2O?]
+    g_sto_0: float
+        Closed stomata conductance [umol/m^2/s CHECK GAS]
+    m: float
+        Species-specific sensitivity to An [dimensionless]
+    O3up: float
+        Ozone uptake (fst) [nmol O3 PLA m-2 s-1 O3]
+    O3up_acc: float
+        Accumulated Ozone uptake [nmol O3 PLA m-2 s-1 O3]
+    fO3_d_prev: float
+        Cumulative ozone effect from previous hour [dimensionless][0-1]
+    td_dd: float
+        difference between current td and td at season_Astart [Thermal Time]
+    gamma_1: float
+        short term damage coefficient [dimensionless]
+    gamma_2: float
+        short term damage coefficient [nmol m-2 O3?]
+    gamma_3: float
+        long term damage coefficient [umol m-2 O3?]
+    is_daylight: float
+        True when PAR > 50 W m^2 [bool]
+    t_lse_constant: float
+            t_lse as fraction of t_l [Thermal Time]
+    t_l_estimate: float
+        Full estimated life span of leaf in thermal time [Thermal Time]
+    t_lem: float
+        time from seed to end of emerging leaf/start of mature leaf [Thermal Time]
+    t_lep: float
+        Time during which leaf is expanding [Thermal Time]
+    t_lse: float
+        Time that the leaf is senescing [Thermal Time]
+    t_lma: float
+        Full time of mature leaf (t_lep + t_lse) [Thermal Time]
+    Gamma: float
+        CO2 compensation point [umol/mol CO2]
+    Gamma_star: float
+        # CO2 comp. point without day resp.  [umol/mol CO2]
+    V_cmax: float
+        Max catalytic rate of Rubisco [umol/(m^2*s) CO2]
+    K_C: float
+        Michaelis constant CO2 [umol/mol CHECK GAS]
+    K_O: float
+        Michaelis constant O2 [mmol/mol CHECK GAS]
+    J: float
+        Rate of electron transport [umol/(m^2*s) CHECK GAS]
+    R_d: float
+        day respiration rate [umol/(m^2*s) CHECK GAS]
+    e_sat_i: float
+        internal saturation vapour pressure[Pa]
+    hr: int
+        Hour of day [0-23]
+    f_SW: float
+        Soil water influence on photosynthesis [0-1]
+    f_VPD: float
+        VPD effect on gsto [fraction] (Optional if pre-calculated)
+    """
+
+    c_a: float
+    e_a: float
+    g_bl: float
+    g_sto_0: float
+    m: float
+    D_0: float
+    O3up: float
+    O3up_acc: float
+    fO3_d_prev: float
+    td_dd: float
+    gamma_1: float
+    gamma_2: float
+    gamma_3: float
+    is_daylight: bool
+    t_lse_constant: float
+    t_l_estimate: float
+    t_lem: float
+    t_lep: float
+    t_lse: float
+    t_lma: float
+    Gamma: float
+    Gamma_star: float
+    V_cmax: float
+    K_C: float
+    K_O: float
+    J: float
+    R_d: float
+    e_sat_i: float
+    hr: int
+    f_SW: float
+    f_VPD: float = None
+
+
+CO2_CONSTANT_LOOP_INPUTS_FIELDS: List[str] = [f.name for f in fields(CO2_Constant_Loop_Inputs)]
+"""Packed layout of CO2_Constant_Loop_Inputs. Matches N_CO2_CONSTANT_LOOP_INPUTS in Fortran."""
+
+N_CO2_CONSTANT_LOOP_INPUTS = len(CO2_CONSTANT_LOOP_INPUTS_FIELDS)
+
+
+def pack_constant_inputs(
+    constant_inputs: CO2_Constant_Loop_Inputs,
+    dtype=np.float32,
+) -> np.ndarray:
+    """Pack the constant loop inputs into a float vector.
+
+    The vector can be built once and passed to the fewert ``*_packed`` functions on every call.
+    dtype must match the REAL kind of the fewert build to avoid a copy per call.
+    A missing f_VPD is packed as nan as it is calculated inside the loop.
+    """
+    values = [np.nan if v is None else v for v in astuple(constant_inputs)]
+    return np.array(values, dtype=dtype)
+
+
+def unpack_constant_inputs(values: np.ndarray) -> CO2_Constant_Loop_Inputs:
+    """Inverse of pack_constant_inputs. nan f_VPD is unpacked as None."""
+    kwargs = dict(zip(CO2_CONSTANT_LOOP_INPUTS_FIELDS, np.asarray(values).tolist()))
+    kwargs["is_daylight"] = bool(kwargs["is_daylight"])
+    kwargs["hr"] = int(kwargs["hr"])
+    if np.isnan(kwargs["f_VPD"]):
+        kwargs["f_VPD"] = None
+    return CO2_Constant_Loop_Inputs(**kwargs)
+
+
+def pack_constant_inputs_batch(
+    constant_inputs: Sequence[CO2_Constant_Loop_Inputs],
+    dtype=np.float32,
+) -> np.ndarray:
+    """Pack a sequence of constant loop inputs into a (N_CO2_CONSTANT_LOOP_INPUTS, n) array.
+
+    The array is Fortran ordered so each column is one packed input vector.
+    """
+    packed = np.array([pack_constant_inputs(c, dtype) for c in constant_inputs], dtype=dtype)
+    return packed.reshape(-1, N_CO2_CONSTANT_LOOP_INPUTS).T
+
+
+CO2_LOOP_STATE_FIELDS: List[str] = [f.name for f in fields(CO2_loop_State)]
+"""Layout of the fewert loop output vector. Matches the order of CO2_loop_State."""
+
+
+def co2_loop_state_dtype(dtype=np.float32) -> np.dtype:
+    """Structured dtype with one field per CO2_loop_State field.
+
+    Records of this dtype have the memory layout of the fewert ``*_into`` out(19, n) buffers.
+    """
+    return np.dtype([(name, dtype) for name in CO2_LOOP_STATE_FIELDS])
+
+
+def empty_co2_loop_state_records(n: int, dtype=np.float32) -> np.ndarray:
+    """Allocate an output buffer for n loop results that can be reused between calls."""
+    return np.empty(n, dtype=co2_loop_state_dtype(dtype))
+
+
+def records_as_fortran_buffer(records: np.ndarray) -> np.ndarray:
+    """View a structured loop state array as the (19, n) Fortran ordered out buffer.
+
+    No data is copied so Fortran writes straight into records.
+    """
+    base_dtype = records.dtype[0]
+    if records.dtype != co2_loop_state_dtype(base_dtype):
+        raise ValueError(f"Expected records with dtype {co2_loop_state_dtype(base_dtype)}")
+    if not records.flags["C_CONTIGUOUS"]:
+        raise ValueError("records must be contiguous")
+    return records.view(base_dtype).reshape(len(records), len(CO2_LOOP_STATE_FIELDS)).T
+
+
+def as_columns(out: np.ndarray) -> Dict[str, np.ndarray]:
+    """Name the columns of a loop output without copying.
+
+    out can either be a structured loop state array or an (n, 19) output array such as
+    the one returned by co2_concentration_in_stomata_loop_batch.
+    """
+    if out.dtype.names:
+        return {name: out[name] for name in out.dtype.names}
+    return {name: out[:, i] for i, name in enumerate(CO2_LOOP_STATE_FIELDS)}
@@ -0,0 +1,239 @@
+"""Run the hourly ewert series over a grid of cells on a process pool.
+
+Forcing and output arrays live in multiprocessing shared memory. Workers attach to the
+shared blocks once when the pool starts, so only cell ranges are sent per task and no
+array is ever pickled. Each worker runs the compiled hourly series for every cell in its
+slice and writes the results straight into the shared output.
+
+Example
+-------
+    forcing = {name: np.ndarray (n_cells, n_hours) for name in HOURLY_FORCING_FIELDS}
+    out, stats = run_grid(forcing, constant_inputs, 0.0, 20000.0, ModelOptions(), 20)
+    print(format_worker_stats(stats))
+
+"""
+from dataclasses import dataclass
+from multiprocessing import Pool, shared_memory
+from typing import Any, Dict, List, Sequence, Tuple, Union
+import os
+import time
+import numpy as np
+
+from fortpy import ewert_batch
+from fortpy.ewert_batch import HOURLY_FORCING_FIELDS, REAL_DTYPE
+from fortpy.ewert_types import (
+    CO2_Constant_Loop_Inputs,
+    ModelOptions,
+    SOLVER_RELAXATION,
+    co2_loop_state_dtype,
+)
+
+
+@dataclass
+class SharedArraySpec:
+    """Everything a worker needs to attach to a shared array."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@dataclass
+class WorkerStats:
+    """Throughput of one worker process.
+
+    Parameters
+    ----------
+    pid: int
+        worker process id
+    cells: int
+        number of cells run by the worker
+    hours: int
+        number of cell hours run by the worker
+    seconds: float
+        time spent running cells [s]
+    """
+
+    pid: int
+    cells: int = 0
+    hours: int = 0
+    seconds: float = 0.0
+
+    @property
+    def cell_hours_per_second(self) -> float:
+        return self.hours / self.seconds if self.seconds else 0.0
+
+
+def _create_shared(arr: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedArraySpec]:
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    shared: np.ndarray = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    shared[...] = arr
+    return shm, SharedArraySpec(shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach_shared(spec: SharedArraySpec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(name=spec.name)
+    return shm, np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=shm.buf)
+
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(forcing_specs, out_spec, constant_inputs, run_kwargs):
+    blocks = []
+    forcing = {}
+    for name, spec in forcing_specs.items():
+        shm, forcing[name] = _attach_shared(spec)
+        blocks.append(shm)
+    shm, out = _attach_shared(out_spec)
+    blocks.append(shm)
+    _worker_state.update(
+        blocks=blocks,
+        forcing=forcing,
+        out=out.view(co2_loop_state_dtype(REAL_DTYPE)).reshape(out.shape[:2]),
+        constant_inputs=constant_inputs,
+        run_kwargs=run_kwargs,
+    )
+
+
+def _run_cells(cell_range: Tuple[int, int]) -> WorkerStats:
+    forcing = _worker_state["forcing"]
+    out = _worker_state["out"]
+    constant_inputs = _worker_state["constant_inputs"]
+    start_time = time.perf_counter()
+    for cell in range(*cell_range):
+        ewert_batch.run_hourly_series(
+            {name: values[cell] for name, values in forcing.items()},
+            constant_inputs[cell] if isinstance(constant_inputs, list) else constant_inputs,
+            out=out[cell],
+            **_worker_state["run_kwargs"],
+        )
+    cells = cell_range[1] - cell_range[0]
+    return WorkerStats(
+        pid=os.getpid(),
+        cells=cells,
+        hours=cells * out.shape[1],
+        seconds=time.perf_counter() - start_time,
+    )
+
+
+def _split_cells(n_cells: int, n_chunks: int) -> List[Tuple[int, int]]:
+    bounds = np.linspace(0, n_cells, min(n_chunks, n_cells) + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def run_grid(
+    forcing: Dict[str, np.ndarray],
+    constant_inputs: Union[CO2_Constant_Loop_Inputs, Sequence[CO2_Constant_Loop_Inputs]],
+    c_i_in: float,
+    g_sto_in: float,
+    model_options: ModelOptions,
+    max_iterations: int,
+    tolerance: float = 0.001,
+    damping: float = 0.5,
+    solver: int = SOLVER_RELAXATION,
+    processes: int = None,
+    chunks_per_process: int = 4,
+) -> Tuple[np.ndarray, List[WorkerStats]]:
+    """Run the hourly ewert series for every cell of a grid on a process pool.
+
+    Parameters
+    ----------
+    forcing: Dict[str, np.ndarray]
+        (n_cells, n_hours) arrays for every field in HOURLY_FORCING_FIELDS
+    constant_inputs: Union[CO2_Constant_Loop_Inputs, Sequence[CO2_Constant_Loop_Inputs]]
+        series parameters and initial ozone state, either shared by all cells or one per cell
+    c_i_in: float
+        initial c_i for each hour
+    g_sto_in: float
+        initial g_sto for each hour
+    model_options: ModelOptions
+        ewert model options
+    max_iterations: int
+        maximum iterations of the CO2 loop
+    tolerance: float
+        c_i_diff convergence tolerance
+    damping: float
+        relaxation factor for the c_i update
+    solver: int
+        SOLVER_RELAXATION or SOLVER_SECANT
+    processes: int
+        number of worker processes. Defaults to the number of cores.
+    chunks_per_process: int
+        cells are split into processes * chunks_per_process slices to balance the load
+
+    Returns
+    -------
+    Tuple[np.ndarray, List[WorkerStats]]
+        (n_cells, n_hours) CO2_loop_State structured array and the throughput of each worker
+
+    """
+    n_cells, n_hours = np.shape(forcing["hr"])
+    if not isinstance(constant_inputs, CO2_Constant_Loop_Inputs):
+        constant_inputs = list(constant_inputs)
+        if len(constant_inputs) != n_cells:
+            raise ValueError(f"Expected {n_cells} constant inputs, got {len(constant_inputs)}")
+    processes = processes or os.cpu_count()
+    run_kwargs = dict(
+        c_i_in=c_i_in,
+        g_sto_in=g_sto_in,
+        model_options=model_options,
+        max_iterations=max_iterations,
+        tolerance=tolerance,
+        damping=damping,
+        solver=solver,
+    )
+
+    blocks = []
+    try:
+        forcing_specs = {}
+        for name in HOURLY_FORCING_FIELDS:
+            values = np.asarray(forcing[name])
+            if values.dtype.kind == "f":
+                values = values.astype(REAL_DTYPE, copy=False)
+            if values.shape != (n_cells, n_hours):
+                raise ValueError(
+                    f"forcing {name} has shape {values.shape}, expected {(n_cells, n_hours)}")
+            shm, forcing_specs[name] = _create_shared(np.ascontiguousarray(values))
+            blocks.append(shm)
+        out_dtype = co2_loop_state_dtype(REAL_DTYPE)
+        out_shm, out_spec = _create_shared(np.zeros((n_cells, n_hours, 1), dtype=out_dtype))
+        out_spec.shape = (n_cells, n_hours, len(out_dtype.names))
+        out_spec.dtype = np.dtype(REAL_DTYPE).str
+        blocks.append(out_shm)
+
+        with Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(forcing_specs, out_spec, constant_inputs, run_kwargs),
+        ) as pool:
+            chunks = _split_cells(n_cells, processes * chunks_per_process)
+            chunk_stats = pool.map(_run_cells, chunks)
+
+        out: np.ndarray = np.ndarray((n_cells, n_hours), dtype=out_dtype, buffer=out_shm.buf)
+        out = out.copy()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    stats: Dict[int, WorkerStats] = {}
+    for s in chunk_stats:
+        worker = stats.setdefault(s.pid, WorkerStats(pid=s.pid))
+        worker.cells += s.cells
+        worker.hours += s.hours
+        worker.seconds += s.seconds
+    return out, list(stats.values())
+
+
+def format_worker_stats(stats: List[WorkerStats]) -> str:
+    """Format per worker throughput as a table."""
+    lines = [f"{'pid':>8} {'cells':>8} {'hours':>12} {'seconds':>10} {'cell hours/s':>14}"]
+    for s in stats:
+        lines.append(
+            f"{s.pid:>8} {s.cells:>8} {s.hours:>12} {s.seconds:>10.3f} "
+            f"{s.cell_hours_per_second:>14.0f}")
+    total_hours = sum(s.hours for s in stats)
+    wall = max((s.seconds for s in stats), default=0.0)
+    lines.append(f"total cell hours: {total_hours} slowest worker: {wall:.3f}s")
+    return "\n".join(lines)
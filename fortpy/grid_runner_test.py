@@ -0,0 +1,88 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+
+from fortpy import ewert_batch, grid_runner
+from fortpy.benchmarks.inputs import DEFAULT_MODEL_OPTIONS, sample_constant_inputs
+from fortpy.ewert_batch import HOURLY_FORCING_FIELDS, REAL_DTYPE
+from fortpy.ewert_types import CO2_CONSTANT_LOOP_INPUTS_FIELDS, unpack_constant_inputs
+
+N_CELLS = 5
+N_HOURS = 12
+MAX_ITERATIONS = 20
+
+
+def sample_grid(seed=0):
+    """(n_cells, n_hours) forcing and one set of constant inputs per cell."""
+    params = sample_constant_inputs(N_CELLS * N_HOURS, seed, REAL_DTYPE)
+    rows = {
+        name: params[i].reshape(N_CELLS, N_HOURS)
+        for i, name in enumerate(CO2_CONSTANT_LOOP_INPUTS_FIELDS)
+    }
+    rows["O3up_acc"] = np.cumsum(rows["O3up"], axis=1)
+    forcing = {name: rows[name] for name in HOURLY_FORCING_FIELDS}
+    forcing["is_daylight"] = rows["is_daylight"] != 0
+    forcing["hr"] = rows["hr"].astype(np.int32)
+    constant_inputs = [
+        unpack_constant_inputs(params[:, cell * N_HOURS]) for cell in range(N_CELLS)]
+    return forcing, constant_inputs
+
+
+def run_cell(forcing, constant_inputs, cell):
+    return ewert_batch.run_hourly_series(
+        {name: np.ascontiguousarray(values[cell]) for name, values in forcing.items()},
+        constant_inputs,
+        0.0,
+        20000.0,
+        DEFAULT_MODEL_OPTIONS,
+        MAX_ITERATIONS,
+    )
+
+
+@pytest.mark.parametrize("per_cell", [False, True])
+def test_run_grid_matches_run_hourly_series(per_cell):
+    forcing, constant_inputs = sample_grid()
+    if not per_cell:
+        constant_inputs = constant_inputs[0]
+    out, stats = grid_runner.run_grid(
+        forcing, constant_inputs, 0.0, 20000.0, DEFAULT_MODEL_OPTIONS, MAX_ITERATIONS,
+        processes=2, chunks_per_process=2)
+
+    assert out.shape == (N_CELLS, N_HOURS)
+    for cell in range(N_CELLS):
+        expected = run_cell(forcing, constant_inputs[cell] if per_cell else constant_inputs, cell)
+        np.testing.assert_array_equal(out[cell], expected)
+    assert sum(s.cells for s in stats) == N_CELLS
+    assert sum(s.hours for s in stats) == N_CELLS * N_HOURS
+
+
+def test_run_grid_raises_on_wrong_forcing_shape(monkeypatch):
+    forcing, constant_inputs = sample_grid()
+    # The last field is checked last so every other forcing block is already created
+    forcing[HOURLY_FORCING_FIELDS[-1]] = forcing[HOURLY_FORCING_FIELDS[-1]][:, :-1]
+    created = []
+    create_shared = grid_runner._create_shared
+
+    def recording_create_shared(arr):
+        shm, spec = create_shared(arr)
+        created.append(spec.name)
+        return shm, spec
+
+    monkeypatch.setattr(grid_runner, "_create_shared", recording_create_shared)
+    with pytest.raises(ValueError, match=HOURLY_FORCING_FIELDS[-1]):
+        grid_runner.run_grid(
+            forcing, constant_inputs, 0.0, 20000.0, DEFAULT_MODEL_OPTIONS, MAX_ITERATIONS,
+            processes=2)
+
+    assert len(created) == len(HOURLY_FORCING_FIELDS) - 1
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_run_grid_raises_on_wrong_constant_inputs_count():
+    forcing, constant_inputs = sample_grid()
+    with pytest.raises(ValueError, match="constant inputs"):
+        grid_runner.run_grid(
+            forcing, constant_inputs[:-1], 0.0, 20000.0, DEFAULT_MODEL_OPTIONS, MAX_ITERATIONS,
+            processes=2)
@@ -0,0 +1,89 @@
+"""Read the kernel counters of an instrumented fewert build.
+
+Build with `python build.py build --instrument` to record call counts and
+system_clock timers of each helper and a histogram of the c_i loop iteration
+counts. In the default build the counters are not compiled in and stay zero.
+
+Example
+-------
+    from fortpy import instrumentation
+    instrumentation.reset_instrumentation()
+    ...  # run fewert
+    print(instrumentation.format_instrumentation(instrumentation.read_instrumentation()))
+
+"""
+from typing import Dict
+import numpy as np
+
+from fortpy import backend
+
+TIMERS = [
+    "loop",
+    "invariants",
+    "coefficients",
+    "f_VPD",
+    "assimilation_rate",
+    "stomatal_conductance",
+    "co2_supply",
+    "solver_step",
+    "entry_point",
+]
+"""Timed sections in the order of the TIMER_* parameters of ewert_instrumentation."""
+
+
+def _check_instrumented(precision: str = None):
+    if not backend.is_instrumented(precision):
+        raise RuntimeError(
+            f"fewert ({backend.get_precision(precision)}) was not built with instrumentation. "
+            "Rebuild with `python build.py build --instrument`.")
+
+
+def reset_instrumentation(precision: str = None):
+    """Zero the kernel counters."""
+    _check_instrumented(precision)
+    backend.load_fewert(precision).reset_instrumentation()
+
+
+def read_instrumentation(precision: str = None) -> Dict:
+    """Read the kernel counters.
+
+    The counters accumulate over every call since the last reset, from all threads.
+
+    Returns
+    -------
+    Dict
+        calls: {timer: number of calls}
+        seconds: {timer: total time [s]}
+        iteration_histogram: np.ndarray where [k - 1] counts the loops that took k
+            iterations. The last bin also counts every loop that took more.
+        not_converged: number of loops that stopped at max_iterations
+
+    """
+    _check_instrumented(precision)
+    calls, ticks, histogram, not_converged, clock_rate = \
+        backend.load_fewert(precision).get_instrumentation()
+    return {
+        "calls": dict(zip(TIMERS, calls.tolist())),
+        "seconds": dict(zip(TIMERS, (ticks / float(clock_rate)).tolist())),
+        "iteration_histogram": np.asarray(histogram),
+        "not_converged": int(not_converged),
+    }
+
+
+def format_instrumentation(counters: Dict) -> str:
+    """Format read_instrumentation counters as a table of calls and time per call."""
+    lines = [f"{'timer':<22}{'calls':>12}{'total [s]':>12}{'per call [ns]':>15}"]
+    for timer in TIMERS:
+        calls = counters["calls"][timer]
+        seconds = counters["seconds"][timer]
+        per_call = seconds / calls * 1e9 if calls else 0.0
+        lines.append(f"{timer:<22}{calls:>12}{seconds:>12.4g}{per_call:>15.1f}")
+    histogram = counters["iteration_histogram"]
+    loops = int(histogram.sum())
+    if loops:
+        iterations = np.arange(1, len(histogram) + 1)
+        lines.append(
+            f"loops: {loops} mean iterations: {(histogram * iterations).sum() / loops:.2f} "
+            f"max iterations: {iterations[histogram > 0].max()} "
+            f"not converged: {counters['not_converged']}")
+    return "\n".join(lines)
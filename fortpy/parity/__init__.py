@@ -0,0 +1,8 @@
+"""Numerical parity of fewert against a Python reference over randomised inputs.
+
+Run from the command line::
+
+    python -m fortpy.parity -n 100000 --precision single
+    python -m fortpy.parity -n 1000 --reference pyDO3SE
+
+"""
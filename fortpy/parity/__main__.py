@@ -0,0 +1,76 @@
+"""Command line interface for the parity harness."""
+from dataclasses import replace
+import sys
+import click
+
+from fortpy.benchmarks.inputs import DEFAULT_MODEL_OPTIONS
+from fortpy.ewert_types import SOLVER_RELAXATION, SOLVER_SECANT
+from fortpy.parity.harness import (
+    PARITY_FIELDS,
+    REFERENCES,
+    ParityConfig,
+    check_parity,
+    format_report,
+)
+
+SOLVERS = {"relaxation": SOLVER_RELAXATION, "secant": SOLVER_SECANT}
+
+
+@click.command()
+@click.option("--size", "-n", default=10000, help="Number of sampled input vectors.")
+@click.option("--reference", type=click.Choice(list(REFERENCES)), default="numpy",
+              help="Python implementation to compare fewert against.")
+@click.option("--precision", default=None, help="fewert precision (single or double).")
+@click.option("--rtol", type=float, default=None,
+              help="Relative error bound. Defaults to the bound of the precision.")
+@click.option("--atol", type=float, default=None,
+              help="Absolute error bound. Defaults to the bound of the precision.")
+@click.option("--skip-field", "skip_fields", multiple=True, type=click.Choice(PARITY_FIELDS),
+              help="Field to leave out of the comparison. Can be given more than once.")
+@click.option("--field-rtol", "field_rtol", multiple=True, metavar="FIELD=RTOL",
+              help="Relative error bound of a single field e.g. c_i_diff=1. "
+                   "Can be given more than once.")
+@click.option("--solver", type=click.Choice(list(SOLVERS)), default="relaxation")
+@click.option("--damping", default=0.5, help="Relaxation factor of the c_i update.")
+@click.option("--max-iterations", default=20, help="Maximum iterations of the CO2 loop.")
+@click.option("--tolerance", default=0.001, help="c_i convergence tolerance.")
+@click.option("--seed", default=0, help="Input sampling seed.")
+@click.option("--full-night-recovery/--midnight-recovery", default=True,
+              help="Recover fO3_d every night hour or only at hr 0.")
+@click.option("--O3-damage/--no-O3-damage", "O3_damage", default=True,
+              help="Run with or without ozone damage.")
+@click.option("--f-vpd-method", default="photosynthesis",
+              help="photosynthesis calculates f_VPD in the loop, anything else uses the f_VPD input.")
+def cli(size, reference, precision, rtol, atol, skip_fields, field_rtol, solver, damping,
+        max_iterations, tolerance, seed, full_night_recovery, O3_damage, f_vpd_method):
+    """Compare fewert against a Python reference and fail if any error is over the bound."""
+    bounds = {}
+    for item in field_rtol:
+        name, _, value = item.partition("=")
+        if name not in PARITY_FIELDS or not value:
+            raise click.BadParameter(f"Expected FIELD=RTOL, got {item}", param_hint="--field-rtol")
+        bounds[name] = float(value)
+    config = ParityConfig(
+        precision=precision,
+        model_options=replace(
+            DEFAULT_MODEL_OPTIONS,
+            opt_full_night_recovery=full_night_recovery,
+            use_O3_damage=O3_damage,
+            f_VPD_method=f_vpd_method,
+        ),
+        max_iterations=max_iterations,
+        tolerance=tolerance,
+        damping=damping,
+        solver=SOLVERS[solver],
+    )
+    try:
+        report = check_parity(size, config, reference, rtol, atol, seed, skip_fields, bounds)
+    except ImportError as e:
+        raise click.ClickException(f"Cannot run the {reference} reference: {e}")
+    print(format_report(report))
+    if not report.passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,271 @@
+"""Run sampled inputs through fewert and a reference and measure the error per field."""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+
+from fortpy.backend import get_precision, load_fewert, real_dtype
+from fortpy.ewert_types import (
+    CO2_LOOP_STATE_FIELDS,
+    ModelOptions,
+    SOLVER_RELAXATION,
+    kernel_options,
+    unpack_constant_inputs,
+    empty_co2_loop_state_records,
+    records_as_fortran_buffer,
+)
+from fortpy.benchmarks.inputs import initial_loop_state, sample_constant_inputs
+
+LOOP_VALUE_FIELDS: List[str] = CO2_LOOP_STATE_FIELDS[:-1]
+"""The loop output fields other than iterations."""
+
+PARITY_FIELDS: List[str] = [f for f in LOOP_VALUE_FIELDS if f != "c_i_diff"]
+"""The loop output fields compared by default.
+
+iterations is reported separately. c_i_diff is left out as it is the size of the last
+c_i step, a residual below the tolerance that is dominated by rounding in single precision.
+"""
+
+PRECISION_TOLERANCES: Dict[str, Tuple[float, float]] = {
+    "single": (1e-3, 1e-3),
+    "double": (1e-8, 1e-6),
+}
+"""Default (rtol, atol) of each fewert precision against the float64 reference.
+
+In single precision c_i picks up to ~5e-4 relative error over the loop on extreme
+inputs, and the t_l*_ozone thermal times lose ~3e-4 absolute when they are
+differences of values around 1000.
+"""
+
+UNCONVERGED_FACTOR = 10
+"""Elements whose reference c_i_diff ends above UNCONVERGED_FACTOR * tolerance are left
+out of the comparison. Their loop has not converged and the state it stops in depends
+on the rounding of every iteration."""
+
+
+@dataclass
+class ParityConfig:
+    """Settings shared by the candidate and reference runs."""
+
+    precision: str = None
+    model_options: ModelOptions = None
+    max_iterations: int = 20
+    tolerance: float = 0.001
+    damping: float = 0.5
+    solver: int = SOLVER_RELAXATION
+
+
+@dataclass
+class FieldError:
+    """Error of one output field over all elements.
+
+    Parameters
+    ----------
+    field: str
+        CO2_loop_State field name
+    max_abs: float
+        max |candidate - reference|
+    max_rel: float
+        max |candidate - reference| / |reference| over the elements where reference != 0
+    failures: int
+        number of elements outside atol + rtol * |reference|
+    worst_index: int
+        element with the largest abs error
+    """
+
+    field: str
+    max_abs: float
+    max_rel: float
+    failures: int
+    worst_index: int
+
+
+@dataclass
+class ParityReport:
+    n: int
+    rtol: float
+    atol: float
+    field_rtol: Dict[str, float] = field(default_factory=dict)
+    errors: List[FieldError] = field(default_factory=list)
+    iteration_mismatches: int = 0
+    unconverged: int = 0
+
+    @property
+    def passed(self) -> bool:
+        return all(e.failures == 0 for e in self.errors)
+
+
+def run_fewert(packed: np.ndarray, config: ParityConfig) -> np.ndarray:
+    """Run the packed inputs through the fewert batch loop."""
+    fewert = load_fewert(config.precision)
+    dtype = real_dtype(config.precision)
+    state = initial_loop_state()
+    n = packed.shape[1]
+    out = empty_co2_loop_state_records(n, dtype)
+    fewert.co2_concentration_in_stomata_loop_batch_into(
+        np.asfortranarray(packed, dtype=dtype),
+        np.full(n, state.c_i, dtype=dtype),
+        np.full(n, state.g_sto, dtype=dtype),
+        config.model_options.opt_full_night_recovery,
+        config.max_iterations,
+        records_as_fortran_buffer(out),
+        tolerance=config.tolerance,
+        damping=config.damping,
+        solver=config.solver,
+        **kernel_options(config.model_options),
+    )
+    return out
+
+
+def run_numpy_reference(packed: np.ndarray, config: ParityConfig) -> np.ndarray:
+    """Run the packed inputs through fortpy.ewert_numpy in double precision."""
+    from fortpy import ewert_numpy
+    state = initial_loop_state()
+    out = empty_co2_loop_state_records(packed.shape[1], np.float64)
+    records_as_fortran_buffer(out)[...] = ewert_numpy.co2_concentration_in_stomata_loop_batch(
+        np.asarray(packed, dtype=np.float64),
+        state.c_i,
+        state.g_sto,
+        config.model_options.opt_full_night_recovery,
+        config.max_iterations,
+        tolerance=config.tolerance,
+        damping=config.damping,
+        solver=config.solver,
+        **kernel_options(config.model_options),
+    )[0].T
+    return out
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def run_pyDO3SE_reference(packed: np.ndarray, config: ParityConfig) -> np.ndarray:
+    """Run the packed inputs element by element through the pyDO3SE ewert iteration.
+
+    pyDO3SE only has the relaxation solver. Non numeric fields such as the
+    A_n_limit_factor label are stored as nan.
+    """
+    from pyDO3SE.plugins.gsto.ewert import ewert as pyEwert
+    if config.solver != SOLVER_RELAXATION:
+        raise ValueError("The pyDO3SE reference only supports SOLVER_RELAXATION")
+    out = empty_co2_loop_state_records(packed.shape[1], np.float64)
+    for i in range(packed.shape[1]):
+        constant_inputs = unpack_constant_inputs(packed[:, i])
+        state = initial_loop_state()
+        diff = np.inf
+        iterations = 0
+        while diff > config.tolerance and iterations < config.max_iterations:
+            state = pyEwert.co2_concentration_in_stomata_iteration(
+                constant_inputs, state, config.model_options)
+            diff = state.c_i_diff
+            iterations += 1
+        out[i] = tuple(_as_float(getattr(state, name, np.nan)) for name in LOOP_VALUE_FIELDS) + \
+            (iterations,)
+    return out
+
+
+REFERENCES: Dict[str, Callable[[np.ndarray, ParityConfig], np.ndarray]] = {
+    "numpy": run_numpy_reference,
+    "pyDO3SE": run_pyDO3SE_reference,
+}
+
+REFERENCE_SKIPPED_FIELDS: Dict[str, List[str]] = {
+    "numpy": [],
+    "pyDO3SE": ["A_n_limit_factor"],
+}
+"""Fields the reference does not calculate as a number."""
+
+
+def compare_outputs(
+    candidate: np.ndarray,
+    reference: np.ndarray,
+    rtol: float,
+    atol: float,
+    fields: List[str] = PARITY_FIELDS,
+    field_rtol: Dict[str, float] = None,
+    compared: np.ndarray = None,
+) -> List[FieldError]:
+    """Max abs and rel error of each field.
+
+    An element fails when |candidate - reference| > atol + rtol * |reference|, with rtol
+    taken from field_rtol for the fields it contains.
+    Elements where both are nan match and a nan on only one side fails.
+    Only the elements where compared is True are included, all of them if it is None.
+    """
+    field_rtol = field_rtol or {}
+    if compared is None:
+        compared = np.ones(len(candidate), dtype=bool)
+    errors = []
+    for name in fields:
+        bound = field_rtol.get(name, rtol)
+        c = candidate[name].astype(np.float64)
+        r = reference[name].astype(np.float64)
+        ignored = (np.isnan(c) & np.isnan(r)) | ~compared
+        abs_err = np.where(ignored, 0.0, np.abs(c - r))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel_err = np.where(r != 0, abs_err / np.abs(r), 0.0)
+        failed = ~(abs_err <= atol + bound * np.abs(r)) & ~ignored
+        worst = np.nan_to_num(abs_err, nan=np.inf)
+        errors.append(FieldError(
+            field=name,
+            max_abs=float(np.max(abs_err, initial=0.0)),
+            max_rel=float(np.max(rel_err, initial=0.0)),
+            failures=int(failed.sum()),
+            worst_index=int(np.argmax(worst)) if len(worst) else -1,
+        ))
+    return errors
+
+
+def check_parity(
+    n: int,
+    config: ParityConfig,
+    reference: str = "numpy",
+    rtol: float = None,
+    atol: float = None,
+    seed: int = 0,
+    skip_fields: Sequence[str] = (),
+    field_rtol: Dict[str, float] = None,
+    fields: List[str] = PARITY_FIELDS,
+) -> ParityReport:
+    """Sample n inputs and compare fewert against the reference.
+
+    rtol and atol default to the PRECISION_TOLERANCES of config.precision.
+    """
+    default_rtol, default_atol = PRECISION_TOLERANCES[get_precision(config.precision)]
+    rtol = default_rtol if rtol is None else rtol
+    atol = default_atol if atol is None else atol
+    packed = sample_constant_inputs(n, seed, np.float64)
+    # Both sides see the inputs rounded to the fewert precision
+    packed = packed.astype(real_dtype(config.precision)).astype(np.float64)
+    candidate = run_fewert(packed, config)
+    expected = REFERENCES[reference](packed, config)
+    skipped = set(skip_fields) | set(REFERENCE_SKIPPED_FIELDS[reference])
+    converged = ~(expected["c_i_diff"] > UNCONVERGED_FACTOR * config.tolerance)
+    return ParityReport(
+        n=n,
+        rtol=rtol,
+        atol=atol,
+        field_rtol=dict(field_rtol or {}),
+        errors=compare_outputs(
+            candidate, expected, rtol, atol,
+            [f for f in fields if f not in skipped], field_rtol, converged),
+        iteration_mismatches=int((candidate["iterations"] != expected["iterations"]).sum()),
+        unconverged=int((~converged).sum()),
+    )
+
+
+def format_report(report: ParityReport) -> str:
+    lines = [f"{'field':18} {'max abs':>11} {'max rel':>11} {'failures':>9} {'worst':>8}"]
+    for e in report.errors:
+        lines.append(f"{e.field:18} {e.max_abs:11.3e} {e.max_rel:11.3e} "
+                     f"{e.failures:9d} {e.worst_index:8d}")
+    lines.append(f"iterations differ for {report.iteration_mismatches} of {report.n} elements")
+    lines.append(f"{report.unconverged} unconverged elements are not compared "
+                 f"(reference c_i_diff > {UNCONVERGED_FACTOR} * tolerance)")
+    status = "PASSED" if report.passed else "FAILED"
+    overrides = "".join(f", {k} rtol={v:g}" for k, v in report.field_rtol.items())
+    lines.append(f"{status} (rtol={report.rtol:g}, atol={report.atol:g}{overrides})")
+    return "\n".join(lines)
@@ -0,0 +1,15 @@
+import pytest
+
+from fortpy.benchmarks.inputs import DEFAULT_MODEL_OPTIONS
+from fortpy.ewert_types import SOLVER_RELAXATION, SOLVER_SECANT
+from fortpy.parity.harness import ParityConfig, check_parity, format_report
+
+
+@pytest.mark.parametrize("solver", [SOLVER_RELAXATION, SOLVER_SECANT])
+@pytest.mark.parametrize("precision", ["single", "double"])
+def test_check_parity(precision, solver):
+    pytest.importorskip("fewert" if precision == "single" else "fewert64")
+    config = ParityConfig(precision=precision, model_options=DEFAULT_MODEL_OPTIONS, solver=solver)
+    report = check_parity(2000, config)
+    assert report.passed, format_report(report)
+    assert report.unconverged < report.n // 100
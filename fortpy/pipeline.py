@@ -0,0 +1,342 @@
+"""Run the src/pipeline model over hourly rows of external state.
+
+The rows are packed into a (N_EXTERNAL_STATE, n_rows) Fortran ordered array in the
+field order of ExternalStateShape so run_rows advances ModelState through every row
+in a single call instead of stepping through the f90wrap property setters per row.
+
+Importing this module also gives the f90wrap derived types ``to_numpy`` and
+``from_numpy`` methods that copy every field in one call (see DERIVED_TYPE_LAYOUTS).
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+import numpy as np
+
+from src.pipeline import f_pipeline
+
+REAL_DTYPE = np.float32
+"""The pipeline is built with default REAL kind."""
+
+HANDLE_DTYPE = np.int32
+"""f90wrap handles are integer(c_int) arrays."""
+
+EXTERNAL_STATE_FIELDS: List[str] = ["TsC"]
+"""Packed layout of ExternalStateShape. Matches N_EXTERNAL_STATE in Fortran."""
+
+MODEL_STATE_FIELDS: List[str] = ["hr", "td"]
+"""Packed layout of ModelState and the run_rows_trace trace rows. Matches N_MODEL_STATE."""
+
+CONFIG_FIELDS: List[str] = ["nL"]
+"""Packed layout of ConfigShape. Matches N_CONFIG in Fortran."""
+
+MODEL_STATE_DTYPE = np.dtype([(name, REAL_DTYPE) for name in MODEL_STATE_FIELDS])
+
+
+@dataclass
+class DerivedTypeLayout:
+    """The packed layout of an f90wrap derived type and the Fortran routines that copy it.
+
+    Parameters
+    ----------
+    fields: List[str]
+        Fortran field names in packed order
+    dtype: type
+        numpy dtype of the packed values
+    pack: Callable
+        pack_<type>(obj, values) copies one object into values
+    pack_handles: Callable
+        pack_<type>_handles(handles, values) copies the object behind each handle column
+    unpack_handles: Callable
+        unpack_<type>_handles(values, handles) overwrites the object behind each handle column
+    """
+
+    fields: List[str]
+    dtype: type
+    pack: Callable
+    pack_handles: Callable
+    unpack_handles: Callable
+
+
+DERIVED_TYPE_LAYOUTS: Dict[type, DerivedTypeLayout] = {
+    f_pipeline.model_state.ModelState: DerivedTypeLayout(
+        MODEL_STATE_FIELDS, REAL_DTYPE,
+        f_pipeline.model_state.pack_model_state,
+        f_pipeline.model_state.pack_model_state_handles,
+        f_pipeline.model_state.unpack_model_state_handles),
+    f_pipeline.external_state.ExternalStateShape: DerivedTypeLayout(
+        EXTERNAL_STATE_FIELDS, REAL_DTYPE,
+        f_pipeline.external_state.pack_external_state,
+        f_pipeline.external_state.pack_external_state_handles,
+        f_pipeline.external_state.unpack_external_state_handles),
+    f_pipeline.config.ConfigShape: DerivedTypeLayout(
+        CONFIG_FIELDS, np.int32,
+        f_pipeline.config.pack_config,
+        f_pipeline.config.pack_config_handles,
+        f_pipeline.config.unpack_config_handles),
+}
+
+
+def _get_layout(cls: type) -> DerivedTypeLayout:
+    try:
+        return DERIVED_TYPE_LAYOUTS[cls]
+    except KeyError:
+        raise TypeError(f"{cls.__name__} has no packed layout") from None
+
+
+def _handles(objs: Sequence) -> np.ndarray:
+    """Stack the f90wrap handles of objs into a (handle size, n) Fortran ordered array."""
+    return np.asfortranarray(np.stack([o._handle for o in objs], axis=1), dtype=HANDLE_DTYPE)
+
+
+def _check_values(values: np.ndarray, layout: DerivedTypeLayout, n: int) -> np.ndarray:
+    values = np.asfortranarray(values, dtype=layout.dtype)
+    values = values.reshape(len(layout.fields), -1, order="F")
+    if values.shape[1] != n:
+        raise ValueError(f"Expected values for {n} objects but got {values.shape[1]}")
+    return values
+
+
+def to_numpy(obj) -> np.ndarray:
+    """Copy every field of an f90wrap derived type into a packed vector in one call."""
+    layout = _get_layout(type(obj))
+    values: np.ndarray = np.empty(len(layout.fields), dtype=layout.dtype)
+    layout.pack(obj, values)
+    return values
+
+
+def from_numpy(obj, values: np.ndarray):
+    """Overwrite every field of an f90wrap derived type from a packed vector in one call."""
+    layout = _get_layout(type(obj))
+    layout.unpack_handles(_check_values(values, layout, 1), _handles([obj]))
+
+
+def to_numpy_batch(objs: Sequence) -> np.ndarray:
+    """Copy a sequence of derived types of the same class into a packed array in one call.
+
+    Returns
+    -------
+    np.ndarray
+        (n_fields, len(objs)) Fortran ordered packed values with one column per object
+
+    """
+    layout = _get_layout(type(objs[0]))
+    if any(type(o) is not type(objs[0]) for o in objs):
+        raise TypeError("All objects must have the same derived type")
+    values: np.ndarray = np.empty((len(layout.fields), len(objs)), dtype=layout.dtype, order="F")
+    layout.pack_handles(_handles(objs), values)
+    return values
+
+
+def from_numpy_batch(objs: Sequence, values: np.ndarray):
+    """Overwrite a sequence of derived types from the columns of a packed array in one call."""
+    layout = _get_layout(type(objs[0]))
+    if any(type(o) is not type(objs[0]) for o in objs):
+        raise TypeError("All objects must have the same derived type")
+    layout.unpack_handles(_check_values(values, layout, len(objs)), _handles(objs))
+
+
+# f_pipeline.py is regenerated on every build so the methods are attached here
+for _cls in DERIVED_TYPE_LAYOUTS:
+    setattr(_cls, "to_numpy", to_numpy)
+    setattr(_cls, "from_numpy", from_numpy)
+
+
+class HandlePool:
+    """Reuse f90wrap derived type instances instead of allocating a new one per temporary.
+
+    Constructing an f90wrap derived type allocates it in Fortran and its finalizer frees it.
+    A pool keeps released instances alive and hands them out again, overwriting every field
+    with reset_values in one from_numpy_batch call.
+
+    Parameters
+    ----------
+    cls: type
+        f90wrap derived type with an entry in DERIVED_TYPE_LAYOUTS
+    size: int
+        number of instances to allocate up front
+    reset_values: np.ndarray
+        packed field values given to every acquired instance. Defaults to zeros.
+
+    Examples
+    --------
+    pool = HandlePool(f_pipeline.model_state.ModelState, size=8)
+    with pool.borrow() as state:
+        state.hr = 3
+        final_state, _ = run_rows(state, external_state)
+
+    """
+
+    def __init__(self, cls: type, size: int = 0, reset_values: np.ndarray = None):
+        self.cls = cls
+        self.layout = _get_layout(cls)
+        if reset_values is None:
+            reset_values = np.zeros(len(self.layout.fields), dtype=self.layout.dtype)
+        # Kept in the (n_fields, 1) layout of unpack_<type>_handles so acquire does not convert it
+        self._reset_column = _check_values(reset_values, self.layout, 1)
+        self._free = [cls() for _ in range(size)]
+        self.created = size
+        self.reused = 0
+
+    def __len__(self) -> int:
+        """Number of instances available without allocating."""
+        return len(self._free)
+
+    def acquire_many(self, n: int) -> List:
+        """Take n reset instances, allocating any the pool does not have."""
+        objs = [self._free.pop() for _ in range(min(n, len(self._free)))]
+        self.reused += len(objs)
+        self.created += n - len(objs)
+        objs += [self.cls() for _ in range(n - len(objs))]
+        if objs:
+            from_numpy_batch(objs, np.repeat(self._reset_column, n, axis=1))
+        return objs
+
+    def acquire(self):
+        """Take a reset instance, allocating one if the pool is empty."""
+        if not self._free:
+            self.created += 1
+            obj = self.cls()
+        else:
+            self.reused += 1
+            obj = self._free.pop()
+        self.layout.unpack_handles(self._reset_column, obj._handle.reshape(-1, 1))
+        return obj
+
+    def release(self, *objs):
+        """Return instances to the pool. They must not be used by the caller afterwards."""
+        for obj in objs:
+            if type(obj) is not self.cls:
+                raise TypeError(f"Expected {self.cls.__name__} but got {type(obj).__name__}")
+        self._free.extend(objs)
+
+    def borrow(self) -> "_Borrowed":
+        """Acquire an instance for the duration of a with block."""
+        return _Borrowed(self)
+
+    @contextmanager
+    def borrow_many(self, n: int) -> Iterator[List]:
+        """Acquire n instances for the duration of a with block."""
+        objs = self.acquire_many(n)
+        try:
+            yield objs
+        finally:
+            self.release(*objs)
+
+
+class _Borrowed:
+    """Context manager of HandlePool.borrow.
+
+    A class rather than contextlib.contextmanager as it is cheaper to enter in hot loops.
+    """
+
+    __slots__ = ("pool", "obj")
+
+    def __init__(self, pool: HandlePool):
+        self.pool = pool
+        self.obj = None
+
+    def __enter__(self):
+        self.obj = self.pool.acquire()
+        return self.obj
+
+    def __exit__(self, *exc_info):
+        self.pool.release(self.obj)
+        self.obj = None
+
+
+def pack_external_state(external_state: Dict[str, np.ndarray]) -> np.ndarray:
+    """Pack per field arrays of external state into the run_rows layout.
+
+    Parameters
+    ----------
+    external_state: Dict[str, np.ndarray]
+        one array per EXTERNAL_STATE_FIELDS field with one value per row e.g. TsC per hour
+
+    Returns
+    -------
+    np.ndarray
+        (N_EXTERNAL_STATE, n_rows) Fortran ordered packed external state
+
+    """
+    missing = set(EXTERNAL_STATE_FIELDS) - set(external_state)
+    if missing:
+        raise ValueError(f"Missing external state fields: {sorted(missing)}")
+    n_rows = len(external_state[EXTERNAL_STATE_FIELDS[0]])
+    packed = np.empty((len(EXTERNAL_STATE_FIELDS), n_rows), dtype=REAL_DTYPE, order="F")
+    for i, name in enumerate(EXTERNAL_STATE_FIELDS):
+        packed[i] = external_state[name]
+    return packed
+
+
+def run_rows(
+    initial_state: Any,
+    external_state: np.ndarray,
+    trace: bool = False,
+) -> Tuple[Any, np.ndarray]:
+    """Advance the model state through every row of external state.
+
+    Parameters
+    ----------
+    initial_state: ModelState
+        model state before the first row
+    external_state: np.ndarray
+        (N_EXTERNAL_STATE, n_rows) packed external state from pack_external_state
+    trace: bool
+        If True also return the model state after every row
+
+    Returns
+    -------
+    Tuple[ModelState, np.ndarray]
+        final model state and a MODEL_STATE_DTYPE structured array with one record per row
+        or None if trace is False
+
+    """
+    external_state = np.asfortranarray(external_state, dtype=REAL_DTYPE)
+    if external_state.ndim != 2 or external_state.shape[0] != len(EXTERNAL_STATE_FIELDS):
+        raise ValueError(
+            f"Expected ({len(EXTERNAL_STATE_FIELDS)}, n_rows) external state "
+            f"but got {external_state.shape}")
+    if not trace:
+        return f_pipeline.pipeline.run_rows(initial_state, external_state), None
+    records = np.empty(external_state.shape[1], dtype=MODEL_STATE_DTYPE)
+    # The records are viewed as the (N_MODEL_STATE, n_rows) buffer so Fortran writes into them
+    buffer = records.view(REAL_DTYPE).reshape(len(records), len(MODEL_STATE_FIELDS)).T
+    final_state = f_pipeline.pipeline.run_rows_trace(initial_state, external_state, buffer)
+    return final_state, records
+
+
+def allocate_model_state_arrays(n_cells: int) -> Any:
+    """Allocate a structure of arrays ModelState with one element per grid cell.
+
+    Each field (e.g. ``states.hr``) is a NumPy view of the contiguous Fortran array so
+    reading or writing it does not copy.
+    """
+    states = f_pipeline.model_state.ModelStateArrays()
+    f_pipeline.model_state.allocate_model_state_arrays(states, n_cells)
+    return states
+
+
+def allocate_external_state_arrays(
+    n_cells: int,
+    n_rows: int,
+) -> Any:
+    """Allocate a structure of arrays ExternalStateShape.
+
+    Each field (e.g. ``external_states.tsc``) is a NumPy view of a (n_cells, n_rows)
+    Fortran ordered array so the cells of a row are contiguous.
+    """
+    external_states = f_pipeline.external_state.ExternalStateArrays()
+    f_pipeline.external_state.allocate_external_state_arrays(external_states, n_cells, n_rows)
+    return external_states
+
+
+def run_rows_cells(
+    states: Any,
+    external_states: Any,
+):
+    """Advance every grid cell of states in place through every row of external_states."""
+    n_cells = len(states.hr)
+    if external_states.tsc.shape[0] != n_cells:
+        raise ValueError(f"external_states has {external_states.tsc.shape[0]} cells "
+                         f"but states has {n_cells}")
+    f_pipeline.pipeline.run_rows_cells(states, external_states)
@@ -0,0 +1,185 @@
+import numpy as np
+import pytest
+
+pipeline = pytest.importorskip("fortpy.pipeline", reason="_pipeline is not built")
+f_pipeline = pipeline.f_pipeline
+
+
+def make_model_state(hr, td):
+    state = f_pipeline.model_state.ModelState()
+    state.hr = hr
+    state.td = td
+    return state
+
+
+def make_external_state(TsC):
+    external_state = f_pipeline.external_state.ExternalStateShape()
+    external_state.tsc = TsC
+    return external_state
+
+
+def make_config(nL):
+    config = f_pipeline.config.ConfigShape()
+    config.nl = nL
+    return config
+
+
+def test_to_numpy_from_numpy_round_trip():
+    state = make_model_state(5.0, 12.5)
+    np.testing.assert_array_equal(state.to_numpy(), [5.0, 12.5])
+    state.from_numpy(np.array([7.0, 3.25], dtype=pipeline.REAL_DTYPE))
+    assert (state.hr, state.td) == (7.0, 3.25)
+
+    external_state = make_external_state(21.5)
+    np.testing.assert_array_equal(external_state.to_numpy(), [21.5])
+    external_state.from_numpy(np.array([-4.0], dtype=pipeline.REAL_DTYPE))
+    assert external_state.tsc == -4.0
+
+    config = make_config(3)
+    values = config.to_numpy()
+    assert values.dtype == np.int32
+    np.testing.assert_array_equal(values, [3])
+    config.from_numpy(np.array([8], dtype=np.int32))
+    assert config.nl == 8
+
+
+@pytest.mark.parametrize("make, values", [
+    (make_model_state, [[0.0, 1.5], [23.0, 40.25], [11.0, 0.0]]),
+    (make_external_state, [[-3.5], [0.0], [28.75]]),
+    (make_config, [[1], [4], [9]]),
+], ids=["ModelState", "ExternalStateShape", "ConfigShape"])
+def test_to_numpy_batch_from_numpy_batch_round_trip(make, values):
+    objs = [make(*v) for v in values]
+    packed = pipeline.to_numpy_batch(objs)
+    assert packed.shape == (len(values[0]), len(objs))
+    np.testing.assert_array_equal(packed, np.array(values).T)
+
+    # Each column must land in its own object
+    pipeline.from_numpy_batch(objs, packed[:, ::-1])
+    np.testing.assert_array_equal(pipeline.to_numpy_batch(objs), np.array(values[::-1]).T)
+    for obj, v in zip(objs, values[::-1]):
+        np.testing.assert_array_equal(obj.to_numpy(), v)
+
+
+def test_from_numpy_batch_raises_on_wrong_column_count():
+    states = [make_model_state(0.0, 0.0) for _ in range(3)]
+    with pytest.raises(ValueError, match="3 objects"):
+        pipeline.from_numpy_batch(states, np.zeros((2, 2), dtype=pipeline.REAL_DTYPE))
+    with pytest.raises(ValueError, match="3 objects"):
+        pipeline.from_numpy_batch(states, np.zeros((2, 4), dtype=pipeline.REAL_DTYPE))
+    np.testing.assert_array_equal(pipeline.to_numpy_batch(states), np.zeros((2, 3)))
+
+
+def test_mixed_types_raise_type_error():
+    with pytest.raises(TypeError):
+        pipeline.to_numpy_batch([make_model_state(0.0, 0.0), make_config(1)])
+
+
+def test_handle_pool_resets_reused_instances():
+    pool = pipeline.HandlePool(f_pipeline.model_state.ModelState, size=2)
+    with pool.borrow() as state:
+        state.hr = 6.0
+        state.td = 9.5
+    with pool.borrow_many(2) as states:
+        for state in states:
+            state.hr = 1.0
+            state.td = 2.0
+        np.testing.assert_array_equal(pipeline.to_numpy_batch(states), [[1.0, 1.0], [2.0, 2.0]])
+    for state in pool.acquire_many(2):
+        np.testing.assert_array_equal(state.to_numpy(), [0.0, 0.0])
+
+    reset_values = np.array([3.0, 4.5], dtype=pipeline.REAL_DTYPE)
+    pool = pipeline.HandlePool(f_pipeline.model_state.ModelState, size=1, reset_values=reset_values)
+    state = pool.acquire()
+    state.td = 100.0
+    pool.release(state)
+    assert pool.acquire() is state
+    np.testing.assert_array_equal(state.to_numpy(), reset_values)
+
+
+def test_handle_pool_counts_created_and_reused():
+    pool = pipeline.HandlePool(f_pipeline.model_state.ModelState, size=2)
+    assert (pool.created, pool.reused, len(pool)) == (2, 0, 2)
+    with pool.borrow():
+        assert (pool.created, pool.reused, len(pool)) == (2, 1, 1)
+    assert len(pool) == 2
+    with pool.borrow_many(3):
+        assert (pool.created, pool.reused, len(pool)) == (3, 3, 0)
+    assert len(pool) == 3
+    with pool.borrow_many(2), pool.borrow(), pool.borrow():
+        assert (pool.created, pool.reused, len(pool)) == (4, 6, 0)
+    assert len(pool) == 4
+    assert pool.acquire_many(0) == []
+    assert (pool.created, pool.reused) == (4, 6)
+
+
+def test_handle_pool_release_checks_type():
+    pool = pipeline.HandlePool(f_pipeline.model_state.ModelState)
+    state = pool.acquire()
+    with pytest.raises(TypeError, match="Expected ModelState"):
+        pool.release(state, make_config(1))
+    assert len(pool) == 0
+    pool.release(state)
+    assert len(pool) == 1
+
+
+def sample_external_state(n_rows, seed=0):
+    TsC = np.random.default_rng(seed).uniform(-5.0, 30.0, n_rows)
+    return pipeline.pack_external_state({"TsC": TsC})
+
+
+def test_run_rows_trace_matches_run_rows_and_row_by_row_stepping():
+    external_state = sample_external_state(50)
+    initial_state = make_model_state(20.0, 1.0)
+
+    final_state, records = pipeline.run_rows(initial_state, external_state)
+    assert records is None
+    traced_state, records = pipeline.run_rows(initial_state, external_state, trace=True)
+    np.testing.assert_array_equal(traced_state.to_numpy(), final_state.to_numpy())
+    np.testing.assert_array_equal(initial_state.to_numpy(), [20.0, 1.0])
+
+    stepped = []
+    state = initial_state
+    for row in range(external_state.shape[1]):
+        state, _ = pipeline.run_rows(state, external_state[:, row:row + 1])
+        stepped.append(state.to_numpy())
+    traced = np.stack([records[name] for name in pipeline.MODEL_STATE_FIELDS])
+    np.testing.assert_array_equal(traced, np.stack(stepped, axis=1))
+    np.testing.assert_array_equal(state.to_numpy(), final_state.to_numpy())
+
+
+@pytest.mark.parametrize("shape", [(2, 2), (1, 3), (3, 3)])
+def test_run_rows_trace_rejects_wrong_trace_shape(shape):
+    external_state = sample_external_state(3)
+    trace = np.full(shape, -1.0, dtype=pipeline.REAL_DTYPE, order="F")
+    with pytest.raises(RuntimeError, match="trace must be"):
+        f_pipeline.pipeline.run_rows_trace(make_model_state(0.0, 0.0), external_state, trace)
+    np.testing.assert_array_equal(trace, -1.0)
+
+
+def test_run_rows_cells_updates_state_arrays_in_place():
+    n_cells, n_rows = 4, 30
+    states = pipeline.allocate_model_state_arrays(n_cells)
+    external_states = pipeline.allocate_external_state_arrays(n_cells, n_rows)
+    hr, td = states.hr, states.td
+    assert np.shares_memory(hr, states.hr)
+    hr[:] = [0.0, 5.0, 12.0, 23.0]
+    td[:] = [0.0, 1.0, 2.5, 10.0]
+    initial_states = [make_model_state(h, t) for h, t in zip(hr, td)]
+    TsC = external_states.tsc
+    TsC[...] = np.random.default_rng(1).uniform(-5.0, 30.0, (n_cells, n_rows))
+
+    pipeline.run_rows_cells(states, external_states)
+
+    assert np.shares_memory(hr, states.hr)
+    assert np.shares_memory(td, states.td)
+    for cell, initial_state in enumerate(initial_states):
+        final_state, _ = pipeline.run_rows(initial_state, TsC[cell:cell + 1])
+        np.testing.assert_array_equal([hr[cell], td[cell]], final_state.to_numpy())
+
+
+def test_run_rows_cells_rejects_mismatched_cells():
+    states = pipeline.allocate_model_state_arrays(3)
+    external_states = pipeline.allocate_external_state_arrays(2, 5)
+    with pytest.raises(ValueError, match="2 cells"):
+        pipeline.run_rows_cells(states, external_states)
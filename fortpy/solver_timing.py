@@ -0,0 +1,80 @@
+# %%
+"""Compare the c_i solver modes of co2_concentration_in_stomata_loop_batch.
+
+Runs the same randomised batch through each solver and reports the mean and
+max number of iterations (one iteration is one evaluation of
+calc_CO2_assimilation_rate and calc_stomatal_conductance), the wall time and
+the max c_i error against a tightly converged reference run.
+"""
+from timeit import repeat
+import numpy as np
+from fewert import ewert as fewert
+from fortpy.ewert_types import SOLVER_RELAXATION, SOLVER_SECANT
+
+TOLERANCE = 0.001
+MAX_ITERATIONS = 100
+N = 20000
+
+t_lem_constant = 0.15
+t_lse_constant = 0.33
+t_l = 800
+t_lem = t_l * t_lem_constant
+t_lma = t_l - t_lem
+t_lse = t_lma * t_lse_constant
+t_lep = t_l - (t_lem + t_lse)
+
+rng = np.random.default_rng(0)
+ones = np.ones(N)
+
+inputs = [
+    391.0 * ones,  # c_a
+    rng.uniform(500, 2000, N),  # e_a
+    1469999.0 * ones,  # g_bl
+    20000 * ones,  # g_sto_0
+    8.12 * ones,  # m
+    2.27 * ones,  # D_0
+    rng.uniform(0, 40, N),  # O3up
+    300 * ones,  # O3up_acc
+    0.89 * ones,  # fO3_d_prev
+    rng.uniform(0, 900, N),  # td_dd
+    0.06 * ones,  # gamma_1
+    0.0045 * ones,  # gamma_2
+    0.5 * ones,  # gamma_3
+    rng.random(N) > 0.3,  # is_daylight
+    t_lse_constant * ones,  # t_lse_constant
+    t_l * ones,  # t_l_estimate
+    t_lem * ones,  # t_lem
+    t_lep * ones,  # t_lep
+    t_lse * ones,  # t_lse
+    t_lma * ones,  # t_lma
+    34.277 * ones,  # Gamma
+    32.95 * ones,  # Gamma_star
+    rng.uniform(60, 140, N),  # V_cmax
+    234.42 * ones,  # K_C
+    216.75 * ones,  # K_O
+    rng.uniform(150, 350, N),  # J
+    0.32 * ones,  # R_d
+    2339.05 * ones,  # e_sat_i
+    rng.integers(0, 24, N),  # hr
+    1.0 * ones,  # f_SW
+    1.0 * ones,  # f_VPD
+    0.0 * ones,  # c_i_in
+    20000 * ones,  # g_sto_in
+    True,  # opt_full_night_recovery
+]
+
+
+def run(solver, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    return fewert.co2_concentration_in_stomata_loop_batch(
+        *inputs, max_iterations, tolerance=tolerance, solver=solver)
+
+
+# %%
+reference, _, _ = run(SOLVER_RELAXATION, tolerance=1e-6, max_iterations=5000)
+
+for name, solver in [("relaxation", SOLVER_RELAXATION), ("secant", SOLVER_SECANT)]:
+    out, iterations, converged = run(solver)
+    wall_time = min(repeat(lambda: run(solver), number=1, repeat=5))
+    c_i_error = np.abs(out[:, 0] - reference[:, 0]).max()
+    print(f"{name:12} iterations mean: {iterations.mean():6.2f} max: {iterations.max():4d} "
+          f"converged: {converged.mean():.3f} time: {wall_time:.4f}s max c_i error: {c_i_error:.5f}")
@@ -1,7 +1,7 @@
 """Setup main.
 
 
-NOTE: Must run `./build_fortran` first
+NOTE: Must run `./build.py build` first
 """
 
 import setuptools
@@ -1,12 +1,269 @@
+! This file is preprocessed before f2py reads it so the generated wrappers see
+! a literal REAL kind that kind_map can map ('4' -> float, '8' -> double).
+#ifdef EWERT_REAL64
+#define wp 8
+#else
+#define wp 4
+#endif
+#include "ewert_instrumentation.h"
 module ewert
     use ewert_types
     use ewert_helpers
+    ! The c_i loop itself and the SOLVER_RELAXATION/SOLVER_SECANT modes live in
+    ! ewert_kernels, one kernel per ModelOptions combination.
+    use ewert_kernels
+    use ewert_instrumentation
     implicit none
 
+    ! OpenMP threads used by the batched entry points. 0 uses the OpenMP default.
+    ! Set with set_num_threads so it applies whichever thread calls the batch.
+    INTEGER :: batch_num_threads = 0
+
     contains
 
+    subroutine set_num_threads(num_threads)
+        ! Set the number of OpenMP threads used by the batched entry points.
+        !
+        ! 0 resets to the OpenMP default (OMP_NUM_THREADS or all cores).
+        ! Has no effect when built without OpenMP.
+        INTEGER, intent(in) :: num_threads
+
+        batch_num_threads = max(num_threads, 0)
+    end subroutine
+
+    function get_num_threads() result(num_threads)
+        ! The number of OpenMP threads the batched entry points will use.
+        !$ use omp_lib
+        INTEGER :: num_threads
+
+        num_threads = 1
+        !$ num_threads = omp_get_max_threads()
+        !$ if (batch_num_threads > 0) num_threads = batch_num_threads
+    end function
+
+    subroutine get_instrumentation(calls, ticks, histogram, loops_not_converged, clock_rate)
+        ! Read the kernel counters of ewert_instrumentation.
+        !
+        ! They stay zero unless built with `build.py build --instrument`.
+        ! Seconds are ticks / clock_rate. See fortpy.instrumentation for the timer names.
+        ! f2py can not read N_TIMERS (9) and N_ITERATION_BINS (100) from ewert_instrumentation.
+        INTEGER(8), dimension(9), intent(out) :: calls
+        INTEGER(8), dimension(9), intent(out) :: ticks
+        INTEGER(8), dimension(100), intent(out) :: histogram
+        INTEGER(8), intent(out) :: loops_not_converged
+        INTEGER(8), intent(out) :: clock_rate
+
+        call instrumentation_read(calls, ticks, histogram, loops_not_converged, clock_rate)
+    end subroutine
+
+    subroutine reset_instrumentation()
+        ! Zero the kernel counters of ewert_instrumentation.
+        call instrumentation_reset()
+    end subroutine
+
+
+    EWERT_PURE Function co2_concentration_in_stomata_invariants(&
+        const_O3up, &
+        const_O3up_acc, &
+        const_fO3_d_prev, &
+        const_td_dd, &
+        const_gamma_1, &
+        const_gamma_2, &
+        const_gamma_3, &
+        const_is_daylight, &
+        const_t_lse_constant, &
+        const_t_lem, &
+        const_t_lep, &
+        const_t_lse, &
+        const_t_lma, &
+        const_hr, &
+        opt_full_night_recovery, &
+        use_O3_damage) result(invariants)
+        ! Factors that do not depend on c_i or g_sto.
+        !
+        ! These only need calculating once per timestep before the c_i loop.
+        ! use_O3_damage=.false. runs without ozone damage (fO3_h = fO3_d = fO3_l = 1).
+        ! invariants = [f_LS, f_LA, fO3_d, fO3_h, fO3_l,
+        !               t_lep_ozone, t_lma_ozone, t_lse_ozone, t_l_ozone]
+
+        REAL(wp),  intent(in) :: const_O3up
+        REAL(wp),  intent(in) :: const_O3up_acc
+        REAL(wp),  intent(in) :: const_fO3_d_prev
+        REAL(wp),  intent(in) :: const_td_dd
+        REAL(wp),  intent(in) :: const_gamma_1
+        REAL(wp),  intent(in) :: const_gamma_2
+        REAL(wp),  intent(in) :: const_gamma_3
+    LOGICAL,  intent(in)::   const_is_daylight
+        REAL(wp),  intent(in) :: const_t_lse_constant
+        REAL(wp),  intent(in) :: const_t_lem
+        REAL(wp),  intent(in) :: const_t_lep
+        REAL(wp),  intent(in) :: const_t_lse
+        REAL(wp),  intent(in) :: const_t_lma
+    INTEGER,  intent(in)::   const_hr
+        LOGICAL, intent(in) :: opt_full_night_recovery
+        LOGICAL, intent(in) :: use_O3_damage
+        !f2py logical optional, intent(in) :: use_O3_damage = 1
+
+        REAL(wp), dimension(9) :: invariants
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        if (.not. use_O3_damage) then
+            invariants = calc_loop_invariants_no_O3( &
+                td_dd=const_td_dd, &
+                t_lse_constant=const_t_lse_constant, &
+                t_lem=const_t_lem, &
+                t_lep=const_t_lep, &
+                t_lse=const_t_lse, &
+                t_lma=const_t_lma &
+            )
+        else
+            invariants = calc_loop_invariants( &
+                O3up=const_O3up, &
+                O3up_acc=const_O3up_acc, &
+                fO3_d_prev=const_fO3_d_prev, &
+                td_dd=const_td_dd, &
+                gamma_1=const_gamma_1, &
+                gamma_2=const_gamma_2, &
+                gamma_3=const_gamma_3, &
+                is_daylight=const_is_daylight, &
+                t_lse_constant=const_t_lse_constant, &
+                t_lem=const_t_lem, &
+                t_lep=const_t_lep, &
+                t_lse=const_t_lse, &
+                t_lma=const_t_lma, &
+                hr=const_hr, &
+                opt_full_night_recovery=opt_full_night_recovery &
+            )
+        end if
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    End Function
+
+    EWERT_PURE Function co2_concentration_in_stomata_coefficients(&
+        const_e_a, &
+        const_g_bl, &
+        const_g_sto_0, &
+        const_Gamma_star, &
+        const_V_cmax, &
+        const_K_C, &
+        const_K_O, &
+        const_e_sat_i) result(coefficients)
+        ! Terms of the c_i iteration that do not depend on c_i or g_sto.
+        !
+        ! These only need calculating once per timestep before the c_i loop.
+        ! coefficients is a packed Timestep_Coefficients
+        ! (see N_TIMESTEP_COEFFICIENTS in ewert_types for the layout).
+
+        REAL(wp),  intent(in) :: const_e_a
+        REAL(wp),  intent(in) :: const_g_bl
+        REAL(wp),  intent(in) :: const_g_sto_0
+        REAL(wp),  intent(in) :: const_Gamma_star
+        REAL(wp),  intent(in) :: const_V_cmax
+        REAL(wp),  intent(in) :: const_K_C
+        REAL(wp),  intent(in) :: const_K_O
+        REAL(wp),  intent(in) :: const_e_sat_i
+
+        ! 9 is N_TIMESTEP_COEFFICIENTS which f2py cannot read from ewert_types
+        REAL(wp), dimension(9) :: coefficients
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        coefficients = pack_timestep_coefficients(calc_timestep_coefficients( &
+            V_cmax=const_V_cmax, &
+            Gamma_star=const_Gamma_star, &
+            K_C=const_K_C, &
+            K_O=const_K_O, &
+            g_sto_0=const_g_sto_0, &
+            g_bl=const_g_bl, &
+            e_a=const_e_a, &
+            e_sat_i=const_e_sat_i &
+        ))
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    End Function
+
+    EWERT_PURE Function co2_concentration_in_stomata_inner_iteration(&
+        const_c_a, &
+        const_m, &
+        const_D_0, &
+        const_Gamma, &
+        const_Gamma_star, &
+        const_V_cmax, &
+        const_J, &
+        const_R_d, &
+        const_f_SW, &
+        const_f_VPD, &
+        coefficients, &
+        invariants, &
+        c_i_in, &
+        g_sto_in, &
+        precomputed_f_VPD, &
+        damping) result(out)
+        ! A single c_i iteration using precalculated invariants and coefficients.
+        !
+        ! Only the assimilation rate, f_VPD, conductance and CO2 supply are
+        ! evaluated. precomputed_f_VPD=.true. uses const_f_VPD instead of
+        ! calculating f_VPD from g_sto_in. coefficients is the output of
+        ! co2_concentration_in_stomata_coefficients, invariants the output of
+        ! co2_concentration_in_stomata_invariants and out has the same layout as
+        ! co2_concentration_in_stomata_iteration.
+
+        REAL(wp),  intent(in) :: const_c_a
+        REAL(wp),  intent(in) :: const_m
+        REAL(wp),  intent(in) :: const_D_0
+        REAL(wp),  intent(in) :: const_Gamma
+        REAL(wp),  intent(in) :: const_Gamma_star
+        REAL(wp),  intent(in) :: const_V_cmax
+        REAL(wp),  intent(in) :: const_J
+        REAL(wp),  intent(in) :: const_R_d
+        REAL(wp),  intent(in) :: const_f_SW
+        REAL(wp),  intent(in) :: const_f_VPD
+        ! 9 is N_TIMESTEP_COEFFICIENTS which f2py cannot read from ewert_types
+        REAL(wp), dimension(9), intent(in) :: coefficients
+        REAL(wp), dimension(9), intent(in) :: invariants
+        REAL(wp),  intent(in) :: c_i_in
+        REAL(wp),  intent(in) :: g_sto_in
+        LOGICAL, intent(in) :: precomputed_f_VPD
+        !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+        REAL(wp), intent(in) :: damping
+        !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+
+        TYPE(Timestep_Coefficients) :: timestep_coefficients
+        REAL(wp):: f_VPD
+        REAL(wp), dimension(18) :: out
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        timestep_coefficients = unpack_timestep_coefficients(coefficients)
+
+        if (precomputed_f_VPD) then
+            f_VPD = const_f_VPD
+        else
+            f_VPD = calc_humidity_defecit_fVPD(&
+                g_sto_in=g_sto_in, &
+                coefficients=timestep_coefficients, &
+                D_0=const_D_0 &
+            )
+        end if
+
+        out = calc_inner_iteration( &
+            c_a=const_c_a, &
+            m=const_m, &
+            Gamma=const_Gamma, &
+            Gamma_star=const_Gamma_star, &
+            V_cmax=const_V_cmax, &
+            J=const_J, &
+            R_d=const_R_d, &
+            f_SW=const_f_SW, &
+            f_VPD=f_VPD, &
+            coefficients=timestep_coefficients, &
+            invariants=invariants, &
+            c_i_in=c_i_in, &
+            damping=damping &
+        )
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    End Function
 
-    Pure Function co2_concentration_in_stomata_iteration(&
+    EWERT_PURE Function co2_concentration_in_stomata_iteration(&
         const_c_a, &
         const_e_a, &
         const_g_bl, &
@@ -40,151 +297,119 @@ module ewert
         const_f_VPD, &
         c_i_in, &
         g_sto_in, &
-        opt_full_night_recovery) result(out)
-
-        REAL,  intent(in) :: const_c_a
-        REAL,  intent(in) :: const_e_a
-        REAL,  intent(in) :: const_g_bl
-        REAL,  intent(in) :: const_g_sto_0
-        REAL,  intent(in) :: const_m
-        REAL,  intent(in) :: const_D_0
-        REAL,  intent(in) :: const_O3up
-        REAL,  intent(in) :: const_O3up_acc
-        REAL,  intent(in) :: const_fO3_d_prev
-        REAL,  intent(in) :: const_td_dd
-        REAL,  intent(in) :: const_gamma_1
-        REAL,  intent(in) :: const_gamma_2
-        REAL,  intent(in) :: const_gamma_3
+        opt_full_night_recovery, &
+        use_O3_damage, &
+        precomputed_f_VPD, &
+        damping) result(out)
+
+        REAL(wp),  intent(in) :: const_c_a
+        REAL(wp),  intent(in) :: const_e_a
+        REAL(wp),  intent(in) :: const_g_bl
+        REAL(wp),  intent(in) :: const_g_sto_0
+        REAL(wp),  intent(in) :: const_m
+        REAL(wp),  intent(in) :: const_D_0
+        REAL(wp),  intent(in) :: const_O3up
+        REAL(wp),  intent(in) :: const_O3up_acc
+        REAL(wp),  intent(in) :: const_fO3_d_prev
+        REAL(wp),  intent(in) :: const_td_dd
+        REAL(wp),  intent(in) :: const_gamma_1
+        REAL(wp),  intent(in) :: const_gamma_2
+        REAL(wp),  intent(in) :: const_gamma_3
     LOGICAL,  intent(in)::   const_is_daylight
-        REAL,  intent(in) :: const_t_lse_constant
-        REAL,  intent(in) :: const_t_l_estimate
-        REAL,  intent(in) :: const_t_lem
-        REAL,  intent(in) :: const_t_lep
-        REAL,  intent(in) :: const_t_lse
-        REAL,  intent(in) :: const_t_lma
-        REAL,  intent(in) :: const_Gamma
-        REAL,  intent(in) :: const_Gamma_star
-        REAL,  intent(in) :: const_V_cmax
-        REAL,  intent(in) :: const_K_C
-        REAL,  intent(in) :: const_K_O
-        REAL,  intent(in) :: const_J
-        REAL,  intent(in) :: const_R_d
-        REAL,  intent(in) :: const_e_sat_i
+        REAL(wp),  intent(in) :: const_t_lse_constant
+        REAL(wp),  intent(in) :: const_t_l_estimate
+        REAL(wp),  intent(in) :: const_t_lem
+        REAL(wp),  intent(in) :: const_t_lep
+        REAL(wp),  intent(in) :: const_t_lse
+        REAL(wp),  intent(in) :: const_t_lma
+        REAL(wp),  intent(in) :: const_Gamma
+        REAL(wp),  intent(in) :: const_Gamma_star
+        REAL(wp),  intent(in) :: const_V_cmax
+        REAL(wp),  intent(in) :: const_K_C
+        REAL(wp),  intent(in) :: const_K_O
+        REAL(wp),  intent(in) :: const_J
+        REAL(wp),  intent(in) :: const_R_d
+        REAL(wp),  intent(in) :: const_e_sat_i
     INTEGER,  intent(in)::   const_hr
-        REAL,  intent(in) :: const_f_SW
-        REAL,  intent(in) :: const_f_VPD
-        REAL,  intent(in) :: c_i_in
-        REAL,  intent(in) :: g_sto_in
+        REAL(wp),  intent(in) :: const_f_SW
+        REAL(wp),  intent(in) :: const_f_VPD
+        REAL(wp),  intent(in) :: c_i_in
+        REAL(wp),  intent(in) :: g_sto_in
         LOGICAL, intent(in) :: opt_full_night_recovery
+        LOGICAL, intent(in) :: use_O3_damage
+        !f2py logical optional, intent(in) :: use_O3_damage = 1
+        LOGICAL, intent(in) :: precomputed_f_VPD
+        !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+        REAL(wp), intent(in) :: damping
+        !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
 
-        TYPE (Damage_Factors) :: ozone_damage_factors
-        TYPE (Leaf_Life_Span_Values) :: lifespan_with_ozone
-        TYPE (CO2_assimilation_rate_factors) co2_assimilation_rate_values
-        REAL:: f_LS
-        REAL:: f_VPD
-        REAL::g_sto
-        REAL::co2_supply
-        REAL::c_i
-        REAL::c_i_diff
-        REAL, dimension(18) :: out
+        REAL(wp), dimension(9) :: invariants
+        TYPE(Timestep_Coefficients) :: coefficients
+        REAL(wp):: f_VPD
+        REAL(wp), dimension(18) :: out
+        INSTRUMENT_CLOCK(entry_clock)
 
         ! 2. Run calculations
 
-        ozone_damage_factors = calc_ozone_damage_factors( &
-            gamma_1=const_gamma_1, &
-            gamma_2=const_gamma_2, &
-            gamma_3=const_gamma_3, &
-            O3up=const_O3up, &
-            O3up_acc=const_O3up_acc, &
-            fO3_d_prev=const_fO3_d_prev, &
-            td_dd=const_td_dd, &
-            t_lem=const_t_lem, &
-            t_lma=const_t_lma, &
-            is_daylight=const_is_daylight, &
-            hr=const_hr, &
-            opt_full_night_recovery=opt_full_night_recovery &
+        INSTRUMENT_ENTRY_START(entry_clock)
+        invariants = co2_concentration_in_stomata_invariants( &
+            const_O3up=const_O3up, &
+            const_O3up_acc=const_O3up_acc, &
+            const_fO3_d_prev=const_fO3_d_prev, &
+            const_td_dd=const_td_dd, &
+            const_gamma_1=const_gamma_1, &
+            const_gamma_2=const_gamma_2, &
+            const_gamma_3=const_gamma_3, &
+            const_is_daylight=const_is_daylight, &
+            const_t_lse_constant=const_t_lse_constant, &
+            const_t_lem=const_t_lem, &
+            const_t_lep=const_t_lep, &
+            const_t_lse=const_t_lse, &
+            const_t_lma=const_t_lma, &
+            const_hr=const_hr, &
+            opt_full_night_recovery=opt_full_night_recovery, &
+            use_O3_damage=use_O3_damage &
         )
 
-
-        lifespan_with_ozone = calc_ozone_impact_on_lifespan( &
-            t_lse_constant=const_t_lse_constant, &
-            t_lep=const_t_lep, &
-            t_lse=const_t_lse, &
-            t_lem=const_t_lem, &
-            fO3_l=ozone_damage_factors%fO3_l &
-        )
-
-        f_LS = calc_senescence_factor( &
-            td_dd=const_td_dd, &
-            t_l_O3=lifespan_with_ozone%t_l, &
-            t_lem=const_t_lem, &
-            t_lep_O3=lifespan_with_ozone%t_lep, &
-            t_lse_O3=lifespan_with_ozone%t_lse &
-        )
-
-        co2_assimilation_rate_values = calc_CO2_assimilation_rate(&
-            c_i_in=c_i_in, &
+        coefficients = calc_timestep_coefficients( &
             V_cmax=const_V_cmax, &
             Gamma_star=const_Gamma_star, &
             K_C=const_K_C, &
             K_O=const_K_O, &
-            fO3_d=ozone_damage_factors%fO3_d, &
-            f_LS=f_LS, &
-            J=const_J, &
-            R_d=const_R_d &
-        )
-
-        f_VPD = calc_humidity_defecit_fVPD(&
-            g_sto_in=g_sto_in, &
-            e_a=const_e_a, &
+            g_sto_0=const_g_sto_0, &
             g_bl=const_g_bl, &
-            e_sat_i=const_e_sat_i, &
-            D_0=const_D_0 &
+            e_a=const_e_a, &
+            e_sat_i=const_e_sat_i &
         )
+        if (precomputed_f_VPD) then
+            f_VPD = const_f_VPD
+        else
+            f_VPD = calc_humidity_defecit_fVPD(&
+                g_sto_in=g_sto_in, &
+                coefficients=coefficients, &
+                D_0=const_D_0 &
+            )
+        end if
 
-        g_sto = calc_stomatal_conductance(&
-            g_sto_0=const_g_sto_0, &
+        out = calc_inner_iteration( &
+            c_a=const_c_a, &
             m=const_m, &
             Gamma=const_Gamma, &
-            g_bl=const_g_bl, &
-            c_a=const_c_a, &
-            A_n=co2_assimilation_rate_values%A_n, &
+            Gamma_star=const_Gamma_star, &
+            V_cmax=const_V_cmax, &
+            J=const_J, &
+            R_d=const_R_d, &
             f_SW=const_f_SW, &
-            f_VPD=f_VPD &
-        )
-
-        co2_supply = calc_CO2_supply( &
-            A_n=co2_assimilation_rate_values%A_n, &
-            c_a=const_c_a, &
-            g_sto=g_sto, &
-            g_bl=const_g_bl &
+            f_VPD=f_VPD, &
+            coefficients=coefficients, &
+            invariants=invariants, &
+            c_i_in=c_i_in, &
+            damping=damping &
         )
-
-        c_i = c_i_in - (c_i_in - co2_supply) / 2
-        c_i_diff=abs(c_i_in - co2_supply)
-
-        out=0.0
-        out(1) = c_i   ! c_i
-        out(2) = c_i_diff   ! c_i_diff
-        out(3) =  g_sto   ! g_sto
-        out(4) = f_LS   ! f_LS
-        out(5) = ozone_damage_factors%f_LA   ! f_LA
-        out(6) = co2_assimilation_rate_values%A_n   ! A_n
-        out(7) = co2_assimilation_rate_values%A_c   ! A_c
-        out(8) = co2_assimilation_rate_values%A_p   ! A_p
-        out(9) = co2_assimilation_rate_values%A_j   ! A_j
-        out(10) = co2_assimilation_rate_values%A_n_limit_factor   ! A_n_limit_factor
-        out(11) = ozone_damage_factors%fO3_d   ! fO3_d
-        out(12) = ozone_damage_factors%fO3_h   ! fO3_h
-        out(13) = ozone_damage_factors%fO3_l   ! fO3_l
-        out(14) = lifespan_with_ozone%t_lep   ! t_lep_ozone
-        out(15) = lifespan_with_ozone%t_lma   ! t_lma_ozone
-        out(16) = lifespan_with_ozone%t_lse   ! t_lse_ozone
-        out(17) = lifespan_with_ozone%t_l   ! t_l_ozone
-        out(18) = f_VPD   ! f_VPD
+        INSTRUMENT_ENTRY_STOP(entry_clock)
     End Function
 
-    pure function co2_concentration_in_stomata_loop(&
+    EWERT_PURE function co2_concentration_in_stomata_loop(&
     const_c_a, &
     const_e_a, &
     const_g_bl, &
@@ -219,95 +444,557 @@ module ewert
     c_i_in, &
     g_sto_in, &
     opt_full_night_recovery, &
-    max_iterations) result(out)
-
-
-    REAL,  intent(in) :: const_c_a
-    REAL,  intent(in) :: const_e_a
-    REAL,  intent(in) :: const_g_bl
-    REAL,  intent(in) :: const_g_sto_0
-    REAL,  intent(in) :: const_m
-    REAL,  intent(in) :: const_D_0
-    REAL,  intent(in) :: const_O3up
-    REAL,  intent(in) :: const_O3up_acc
-    REAL,  intent(in) :: const_fO3_d_prev
-    REAL,  intent(in) :: const_td_dd
-    REAL,  intent(in) :: const_gamma_1
-    REAL,  intent(in) :: const_gamma_2
-    REAL,  intent(in) :: const_gamma_3
+    use_O3_damage, &
+    precomputed_f_VPD, &
+    max_iterations, &
+    tolerance, &
+    damping, &
+    solver) result(out)
+    ! Iterate c_i until c_i_diff is below tolerance or max_iterations is reached.
+    !
+    ! use_O3_damage=.false. runs without ozone damage (fO3_h = fO3_d = fO3_l = 1)
+    ! and precomputed_f_VPD=.true. uses const_f_VPD instead of calculating f_VPD
+    ! from g_sto every iteration. Each combination has its own kernel in ewert_kernels.
+
+    REAL(wp),  intent(in) :: const_c_a
+    REAL(wp),  intent(in) :: const_e_a
+    REAL(wp),  intent(in) :: const_g_bl
+    REAL(wp),  intent(in) :: const_g_sto_0
+    REAL(wp),  intent(in) :: const_m
+    REAL(wp),  intent(in) :: const_D_0
+    REAL(wp),  intent(in) :: const_O3up
+    REAL(wp),  intent(in) :: const_O3up_acc
+    REAL(wp),  intent(in) :: const_fO3_d_prev
+    REAL(wp),  intent(in) :: const_td_dd
+    REAL(wp),  intent(in) :: const_gamma_1
+    REAL(wp),  intent(in) :: const_gamma_2
+    REAL(wp),  intent(in) :: const_gamma_3
 LOGICAL,  intent(in)::   const_is_daylight
-    REAL,  intent(in) :: const_t_lse_constant
-    REAL,  intent(in) :: const_t_l_estimate
-    REAL,  intent(in) :: const_t_lem
-    REAL,  intent(in) :: const_t_lep
-    REAL,  intent(in) :: const_t_lse
-    REAL,  intent(in) :: const_t_lma
-    REAL,  intent(in) :: const_Gamma
-    REAL,  intent(in) :: const_Gamma_star
-    REAL,  intent(in) :: const_V_cmax
-    REAL,  intent(in) :: const_K_C
-    REAL,  intent(in) :: const_K_O
-    REAL,  intent(in) :: const_J
-    REAL,  intent(in) :: const_R_d
-    REAL,  intent(in) :: const_e_sat_i
+    REAL(wp),  intent(in) :: const_t_lse_constant
+    REAL(wp),  intent(in) :: const_t_l_estimate
+    REAL(wp),  intent(in) :: const_t_lem
+    REAL(wp),  intent(in) :: const_t_lep
+    REAL(wp),  intent(in) :: const_t_lse
+    REAL(wp),  intent(in) :: const_t_lma
+    REAL(wp),  intent(in) :: const_Gamma
+    REAL(wp),  intent(in) :: const_Gamma_star
+    REAL(wp),  intent(in) :: const_V_cmax
+    REAL(wp),  intent(in) :: const_K_C
+    REAL(wp),  intent(in) :: const_K_O
+    REAL(wp),  intent(in) :: const_J
+    REAL(wp),  intent(in) :: const_R_d
+    REAL(wp),  intent(in) :: const_e_sat_i
 INTEGER,  intent(in)::   const_hr
-    REAL,  intent(in) :: const_f_SW
-    REAL,  intent(in) :: const_f_VPD
-    REAL,  intent(in) :: c_i_in
-    REAL,  intent(in) :: g_sto_in
+    REAL(wp),  intent(in) :: const_f_SW
+    REAL(wp),  intent(in) :: const_f_VPD
+    REAL(wp),  intent(in) :: c_i_in
+    REAL(wp),  intent(in) :: g_sto_in
     LOGICAL, intent(in) :: opt_full_night_recovery
+    LOGICAL, intent(in) :: use_O3_damage
+    !f2py logical optional, intent(in) :: use_O3_damage = 1
+    LOGICAL, intent(in) :: precomputed_f_VPD
+    !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
     INTEGER, intent(in) :: max_iterations
+    REAL(wp), intent(in) :: tolerance
+    REAL(wp), intent(in) :: damping
+    !f2py real(kind=wp) optional, intent(in) :: tolerance = 0.001
+    !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+    INTEGER, intent(in) :: solver
+    !f2py integer optional, intent(in) :: solver = 0
 
-    REAL, dimension(19) :: out
-    INTEGER :: k
-    REAL :: c_i_diff
-
-    out(1) = c_i_in
-    out(3) = g_sto_in
-    do k=1,max_iterations
-        out(1:18) = co2_concentration_in_stomata_iteration(&
-        const_c_a=const_c_a, &
-        const_e_a=const_e_a, &
-        const_g_bl=const_g_bl, &
-        const_g_sto_0=const_g_sto_0, &
-        const_m=const_m, &
-        const_D_0=const_D_0, &
-        const_O3up=const_O3up, &
-        const_O3up_acc=const_O3up_acc, &
-        const_fO3_d_prev=const_fO3_d_prev, &
-        const_td_dd=const_td_dd, &
-        const_gamma_1=const_gamma_1, &
-        const_gamma_2=const_gamma_2, &
-        const_gamma_3=const_gamma_3, &
-        const_is_daylight=const_is_daylight, &
-        const_t_lse_constant=const_t_lse_constant, &
-        const_t_l_estimate=const_t_l_estimate, &
-        const_t_lem=const_t_lem, &
-        const_t_lep=const_t_lep, &
-        const_t_lse=const_t_lse, &
-        const_t_lma=const_t_lma, &
-        const_Gamma=const_Gamma, &
-        const_Gamma_star=const_Gamma_star, &
-        const_V_cmax=const_V_cmax, &
-        const_K_C=const_K_C, &
-        const_K_O=const_K_O, &
-        const_J=const_J, &
-        const_R_d=const_R_d, &
-        const_e_sat_i=const_e_sat_i, &
-        const_hr=const_hr, &
-        const_f_SW=const_f_SW, &
-        const_f_VPD=const_f_VPD, &
-        c_i_in=out(1), &
-        g_sto_in=out(3), &
-        opt_full_night_recovery=opt_full_night_recovery &
+    REAL(wp), dimension(19) :: out
+    TYPE(CO2_Constant_Loop_Inputs) :: inputs
+    INSTRUMENT_CLOCK(entry_clock)
+
+    INSTRUMENT_ENTRY_START(entry_clock)
+    inputs = CO2_Constant_Loop_Inputs( &
+        c_a=const_c_a, &
+        e_a=const_e_a, &
+        g_bl=const_g_bl, &
+        g_sto_0=const_g_sto_0, &
+        m=const_m, &
+        D_0=const_D_0, &
+        O3up=const_O3up, &
+        O3up_acc=const_O3up_acc, &
+        fO3_d_prev=const_fO3_d_prev, &
+        td_dd=const_td_dd, &
+        gamma_1=const_gamma_1, &
+        gamma_2=const_gamma_2, &
+        gamma_3=const_gamma_3, &
+        is_daylight=merge(1.0_wp, 0.0_wp, const_is_daylight), &
+        t_lse_constant=const_t_lse_constant, &
+        t_l_estimate=const_t_l_estimate, &
+        t_lem=const_t_lem, &
+        t_lep=const_t_lep, &
+        t_lse=const_t_lse, &
+        t_lma=const_t_lma, &
+        Gamma=const_Gamma, &
+        Gamma_star=const_Gamma_star, &
+        V_cmax=const_V_cmax, &
+        K_C=const_K_C, &
+        K_O=const_K_O, &
+        J=const_J, &
+        R_d=const_R_d, &
+        e_sat_i=const_e_sat_i, &
+        hr=real(const_hr, wp), &
+        f_SW=const_f_SW, &
+        f_VPD=const_f_VPD &
+    )
+    out = run_loop_kernel(&
+        inputs=inputs, &
+        c_i_in=c_i_in, &
+        g_sto_in=g_sto_in, &
+        opt_full_night_recovery=opt_full_night_recovery, &
+        use_O3_damage=use_O3_damage, &
+        precomputed_f_VPD=precomputed_f_VPD, &
+        max_iterations=max_iterations, &
+        tolerance=tolerance, &
+        damping=damping, &
+        solver=solver &
+    )
+    INSTRUMENT_ENTRY_STOP(entry_clock)
+
+    end function
+
+    subroutine co2_concentration_in_stomata_loop_batch(&
+    n, &
+    const_c_a, &
+    const_e_a, &
+    const_g_bl, &
+    const_g_sto_0, &
+    const_m, &
+    const_D_0, &
+    const_O3up, &
+    const_O3up_acc, &
+    const_fO3_d_prev, &
+    const_td_dd, &
+    const_gamma_1, &
+    const_gamma_2, &
+    const_gamma_3, &
+    const_is_daylight, &
+    const_t_lse_constant, &
+    const_t_l_estimate, &
+    const_t_lem, &
+    const_t_lep, &
+    const_t_lse, &
+    const_t_lma, &
+    const_Gamma, &
+    const_Gamma_star, &
+    const_V_cmax, &
+    const_K_C, &
+    const_K_O, &
+    const_J, &
+    const_R_d, &
+    const_e_sat_i, &
+    const_hr, &
+    const_f_SW, &
+    const_f_VPD, &
+    c_i_in, &
+    g_sto_in, &
+    opt_full_night_recovery, &
+    use_O3_damage, &
+    precomputed_f_VPD, &
+    max_iterations, &
+    tolerance, &
+    damping, &
+    solver, &
+    out, &
+    iterations, &
+    converged)
+    ! Run co2_concentration_in_stomata_loop over n independent inputs.
+    !
+    ! Each input is an array of length n and out(i, :) holds the 19 loop
+    ! outputs for element i, so a whole batch crosses the python boundary once.
+    ! iterations(i) and converged(i) report how many iterations element i took
+    ! and whether c_i_diff fell below tolerance before max_iterations.
+
+    INTEGER, intent(in) :: n
+    REAL(wp), dimension(n), intent(in) :: const_c_a
+    REAL(wp), dimension(n), intent(in) :: const_e_a
+    REAL(wp), dimension(n), intent(in) :: const_g_bl
+    REAL(wp), dimension(n), intent(in) :: const_g_sto_0
+    REAL(wp), dimension(n), intent(in) :: const_m
+    REAL(wp), dimension(n), intent(in) :: const_D_0
+    REAL(wp), dimension(n), intent(in) :: const_O3up
+    REAL(wp), dimension(n), intent(in) :: const_O3up_acc
+    REAL(wp), dimension(n), intent(in) :: const_fO3_d_prev
+    REAL(wp), dimension(n), intent(in) :: const_td_dd
+    REAL(wp), dimension(n), intent(in) :: const_gamma_1
+    REAL(wp), dimension(n), intent(in) :: const_gamma_2
+    REAL(wp), dimension(n), intent(in) :: const_gamma_3
+    LOGICAL, dimension(n), intent(in) :: const_is_daylight
+    REAL(wp), dimension(n), intent(in) :: const_t_lse_constant
+    REAL(wp), dimension(n), intent(in) :: const_t_l_estimate
+    REAL(wp), dimension(n), intent(in) :: const_t_lem
+    REAL(wp), dimension(n), intent(in) :: const_t_lep
+    REAL(wp), dimension(n), intent(in) :: const_t_lse
+    REAL(wp), dimension(n), intent(in) :: const_t_lma
+    REAL(wp), dimension(n), intent(in) :: const_Gamma
+    REAL(wp), dimension(n), intent(in) :: const_Gamma_star
+    REAL(wp), dimension(n), intent(in) :: const_V_cmax
+    REAL(wp), dimension(n), intent(in) :: const_K_C
+    REAL(wp), dimension(n), intent(in) :: const_K_O
+    REAL(wp), dimension(n), intent(in) :: const_J
+    REAL(wp), dimension(n), intent(in) :: const_R_d
+    REAL(wp), dimension(n), intent(in) :: const_e_sat_i
+    INTEGER, dimension(n), intent(in) :: const_hr
+    REAL(wp), dimension(n), intent(in) :: const_f_SW
+    REAL(wp), dimension(n), intent(in) :: const_f_VPD
+    REAL(wp), dimension(n), intent(in) :: c_i_in
+    REAL(wp), dimension(n), intent(in) :: g_sto_in
+    LOGICAL, intent(in) :: opt_full_night_recovery
+    LOGICAL, intent(in) :: use_O3_damage
+    !f2py logical optional, intent(in) :: use_O3_damage = 1
+    LOGICAL, intent(in) :: precomputed_f_VPD
+    !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+    INTEGER, intent(in) :: max_iterations
+    REAL(wp), intent(in) :: tolerance
+    REAL(wp), intent(in) :: damping
+    !f2py real(kind=wp) optional, intent(in) :: tolerance = 0.001
+    !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+    INTEGER, intent(in) :: solver
+    !f2py integer optional, intent(in) :: solver = 0
+    REAL(wp), dimension(n, 19), intent(out) :: out
+    INTEGER, dimension(n), intent(out) :: iterations
+    LOGICAL, dimension(n), intent(out) :: converged
+
+    INTEGER :: i
+    procedure(loop_kernel), pointer :: kernel
+    INSTRUMENT_CLOCK(entry_clock)
+    !f2py threadsafe
+
+    INSTRUMENT_ENTRY_START(entry_clock)
+    kernel => select_loop_kernel(opt_full_night_recovery, use_O3_damage, precomputed_f_VPD)
+    !$omp parallel do num_threads(get_num_threads()) schedule(guided)
+    do i=1,n
+        out(i, :) = kernel(&
+            inputs=CO2_Constant_Loop_Inputs( &
+                c_a=const_c_a(i), &
+                e_a=const_e_a(i), &
+                g_bl=const_g_bl(i), &
+                g_sto_0=const_g_sto_0(i), &
+                m=const_m(i), &
+                D_0=const_D_0(i), &
+                O3up=const_O3up(i), &
+                O3up_acc=const_O3up_acc(i), &
+                fO3_d_prev=const_fO3_d_prev(i), &
+                td_dd=const_td_dd(i), &
+                gamma_1=const_gamma_1(i), &
+                gamma_2=const_gamma_2(i), &
+                gamma_3=const_gamma_3(i), &
+                is_daylight=merge(1.0_wp, 0.0_wp, const_is_daylight(i)), &
+                t_lse_constant=const_t_lse_constant(i), &
+                t_l_estimate=const_t_l_estimate(i), &
+                t_lem=const_t_lem(i), &
+                t_lep=const_t_lep(i), &
+                t_lse=const_t_lse(i), &
+                t_lma=const_t_lma(i), &
+                Gamma=const_Gamma(i), &
+                Gamma_star=const_Gamma_star(i), &
+                V_cmax=const_V_cmax(i), &
+                K_C=const_K_C(i), &
+                K_O=const_K_O(i), &
+                J=const_J(i), &
+                R_d=const_R_d(i), &
+                e_sat_i=const_e_sat_i(i), &
+                hr=real(const_hr(i), wp), &
+                f_SW=const_f_SW(i), &
+                f_VPD=const_f_VPD(i) &
+            ), &
+            c_i_in=c_i_in(i), &
+            g_sto_in=g_sto_in(i), &
+            max_iterations=max_iterations, &
+            tolerance=tolerance, &
+            damping=damping, &
+            solver=solver &
         )
-        out(19) = k
-        c_i_diff = out(2)
-        if (c_i_diff < 0.001) then
-            exit
-        end if
+        iterations(i) = nint(out(i, 19))
+        converged(i) = out(i, 2) < tolerance
     end do
+    !$omp end parallel do
+    INSTRUMENT_ENTRY_STOP(entry_clock)
+
+    end subroutine
+
+    EWERT_PURE function co2_concentration_in_stomata_loop_packed(&
+    params, &
+    c_i_in, &
+    g_sto_in, &
+    opt_full_night_recovery, &
+    use_O3_damage, &
+    precomputed_f_VPD, &
+    max_iterations, &
+    tolerance, &
+    damping, &
+    solver) result(out)
+    ! co2_concentration_in_stomata_loop taking the constant inputs as one vector.
+    !
+    ! params is a packed CO2_Constant_Loop_Inputs
+    ! (see N_CO2_CONSTANT_LOOP_INPUTS in ewert_types for the layout).
+    ! It can be built once and reused across calls.
+
+    ! 31 is N_CO2_CONSTANT_LOOP_INPUTS which f2py cannot read from ewert_types
+    REAL(wp), dimension(31), intent(in) :: params
+    REAL(wp),  intent(in) :: c_i_in
+    REAL(wp),  intent(in) :: g_sto_in
+    LOGICAL, intent(in) :: opt_full_night_recovery
+    LOGICAL, intent(in) :: use_O3_damage
+    !f2py logical optional, intent(in) :: use_O3_damage = 1
+    LOGICAL, intent(in) :: precomputed_f_VPD
+    !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+    INTEGER, intent(in) :: max_iterations
+    REAL(wp), intent(in) :: tolerance
+    REAL(wp), intent(in) :: damping
+    !f2py real(kind=wp) optional, intent(in) :: tolerance = 0.001
+    !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+    INTEGER, intent(in) :: solver
+    !f2py integer optional, intent(in) :: solver = 0
+
+    REAL(wp), dimension(19) :: out
+    TYPE(CO2_Constant_Loop_Inputs) :: inputs
+    INSTRUMENT_CLOCK(entry_clock)
+
+    INSTRUMENT_ENTRY_START(entry_clock)
+    inputs = unpack_CO2_constant_loop_inputs(params)
+    out = run_loop_kernel(&
+        inputs=inputs, &
+        c_i_in=c_i_in, &
+        g_sto_in=g_sto_in, &
+        opt_full_night_recovery=opt_full_night_recovery, &
+        use_O3_damage=use_O3_damage, &
+        precomputed_f_VPD=precomputed_f_VPD, &
+        max_iterations=max_iterations, &
+        tolerance=tolerance, &
+        damping=damping, &
+        solver=solver &
+    )
+    INSTRUMENT_ENTRY_STOP(entry_clock)
 
     end function
 
+    subroutine run_hourly_series_into(&
+    nt, &
+    c_a, &
+    e_a, &
+    g_bl, &
+    O3up, &
+    O3up_acc, &
+    td_dd, &
+    is_daylight, &
+    Gamma, &
+    Gamma_star, &
+    V_cmax, &
+    K_C, &
+    K_O, &
+    J, &
+    R_d, &
+    e_sat_i, &
+    hr, &
+    f_SW, &
+    f_VPD, &
+    const_g_sto_0, &
+    const_m, &
+    const_D_0, &
+    const_gamma_1, &
+    const_gamma_2, &
+    const_gamma_3, &
+    const_t_lse_constant, &
+    const_t_l_estimate, &
+    const_t_lem, &
+    const_t_lep, &
+    const_t_lse, &
+    const_t_lma, &
+    fO3_d_0, &
+    c_i_in, &
+    g_sto_in, &
+    opt_full_night_recovery, &
+    use_O3_damage, &
+    precomputed_f_VPD, &
+    max_iterations, &
+    tolerance, &
+    damping, &
+    solver, &
+    out)
+    ! Run co2_concentration_in_stomata_loop over nt consecutive hours.
+    !
+    ! The ozone damage state is carried from one hour to the next inside Fortran:
+    ! fO3_d_prev is the previous hour's fO3_d, starting from fO3_d_0.
+    ! Thermal time (td_dd) and the accumulated ozone uptake (O3up_acc) are taken
+    ! from the forcing as they are integrated outside the ewert model.
+    ! out(:, k) holds the 19 loop outputs for hour k, which is the memory layout
+    ! of a numpy structured array with one float field per output.
+    ! out is intent(inout) so a preallocated buffer is filled without a copy.
+
+    INTEGER, intent(in) :: nt
+    ! Hourly forcing
+    REAL(wp), dimension(nt), intent(in) :: c_a
+    REAL(wp), dimension(nt), intent(in) :: e_a
+    REAL(wp), dimension(nt), intent(in) :: g_bl
+    REAL(wp), dimension(nt), intent(in) :: O3up  ! ozone uptake [nmol O3 m-2 PLA s-1]
+    ! Accumulated ozone uptake up to the hour, in the units calc_ozone_damage_factors
+    ! expects (it divides by 1000). The accumulation is left to the caller.
+    REAL(wp), dimension(nt), intent(in) :: O3up_acc
+    REAL(wp), dimension(nt), intent(in) :: td_dd
+    LOGICAL, dimension(nt), intent(in) :: is_daylight
+    REAL(wp), dimension(nt), intent(in) :: Gamma
+    REAL(wp), dimension(nt), intent(in) :: Gamma_star
+    REAL(wp), dimension(nt), intent(in) :: V_cmax
+    REAL(wp), dimension(nt), intent(in) :: K_C
+    REAL(wp), dimension(nt), intent(in) :: K_O
+    REAL(wp), dimension(nt), intent(in) :: J
+    REAL(wp), dimension(nt), intent(in) :: R_d
+    REAL(wp), dimension(nt), intent(in) :: e_sat_i
+    INTEGER, dimension(nt), intent(in) :: hr
+    REAL(wp), dimension(nt), intent(in) :: f_SW
+    REAL(wp), dimension(nt), intent(in) :: f_VPD
+    ! Constant parameters
+    REAL(wp), intent(in) :: const_g_sto_0
+    REAL(wp), intent(in) :: const_m
+    REAL(wp), intent(in) :: const_D_0
+    REAL(wp), intent(in) :: const_gamma_1
+    REAL(wp), intent(in) :: const_gamma_2
+    REAL(wp), intent(in) :: const_gamma_3
+    REAL(wp), intent(in) :: const_t_lse_constant
+    REAL(wp), intent(in) :: const_t_l_estimate
+    REAL(wp), intent(in) :: const_t_lem
+    REAL(wp), intent(in) :: const_t_lep
+    REAL(wp), intent(in) :: const_t_lse
+    REAL(wp), intent(in) :: const_t_lma
+    ! Initial state
+    REAL(wp), intent(in) :: fO3_d_0
+    REAL(wp), intent(in) :: c_i_in
+    REAL(wp), intent(in) :: g_sto_in
+    LOGICAL, intent(in) :: opt_full_night_recovery
+    LOGICAL, intent(in) :: use_O3_damage
+    !f2py logical optional, intent(in) :: use_O3_damage = 1
+    LOGICAL, intent(in) :: precomputed_f_VPD
+    !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+    INTEGER, intent(in) :: max_iterations
+    REAL(wp), intent(in) :: tolerance
+    REAL(wp), intent(in) :: damping
+    !f2py real(kind=wp) optional, intent(in) :: tolerance = 0.001
+    !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+    INTEGER, intent(in) :: solver
+    !f2py integer optional, intent(in) :: solver = 0
+    REAL(wp), dimension(19, nt), intent(inout) :: out
+
+    INTEGER :: k
+    procedure(loop_kernel), pointer :: kernel
+    !f2py threadsafe
+    REAL(wp) :: fO3_d_prev
+    INSTRUMENT_CLOCK(entry_clock)
+
+    INSTRUMENT_ENTRY_START(entry_clock)
+    kernel => select_loop_kernel(opt_full_night_recovery, use_O3_damage, precomputed_f_VPD)
+    fO3_d_prev = fO3_d_0
+    do k=1,nt
+        out(:, k) = kernel(&
+            inputs=CO2_Constant_Loop_Inputs( &
+                c_a=c_a(k), &
+                e_a=e_a(k), &
+                g_bl=g_bl(k), &
+                g_sto_0=const_g_sto_0, &
+                m=const_m, &
+                D_0=const_D_0, &
+                O3up=O3up(k), &
+                O3up_acc=O3up_acc(k), &
+                fO3_d_prev=fO3_d_prev, &
+                td_dd=td_dd(k), &
+                gamma_1=const_gamma_1, &
+                gamma_2=const_gamma_2, &
+                gamma_3=const_gamma_3, &
+                is_daylight=merge(1.0_wp, 0.0_wp, is_daylight(k)), &
+                t_lse_constant=const_t_lse_constant, &
+                t_l_estimate=const_t_l_estimate, &
+                t_lem=const_t_lem, &
+                t_lep=const_t_lep, &
+                t_lse=const_t_lse, &
+                t_lma=const_t_lma, &
+                Gamma=Gamma(k), &
+                Gamma_star=Gamma_star(k), &
+                V_cmax=V_cmax(k), &
+                K_C=K_C(k), &
+                K_O=K_O(k), &
+                J=J(k), &
+                R_d=R_d(k), &
+                e_sat_i=e_sat_i(k), &
+                hr=real(hr(k), wp), &
+                f_SW=f_SW(k), &
+                f_VPD=f_VPD(k) &
+            ), &
+            c_i_in=c_i_in, &
+            g_sto_in=g_sto_in, &
+            max_iterations=max_iterations, &
+            tolerance=tolerance, &
+            damping=damping, &
+            solver=solver &
+        )
+        fO3_d_prev = out(11, k)
+    end do
+    INSTRUMENT_ENTRY_STOP(entry_clock)
+
+    end subroutine
+
+    subroutine co2_concentration_in_stomata_loop_batch_into(&
+    n, &
+    params, &
+    c_i_in, &
+    g_sto_in, &
+    opt_full_night_recovery, &
+    use_O3_damage, &
+    precomputed_f_VPD, &
+    max_iterations, &
+    tolerance, &
+    damping, &
+    solver, &
+    out)
+    ! co2_concentration_in_stomata_loop_batch taking packed constant inputs.
+    !
+    ! params(:, i) is the packed CO2_Constant_Loop_Inputs for element i.
+    ! out(:, i) holds the 19 loop outputs for element i, which is the memory
+    ! layout of a numpy structured array with one float field per output.
+    ! out is intent(inout) so a preallocated buffer is filled without a copy.
+
+    INTEGER, intent(in) :: n
+    ! 31 is N_CO2_CONSTANT_LOOP_INPUTS which f2py cannot read from ewert_types
+    REAL(wp), dimension(31, n), intent(in) :: params
+    REAL(wp), dimension(n), intent(in) :: c_i_in
+    REAL(wp), dimension(n), intent(in) :: g_sto_in
+    LOGICAL, intent(in) :: opt_full_night_recovery
+    LOGICAL, intent(in) :: use_O3_damage
+    !f2py logical optional, intent(in) :: use_O3_damage = 1
+    LOGICAL, intent(in) :: precomputed_f_VPD
+    !f2py logical optional, intent(in) :: precomputed_f_VPD = 0
+    INTEGER, intent(in) :: max_iterations
+    REAL(wp), intent(in) :: tolerance
+    REAL(wp), intent(in) :: damping
+    !f2py real(kind=wp) optional, intent(in) :: tolerance = 0.001
+    !f2py real(kind=wp) optional, intent(in) :: damping = 0.5
+    INTEGER, intent(in) :: solver
+    !f2py integer optional, intent(in) :: solver = 0
+    REAL(wp), dimension(19, n), intent(inout) :: out
+
+    INSTRUMENT_CLOCK(entry_clock)
+    !f2py threadsafe
+
+    INSTRUMENT_ENTRY_START(entry_clock)
+    call run_loop_kernel_batch(&
+        n=n, &
+        params=params, &
+        c_i_in=c_i_in, &
+        g_sto_in=g_sto_in, &
+        opt_full_night_recovery=opt_full_night_recovery, &
+        use_O3_damage=use_O3_damage, &
+        precomputed_f_VPD=precomputed_f_VPD, &
+        max_iterations=max_iterations, &
+        tolerance=tolerance, &
+        damping=damping, &
+        solver=solver, &
+        num_threads=get_num_threads(), &
+        out=out &
+    )
+    INSTRUMENT_ENTRY_STOP(entry_clock)
+
+    end subroutine
+
 end module ewert
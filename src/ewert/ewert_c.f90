@@ -0,0 +1,136 @@
+#include "ewert_instrumentation.h"
+module ewert_c
+    ! bind(C) entry points of the stomata CO2 loop that skip the f2py wrappers.
+    !
+    ! The single point routines take one pointer to an Ewert_C_Point the caller
+    ! keeps between calls, as each argument adds to the cost of a ctypes call
+    ! (see fortpy.ewert_c). The batch routine takes pointers to contiguous arrays.
+    ! Inputs use the packed layout of unpack_CO2_constant_loop_inputs and outputs
+    ! the layout of the matching ewert entry point. The routines are linked into
+    ! fewert and fewert64 with the same C names, REAL(c_wp) is float or double to match.
+    use, intrinsic :: iso_c_binding, only: c_int, c_float, c_double
+    use ewert_types
+    use ewert_helpers
+    use ewert_kernels
+    use ewert_instrumentation
+    implicit none
+
+    private
+    public :: Ewert_C_Options
+    public :: Ewert_C_Point
+    public :: ewert_c_iteration
+    public :: ewert_c_loop
+    public :: ewert_c_loop_batch
+
+    ! The C interoperable kind of REAL(wp). The REAL(c_wp) values are passed straight
+    ! to REAL(wp) kernel arguments so a build where the kinds differ does not compile.
+    INTEGER, parameter :: c_wp = merge(c_double, c_float, wp == 8)
+
+    ! Model options and solver settings shared by every call.
+    ! The logicals are 0 or 1 and num_threads 0 uses the OpenMP default.
+    TYPE, bind(C) :: Ewert_C_Options
+        INTEGER(c_int) :: opt_full_night_recovery = 1
+        INTEGER(c_int) :: use_O3_damage = 1
+        INTEGER(c_int) :: precomputed_f_VPD = 0
+        INTEGER(c_int) :: max_iterations = 20
+        INTEGER(c_int) :: solver = SOLVER_RELAXATION
+        INTEGER(c_int) :: num_threads = 0
+        REAL(c_wp) :: tolerance = 0.001_c_wp
+        REAL(c_wp) :: damping = 0.5_c_wp
+    END TYPE Ewert_C_Options
+
+    ! Options, inputs and outputs of a single point call.
+    ! out(1:18) is the iteration output and out(19) the iterations run.
+    TYPE, bind(C) :: Ewert_C_Point
+        TYPE(Ewert_C_Options) :: options
+        REAL(c_wp) :: params(N_CO2_CONSTANT_LOOP_INPUTS)
+        REAL(c_wp) :: c_i_in = 0.0_c_wp
+        REAL(c_wp) :: g_sto_in = 0.0_c_wp
+        REAL(c_wp) :: out(19)
+    END TYPE Ewert_C_Point
+
+    contains
+
+    subroutine ewert_c_iteration(point) bind(C, name="ewert_iteration")
+        ! co2_concentration_in_stomata_iteration of the point into point%out(1:18).
+        !
+        ! A single relaxation step of the loop kernel, which is the same calculation.
+        TYPE(Ewert_C_Point), intent(inout) :: point
+
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        point%out = run_loop_kernel(&
+            inputs=unpack_CO2_constant_loop_inputs(point%params), &
+            c_i_in=point%c_i_in, &
+            g_sto_in=point%g_sto_in, &
+            opt_full_night_recovery=point%options%opt_full_night_recovery /= 0, &
+            use_O3_damage=point%options%use_O3_damage /= 0, &
+            precomputed_f_VPD=point%options%precomputed_f_VPD /= 0, &
+            max_iterations=1, &
+            tolerance=0.0_wp, &
+            damping=point%options%damping, &
+            solver=SOLVER_RELAXATION &
+        )
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    end subroutine
+
+    subroutine ewert_c_loop(point) bind(C, name="ewert_loop")
+        ! co2_concentration_in_stomata_loop_packed of the point into point%out.
+        TYPE(Ewert_C_Point), intent(inout) :: point
+
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        point%out = run_loop_kernel(&
+            inputs=unpack_CO2_constant_loop_inputs(point%params), &
+            c_i_in=point%c_i_in, &
+            g_sto_in=point%g_sto_in, &
+            opt_full_night_recovery=point%options%opt_full_night_recovery /= 0, &
+            use_O3_damage=point%options%use_O3_damage /= 0, &
+            precomputed_f_VPD=point%options%precomputed_f_VPD /= 0, &
+            max_iterations=point%options%max_iterations, &
+            tolerance=point%options%tolerance, &
+            damping=point%options%damping, &
+            solver=point%options%solver &
+        )
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    end subroutine
+
+    subroutine ewert_c_loop_batch(n, params, c_i_in, g_sto_in, options, out) &
+            bind(C, name="ewert_loop_batch")
+        ! co2_concentration_in_stomata_loop_batch_into writing into out(19, n).
+        !$ use omp_lib
+        INTEGER(c_int), value, intent(in) :: n
+        REAL(c_wp), dimension(N_CO2_CONSTANT_LOOP_INPUTS, n), intent(in) :: params
+        REAL(c_wp), dimension(n), intent(in) :: c_i_in
+        REAL(c_wp), dimension(n), intent(in) :: g_sto_in
+        TYPE(Ewert_C_Options), intent(in) :: options
+        REAL(c_wp), dimension(19, n), intent(out) :: out
+
+        INTEGER :: num_threads
+        INSTRUMENT_CLOCK(entry_clock)
+
+        INSTRUMENT_ENTRY_START(entry_clock)
+        num_threads = 1
+        !$ num_threads = omp_get_max_threads()
+        !$ if (options%num_threads > 0) num_threads = options%num_threads
+        call run_loop_kernel_batch(&
+            n=n, &
+            params=params, &
+            c_i_in=c_i_in, &
+            g_sto_in=g_sto_in, &
+            opt_full_night_recovery=options%opt_full_night_recovery /= 0, &
+            use_O3_damage=options%use_O3_damage /= 0, &
+            precomputed_f_VPD=options%precomputed_f_VPD /= 0, &
+            max_iterations=options%max_iterations, &
+            tolerance=options%tolerance, &
+            damping=options%damping, &
+            solver=options%solver, &
+            num_threads=num_threads, &
+            out=out &
+        )
+        INSTRUMENT_ENTRY_STOP(entry_clock)
+    end subroutine
+
+end module ewert_c
@@ -9,16 +9,24 @@ module ewert_helpers
     public:: calc_humidity_defecit_fVPD
     public:: calc_stomatal_conductance
     public::calc_CO2_supply
+    public::calc_timestep_coefficients
+    public::pack_timestep_coefficients
+    public::unpack_timestep_coefficients
+    public::unpack_CO2_constant_loop_inputs
+
+    REAL(wp), parameter :: A_j_a = 4.0_wp           !electron requirement for NADPH formation
+    REAL(wp), parameter :: A_j_b = 8.0_wp           !electron requirement for ATP formation
+    REAL(wp), parameter :: O_i = 210.0_wp           !O2 concentration                   [mmol/mol]
 
     contains
 
-    Pure Real Function calc_fO3_h(O3up, gamma_1, gamma_2) result(fO3_h)
-        REAL, intent(in) :: O3up
-        REAL, intent(in) :: gamma_1
-        REAL, intent(in) :: gamma_2
+    Pure REAL(wp) Function calc_fO3_h(O3up, gamma_1, gamma_2) result(fO3_h)
+        REAL(wp), intent(in) :: O3up
+        REAL(wp), intent(in) :: gamma_1
+        REAL(wp), intent(in) :: gamma_2
 
-        REAL::lower_bound
-        REAL::upper_bound
+        REAL(wp)::lower_bound
+        REAL(wp)::upper_bound
 
         lower_bound = gamma_1 / gamma_2
         upper_bound = (1 + gamma_1) / gamma_2
@@ -34,13 +42,13 @@ module ewert_helpers
 
 
     Pure Function calc_f_LA(t_lem, t_lma, td_dd) result(f_LA)
-        REAL, intent(in) :: t_lem
-        REAL, intent(in) :: t_lma
-        REAL, intent(in) :: td_dd
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: t_lma
+        REAL(wp), intent(in) :: td_dd
 
-        REAL::lower_bound
-        REAL::upper_bound
-        REAL::f_LA
+        REAL(wp)::lower_bound
+        REAL(wp)::upper_bound
+        REAL(wp)::f_LA
 
         lower_bound = t_lem
         upper_bound = t_lem + t_lma
@@ -69,27 +77,27 @@ module ewert_helpers
         hr, &
         opt_full_night_recovery &
     )
-        REAL, intent(in):: gamma_1
-        REAL, intent(in):: gamma_2
-        REAL, intent(in):: gamma_3
-        REAL, intent(in):: O3up
-        REAL, intent(in):: O3up_acc
-        REAL, intent(in):: fO3_d_prev
-        REAL, intent(in):: td_dd
-        REAL, intent(in):: t_lem
-        REAL, intent(in):: t_lma
+        REAL(wp), intent(in):: gamma_1
+        REAL(wp), intent(in):: gamma_2
+        REAL(wp), intent(in):: gamma_3
+        REAL(wp), intent(in):: O3up
+        REAL(wp), intent(in):: O3up_acc
+        REAL(wp), intent(in):: fO3_d_prev
+        REAL(wp), intent(in):: td_dd
+        REAL(wp), intent(in):: t_lem
+        REAL(wp), intent(in):: t_lma
         LOGICAL, intent(in):: is_daylight
         INTEGER, intent(in):: hr
         LOGICAL, intent(in):: opt_full_night_recovery
 
-        REAL:: fO3_h
-        REAL:: fO3_d
-        REAL:: fO3_l
-        REAL:: f_LA
-        REAL:: rO3
+        REAL(wp):: fO3_h
+        REAL(wp):: fO3_d
+        REAL(wp):: fO3_l
+        REAL(wp):: f_LA
+        REAL(wp):: rO3
 
-        REAL:: fO3_d_base
-        REAL:: fO3_d_night
+        REAL(wp):: fO3_d_base
+        REAL(wp):: fO3_d_night
 
         fO3_h = calc_fO3_h(O3up, gamma_1, gamma_2)
         f_LA = calc_f_LA(t_lem, t_lma, td_dd)
@@ -124,16 +132,16 @@ module ewert_helpers
         fO3_l &
     ) result(lifespan_with_ozone)
 
-        REAL, intent(in) :: t_lse_constant
-        REAL, intent(in) :: t_lep
-        REAL, intent(in) :: t_lse
-        REAL, intent(in) :: t_lem
-        REAL, intent(in) :: fO3_l
+        REAL(wp), intent(in) :: t_lse_constant
+        REAL(wp), intent(in) :: t_lep
+        REAL(wp), intent(in) :: t_lse
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: fO3_l
 
-        REAL t_lma_O3
-        REAL t_lse_O3
-        REAL t_lep_O3
-        REAL t_l_O3
+        REAL(wp) t_lma_O3
+        REAL(wp) t_lse_O3
+        REAL(wp) t_lep_O3
+        REAL(wp) t_l_O3
 
         t_lma_O3 = (t_lep + t_lse) * fO3_l ! eq 16! reduces estimated leaf age by accumulated fst
         t_lse_O3 = t_lse_constant * t_lma_O3 ! make senescing period 0.33 * life span of mature leaf
@@ -149,7 +157,7 @@ module ewert_helpers
         )
     end function
 
-    Pure REAL function calc_senescence_factor(&
+    Pure REAL(wp) function calc_senescence_factor(&
         td_dd, &
         t_l_O3, &
         t_lem, &
@@ -157,13 +165,13 @@ module ewert_helpers
         t_lse_O3 &
         ) result(f_LS)
 
-        REAL, intent(in) :: td_dd
-        REAL, intent(in) :: t_l_O3
-        REAL, intent(in) :: t_lem
-        REAL, intent(in) :: t_lep_O3
-        REAL, intent(in) :: t_lse_O3
+        REAL(wp), intent(in) :: td_dd
+        REAL(wp), intent(in) :: t_l_O3
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: t_lep_O3
+        REAL(wp), intent(in) :: t_lse_O3
 
-        REAL :: s_signal
+        REAL(wp) :: s_signal
 
         s_signal = t_lem + t_lep_O3  ! new senescense signal
 
@@ -179,42 +187,112 @@ module ewert_helpers
 
     end function
 
-    PURE TYPE(CO2_assimilation_rate_factors) function calc_CO2_assimilation_rate(&
-        c_i_in, &
+    PURE TYPE(Timestep_Coefficients) function calc_timestep_coefficients(&
         V_cmax, &
         Gamma_star, &
         K_C, &
         K_O, &
+        g_sto_0, &
+        g_bl, &
+        e_a, &
+        e_sat_i &
+    ) result(coefficients)
+    ! Terms of the c_i iteration that do not change over the c_i loop.
+    !
+    ! Each term is evaluated exactly as the helpers did inline so results are unchanged.
+    REAL(wp), intent(in) :: V_cmax
+    REAL(wp), intent(in) :: Gamma_star
+    REAL(wp), intent(in) :: K_C
+    REAL(wp), intent(in) :: K_O
+    REAL(wp), intent(in) :: g_sto_0
+    REAL(wp), intent(in) :: g_bl
+    REAL(wp), intent(in) :: e_a
+    REAL(wp), intent(in) :: e_sat_i
+
+    REAL(wp)::g_bl_mol
+
+    ! Unit conversions
+    ! Equation 5 is in mol
+    ! Convert from umol to mol
+    g_bl_mol = g_bl * 1e-6_wp
+
+    coefficients = Timestep_Coefficients( &
+        A_p=0.5_wp * V_cmax, &
+        K_C_O=K_C * (1 + (O_i / K_O)), &
+        A_j_Gamma_star=A_j_b * Gamma_star, &
+        g_sto_0_mol=g_sto_0 * 1e-6_wp, &
+        g_bl_mol=g_bl_mol, &
+        r_bl=1.37_wp / g_bl, &
+        r_bl_mol=1.37_wp / g_bl_mol, &
+        e_sat_i_kPa=e_sat_i * 1e-3_wp, &
+        g_bl_e_a=g_bl_mol * (e_a * 1e-3_wp) &
+    )
+    end function
+
+    PURE function pack_timestep_coefficients(coefficients) result(packed)
+        TYPE(Timestep_Coefficients), intent(in) :: coefficients
+        REAL(wp), dimension(N_TIMESTEP_COEFFICIENTS) :: packed
+
+        packed = [ &
+            coefficients%A_p, &
+            coefficients%K_C_O, &
+            coefficients%A_j_Gamma_star, &
+            coefficients%g_sto_0_mol, &
+            coefficients%g_bl_mol, &
+            coefficients%r_bl, &
+            coefficients%r_bl_mol, &
+            coefficients%e_sat_i_kPa, &
+            coefficients%g_bl_e_a &
+        ]
+    end function
+
+    PURE TYPE(Timestep_Coefficients) function unpack_timestep_coefficients(&
+        packed &
+        ) result(coefficients)
+        REAL(wp), dimension(N_TIMESTEP_COEFFICIENTS), intent(in) :: packed
+
+        coefficients = Timestep_Coefficients( &
+            A_p=packed(1), &
+            K_C_O=packed(2), &
+            A_j_Gamma_star=packed(3), &
+            g_sto_0_mol=packed(4), &
+            g_bl_mol=packed(5), &
+            r_bl=packed(6), &
+            r_bl_mol=packed(7), &
+            e_sat_i_kPa=packed(8), &
+            g_bl_e_a=packed(9) &
+        )
+    end function
+
+    PURE TYPE(CO2_assimilation_rate_factors) function calc_CO2_assimilation_rate(&
+        c_i_in, &
+        V_cmax, &
+        Gamma_star, &
+        coefficients, &
         fO3_d, &
         f_LS, &
         J, &
         R_d &
     ) result(out)
-    REAL, intent(in) :: c_i_in
-    REAL, intent(in) :: V_cmax
-    REAL, intent(in) :: Gamma_star
-    REAL, intent(in) :: K_C
-    REAL, intent(in) :: K_O
-    REAL, intent(in) :: fO3_d
-    REAL, intent(in) :: f_LS
-    REAL, intent(in) :: J
-    REAL, intent(in) :: R_d
-
-    REAL::A_c
-    REAL::A_j
-    REAL::A_p
-    REAL::A_n
-
-    real, parameter :: A_j_a = 4.0           !electron requirement for NADPH formation
-    real, parameter :: A_j_b = 8.0           !electron requirement for ATP formation
-    real, parameter :: O_i = 210.0           !O2 concentration                   [mmol/mol]
-
+    REAL(wp), intent(in) :: c_i_in
+    REAL(wp), intent(in) :: V_cmax
+    REAL(wp), intent(in) :: Gamma_star
+    TYPE(Timestep_Coefficients), intent(in) :: coefficients
+    REAL(wp), intent(in) :: fO3_d
+    REAL(wp), intent(in) :: f_LS
+    REAL(wp), intent(in) :: J
+    REAL(wp), intent(in) :: R_d
+
+    REAL(wp)::A_c
+    REAL(wp)::A_j
+    REAL(wp)::A_p
+    REAL(wp)::A_n
 
     A_c = V_cmax * ((c_i_in - Gamma_star)  /& ! noqa: W504
-                    (c_i_in + (K_C * (1 + (O_i / K_O))))) * fO3_d * f_LS
-    A_j = J * ((c_i_in - Gamma_star) / ((A_j_a * c_i_in) + (A_j_b * Gamma_star)))
+                    (c_i_in + coefficients%K_C_O)) * fO3_d * f_LS
+    A_j = J * ((c_i_in - Gamma_star) / ((A_j_a * c_i_in) + coefficients%A_j_Gamma_star))
 
-    A_p = 0.5 * V_cmax
+    A_p = coefficients%A_p
 
     A_n = min(A_c, A_j, A_p) - R_d
 
@@ -231,77 +309,60 @@ module ewert_helpers
 
     end function
 
-    PURE REAL function calc_humidity_defecit_fVPD(&
+    PURE REAL(wp) function calc_humidity_defecit_fVPD(&
      g_sto_in, &
-     e_a, &
-     g_bl, &
-     e_sat_i, &
+     coefficients, &
      D_0 &
     ) result(f_VPD)
-        REAL, intent(in):: g_sto_in
-        REAL, intent(in):: e_a
-        REAL, intent(in):: g_bl
-        REAL, intent(in):: e_sat_i
-        REAL, intent(in):: D_0
-
-        REAL::g_sto_in_mol
-        REAL::g_bl_mol
-        REAL::h_s
-        REAL::d_s
-        REAL::e_sat_i_kPa
-        REAL::e_a_kPa
+        REAL(wp), intent(in):: g_sto_in
+        TYPE(Timestep_Coefficients), intent(in) :: coefficients
+        REAL(wp), intent(in):: D_0
+
+        REAL(wp)::g_sto_in_mol
+        REAL(wp)::h_s
+        REAL(wp)::d_s
 
         ! Unit conversions
         ! Equation 5 is in mol
         ! Convert from umol to mol
-        g_sto_in_mol = g_sto_in * 1e-6
-        g_bl_mol = g_bl * 1e-6
+        g_sto_in_mol = g_sto_in * 1e-6_wp
 
-        e_sat_i_kPa = e_sat_i * 1e-3
-        e_a_kPa = e_a * 1e-3
         ! Surface humidity (Unitless)
-        h_s = (g_sto_in_mol * e_sat_i_kPa + g_bl_mol * e_a_kPa) / (e_sat_i_kPa * (g_sto_in_mol + g_bl_mol))
+        h_s = (g_sto_in_mol * coefficients%e_sat_i_kPa + coefficients%g_bl_e_a) / &
+            (coefficients%e_sat_i_kPa * (g_sto_in_mol + coefficients%g_bl_mol))
         ! Convert relative humidity to VPD
-        d_s = e_sat_i_kPa - (e_sat_i_kPa * h_s)
+        d_s = coefficients%e_sat_i_kPa - (coefficients%e_sat_i_kPa * h_s)
         f_VPD = 1 / (1 + (d_s / D_0))
     end function
 
-    PURE REAL function calc_stomatal_conductance(&
-        g_sto_0, &
+    PURE REAL(wp) function calc_stomatal_conductance(&
+        coefficients, &
         m, &
         Gamma, &
-        g_bl, &
         c_a, &
         A_n, &
         f_SW, &
         f_VPD &
     ) result(g_sto)
-    REAL, intent(in) :: g_sto_0
-    REAL, intent(in) :: m
-    REAL, intent(in) :: Gamma
-    REAL, intent(in) :: g_bl
-    REAL, intent(in) :: c_a
-    REAL, intent(in) :: A_n
-    REAL, intent(in) :: f_SW
-    REAL, intent(in) :: f_VPD
-
-    REAL:: g_sto_0_mol
-    REAL:: g_bl_mol
-    REAL:: c_s
-    REAL:: g_eq_top
-    REAL:: g_eq_bottom
-    REAL:: g_sto_out_mol
-
-    ! Unit conversions
-    ! Equation 5 is in mol
-    ! Convert from umol to mol
-    g_sto_0_mol = g_sto_0 * 1e-6
-    g_bl_mol = g_bl * 1e-6
+    TYPE(Timestep_Coefficients), intent(in) :: coefficients
+    REAL(wp), intent(in) :: m
+    REAL(wp), intent(in) :: Gamma
+    REAL(wp), intent(in) :: c_a
+    REAL(wp), intent(in) :: A_n
+    REAL(wp), intent(in) :: f_SW
+    REAL(wp), intent(in) :: f_VPD
+
+    REAL(wp):: c_s
+    REAL(wp):: g_eq_top
+    REAL(wp):: g_eq_bottom
+    REAL(wp):: g_sto_out_mol
+
+    ! g_sto_0 and g_bl are converted from umol to mol in coefficients
     ! NOTE: micro mol/(m^2*s) values are not converted
 
     ! Surface CO2
     ! g_bl converted from H2O to CO2
-    c_s = c_a - (A_n * (1.37 / g_bl_mol))
+    c_s = c_a - (A_n * coefficients%r_bl_mol)
 
     ! Stomatal conductance
 
@@ -317,30 +378,70 @@ module ewert_helpers
 
     g_eq_top = m * A_n * f_SW * f_VPD  ! micro mol/(m^2*s)
     g_eq_bottom = (c_s - Gamma)  ! f_VPD = 1 + (D_s/D_0)
-    g_sto_out_mol = g_sto_0_mol + (g_eq_top / g_eq_bottom)
+    g_sto_out_mol = coefficients%g_sto_0_mol + (g_eq_top / g_eq_bottom)
     ! Convert from mol to umol
-    g_sto = g_sto_out_mol * 1e6
+    g_sto = g_sto_out_mol * 1e6_wp
 
     end function
 
-    pure REAL function calc_CO2_supply(&
+    pure REAL(wp) function calc_CO2_supply(&
         A_n, &
         c_a, &
         g_sto, &
-        g_bl &
+        coefficients &
         ) result(c_i_sup)
-    REAL, intent(in):: A_n
-    REAL, intent(in):: c_a
-    REAL, intent(in):: g_sto
-    REAL, intent(in):: g_bl
+    REAL(wp), intent(in):: A_n
+    REAL(wp), intent(in):: c_a
+    REAL(wp), intent(in):: g_sto
+    TYPE(Timestep_Coefficients), intent(in) :: coefficients
 
     ! NOTE: umol to mol conversions taken into account for g_sto and g_bl
 
     ! gsto does not need converting here as already in CO2 umol
     ! g_bl is converted from H2O to CO2 using Dratio
     ! TODO: Check ratio used for g_bl conversion
-    c_i_sup = c_a - ((A_n * (1 / g_sto + 1.37 / g_bl)) * 1e6)
+    c_i_sup = c_a - ((A_n * (1 / g_sto + coefficients%r_bl)) * 1e6_wp)
+
+    end function
 
+    PURE TYPE(CO2_Constant_Loop_Inputs) function unpack_CO2_constant_loop_inputs(&
+        params &
+        ) result(inputs)
+        REAL(wp), dimension(N_CO2_CONSTANT_LOOP_INPUTS), intent(in) :: params
+
+        inputs = CO2_Constant_Loop_Inputs( &
+            c_a=params(1), &
+            e_a=params(2), &
+            g_bl=params(3), &
+            g_sto_0=params(4), &
+            m=params(5), &
+            D_0=params(6), &
+            O3up=params(7), &
+            O3up_acc=params(8), &
+            fO3_d_prev=params(9), &
+            td_dd=params(10), &
+            gamma_1=params(11), &
+            gamma_2=params(12), &
+            gamma_3=params(13), &
+            is_daylight=params(14), &
+            t_lse_constant=params(15), &
+            t_l_estimate=params(16), &
+            t_lem=params(17), &
+            t_lep=params(18), &
+            t_lse=params(19), &
+            t_lma=params(20), &
+            Gamma=params(21), &
+            Gamma_star=params(22), &
+            V_cmax=params(23), &
+            K_C=params(24), &
+            K_O=params(25), &
+            J=params(26), &
+            R_d=params(27), &
+            e_sat_i=params(28), &
+            hr=params(29), &
+            f_SW=params(30), &
+            f_VPD=params(31) &
+        )
     end function
 
 end module
\ No newline at end of file
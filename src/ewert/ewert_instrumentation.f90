@@ -0,0 +1,137 @@
+module ewert_instrumentation
+    ! Call counts, system_clock timers and an iteration histogram of the ewert kernels.
+    !
+    ! The kernels only record into these counters when built with
+    ! `build.py build --instrument` (FORTPY_INSTRUMENT defined, see ewert_instrumentation.h).
+    ! In the default build nothing calls this module so it costs nothing.
+    ! Updates are atomic so the counters stay correct under the OpenMP batches.
+    use iso_fortran_env, only: int64
+    implicit none
+
+    private
+    public :: CLOCK_KIND
+    public :: N_TIMERS
+    public :: N_ITERATION_BINS
+    public :: TIMER_LOOP
+    public :: TIMER_INVARIANTS
+    public :: TIMER_COEFFICIENTS
+    public :: TIMER_F_VPD
+    public :: TIMER_ASSIMILATION_RATE
+    public :: TIMER_STOMATAL_CONDUCTANCE
+    public :: TIMER_CO2_SUPPLY
+    public :: TIMER_SOLVER_STEP
+    public :: TIMER_ENTRY_POINT
+    public :: instrumentation_start
+    public :: instrumentation_stop
+    public :: instrumentation_entry_start
+    public :: instrumentation_entry_stop
+    public :: instrumentation_record_loop
+    public :: instrumentation_reset
+    public :: instrumentation_read
+
+    INTEGER, parameter :: CLOCK_KIND = int64  ! kind of the system_clock counts
+
+    ! Timed sections. Keep in the order of fortpy.instrumentation.TIMERS
+    INTEGER, parameter :: TIMER_LOOP = 1  ! a whole loop kernel call
+    INTEGER, parameter :: TIMER_INVARIANTS = 2
+    INTEGER, parameter :: TIMER_COEFFICIENTS = 3
+    INTEGER, parameter :: TIMER_F_VPD = 4
+    INTEGER, parameter :: TIMER_ASSIMILATION_RATE = 5
+    INTEGER, parameter :: TIMER_STOMATAL_CONDUCTANCE = 6
+    INTEGER, parameter :: TIMER_CO2_SUPPLY = 7
+    INTEGER, parameter :: TIMER_SOLVER_STEP = 8
+    INTEGER, parameter :: TIMER_ENTRY_POINT = 9  ! Fortran side of a python facing call
+    INTEGER, parameter :: N_TIMERS = 9
+
+    ! iteration_histogram(k) counts loops that took k iterations.
+    ! The last bin also counts every loop that took more.
+    INTEGER, parameter :: N_ITERATION_BINS = 100
+
+    INTEGER(int64) :: call_counts(N_TIMERS) = 0
+    INTEGER(int64) :: clock_ticks(N_TIMERS) = 0
+    INTEGER(int64) :: iteration_histogram(N_ITERATION_BINS) = 0
+    INTEGER(int64) :: not_converged = 0
+
+    ! Entry points nested in an entry point (co2_concentration_in_stomata_iteration
+    ! calls co2_concentration_in_stomata_invariants) are only timed at the outermost.
+    INTEGER :: entry_depth = 0
+    !$omp threadprivate(entry_depth)
+
+    contains
+
+    subroutine instrumentation_start(clock)
+        ! Start a timer. Pass the same clock to instrumentation_stop.
+        INTEGER(int64), intent(out) :: clock
+
+        call system_clock(clock)
+    end subroutine
+
+    subroutine instrumentation_stop(timer, clock)
+        ! Add the time since instrumentation_start(clock) and one call to timer.
+        INTEGER, intent(in) :: timer
+        INTEGER(int64), intent(in) :: clock
+
+        INTEGER(int64) :: now
+
+        call system_clock(now)
+        !$omp atomic
+        call_counts(timer) = call_counts(timer) + 1
+        !$omp atomic
+        clock_ticks(timer) = clock_ticks(timer) + (now - clock)
+    end subroutine
+
+    subroutine instrumentation_entry_start(clock)
+        ! Start timing an entry point. Pass the same clock to instrumentation_entry_stop.
+        INTEGER(int64), intent(out) :: clock
+
+        entry_depth = entry_depth + 1
+        call system_clock(clock)
+    end subroutine
+
+    subroutine instrumentation_entry_stop(clock)
+        ! Add the entry point time to TIMER_ENTRY_POINT unless it is nested in another.
+        INTEGER(int64), intent(in) :: clock
+
+        entry_depth = entry_depth - 1
+        if (entry_depth == 0) call instrumentation_stop(TIMER_ENTRY_POINT, clock)
+    end subroutine
+
+    subroutine instrumentation_record_loop(iterations, converged)
+        ! Count a finished c_i loop in the iteration histogram.
+        INTEGER, intent(in) :: iterations
+        LOGICAL, intent(in) :: converged
+
+        INTEGER :: bin
+
+        bin = max(1, min(iterations, N_ITERATION_BINS))
+        !$omp atomic
+        iteration_histogram(bin) = iteration_histogram(bin) + 1
+        if (.not. converged) then
+            !$omp atomic
+            not_converged = not_converged + 1
+        end if
+    end subroutine
+
+    subroutine instrumentation_reset()
+        call_counts = 0
+        clock_ticks = 0
+        iteration_histogram = 0
+        not_converged = 0
+    end subroutine
+
+    subroutine instrumentation_read(calls, ticks, histogram, loops_not_converged, clock_rate)
+        ! Copy the counters out. Times are clock_ticks / clock_rate seconds.
+        INTEGER(int64), dimension(N_TIMERS), intent(out) :: calls
+        INTEGER(int64), dimension(N_TIMERS), intent(out) :: ticks
+        INTEGER(int64), dimension(N_ITERATION_BINS), intent(out) :: histogram
+        INTEGER(int64), intent(out) :: loops_not_converged
+        INTEGER(int64), intent(out) :: clock_rate
+
+        calls = call_counts
+        ticks = clock_ticks
+        histogram = iteration_histogram
+        loops_not_converged = not_converged
+        call system_clock(count_rate=clock_rate)
+    end subroutine
+
+end module ewert_instrumentation
@@ -0,0 +1,24 @@
+! Instrumentation hooks of the ewert kernels. #include at the top of the file.
+! Modules using the hooks also need to use ewert_instrumentation.
+!
+! With FORTPY_INSTRUMENT (build.py build --instrument) the hooks call
+! ewert_instrumentation and EWERT_PURE is empty because recording into the
+! counters is a side effect. Otherwise the hooks expand to nothing and
+! EWERT_PURE is pure so the default build is unchanged.
+#ifdef FORTPY_INSTRUMENT
+#define EWERT_PURE
+#define INSTRUMENT_CLOCK(clock) INTEGER(CLOCK_KIND) :: clock
+#define INSTRUMENT_START(clock) call instrumentation_start(clock)
+#define INSTRUMENT_STOP(timer, clock) call instrumentation_stop(timer, clock)
+#define INSTRUMENT_ENTRY_START(clock) call instrumentation_entry_start(clock)
+#define INSTRUMENT_ENTRY_STOP(clock) call instrumentation_entry_stop(clock)
+#define INSTRUMENT_RECORD_LOOP(iterations, converged) call instrumentation_record_loop(iterations, converged)
+#else
+#define EWERT_PURE pure
+#define INSTRUMENT_CLOCK(clock)
+#define INSTRUMENT_START(clock)
+#define INSTRUMENT_STOP(timer, clock)
+#define INSTRUMENT_ENTRY_START(clock)
+#define INSTRUMENT_ENTRY_STOP(clock)
+#define INSTRUMENT_RECORD_LOOP(iterations, converged)
+#endif
@@ -0,0 +1,498 @@
+#include "ewert_instrumentation.h"
+module ewert_kernels
+    ! Option specialised kernels of the stomata CO2 loop.
+    !
+    ! Each ModelOptions combination has its own c_i loop instantiated from
+    ! ewert_loop_kernel.inc with the options as literals:
+    ! - use_O3_damage=.false. skips the ozone damage and lifespan calculations
+    !   (fO3_h = fO3_d = fO3_l = 1) so opt_full_night_recovery has no effect.
+    ! - precomputed_f_VPD=.true. takes f_VPD from the inputs instead of
+    !   calculating it from g_sto every iteration.
+    ! select_loop_kernel picks the variant once per run.
+    !
+    ! The kernels are EWERT_PURE, pure unless built with FORTPY_INSTRUMENT.
+    use ewert_types
+    use ewert_helpers
+    use ewert_instrumentation
+    implicit none
+
+    private
+    public :: SOLVER_RELAXATION
+    public :: SOLVER_SECANT
+    public :: loop_kernel
+    public :: calc_loop_invariants
+    public :: calc_loop_invariants_no_O3
+    public :: calc_inner_iteration
+    public :: select_loop_kernel
+    public :: run_loop_kernel
+    public :: run_loop_kernel_batch
+
+    ! c_i solver modes for the stomata CO2 loop
+    ! SOLVER_RELAXATION: damped fixed point update c_i + damping * (co2_supply - c_i)
+    ! SOLVER_SECANT: secant root find on co2_supply - c_i (Anderson depth 1).
+    ! g_sto lags c_i by one iteration through f_VPD so the secant solver also
+    ! waits for g_sto to settle. As c_i = c_a - A_n * (1.6 / g_sto + ...), a
+    ! relative g_sto step of d moves c_i by about (c_a - c_i) * d, which is below
+    ! c_i * d. The secant solver exits once c_i * d is under the tolerance [ppm],
+    ! the same bound as c_i_diff. A plain relative test on g_sto leaves c_i
+    ! further than the tolerance from the converged value about 5x as often.
+    ! For small tolerances that bound is below the REAL(wp) resolution, so a step
+    ! of at most G_STO_SETTLED_ULPS spacings of g_sto also counts as settled.
+    INTEGER, parameter :: SOLVER_RELAXATION = 0
+    INTEGER, parameter :: SOLVER_SECANT = 1
+    REAL(wp), parameter :: G_STO_SETTLED_ULPS = 4.0_wp
+
+    abstract interface
+        EWERT_PURE function loop_kernel(inputs, c_i_in, g_sto_in, max_iterations, tolerance, damping, solver) &
+                result(out)
+            import :: CO2_Constant_Loop_Inputs, wp
+            TYPE(CO2_Constant_Loop_Inputs), intent(in) :: inputs
+            REAL(wp), intent(in) :: c_i_in
+            REAL(wp), intent(in) :: g_sto_in
+            INTEGER, intent(in) :: max_iterations
+            REAL(wp), intent(in) :: tolerance
+            REAL(wp), intent(in) :: damping
+            INTEGER, intent(in) :: solver
+            REAL(wp), dimension(19) :: out
+        end function
+    end interface
+
+    contains
+
+    Pure Function calc_loop_invariants(&
+        O3up, &
+        O3up_acc, &
+        fO3_d_prev, &
+        td_dd, &
+        gamma_1, &
+        gamma_2, &
+        gamma_3, &
+        is_daylight, &
+        t_lse_constant, &
+        t_lem, &
+        t_lep, &
+        t_lse, &
+        t_lma, &
+        hr, &
+        opt_full_night_recovery) result(invariants)
+        ! Factors that do not depend on c_i or g_sto.
+        !
+        ! invariants = [f_LS, f_LA, fO3_d, fO3_h, fO3_l,
+        !               t_lep_ozone, t_lma_ozone, t_lse_ozone, t_l_ozone]
+
+        REAL(wp), intent(in) :: O3up
+        REAL(wp), intent(in) :: O3up_acc
+        REAL(wp), intent(in) :: fO3_d_prev
+        REAL(wp), intent(in) :: td_dd
+        REAL(wp), intent(in) :: gamma_1
+        REAL(wp), intent(in) :: gamma_2
+        REAL(wp), intent(in) :: gamma_3
+        LOGICAL, intent(in) :: is_daylight
+        REAL(wp), intent(in) :: t_lse_constant
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: t_lep
+        REAL(wp), intent(in) :: t_lse
+        REAL(wp), intent(in) :: t_lma
+        INTEGER, intent(in) :: hr
+        LOGICAL, intent(in) :: opt_full_night_recovery
+
+        TYPE (Damage_Factors) :: ozone_damage_factors
+        REAL(wp), dimension(9) :: invariants
+
+        ozone_damage_factors = calc_ozone_damage_factors( &
+            gamma_1=gamma_1, &
+            gamma_2=gamma_2, &
+            gamma_3=gamma_3, &
+            O3up=O3up, &
+            O3up_acc=O3up_acc, &
+            fO3_d_prev=fO3_d_prev, &
+            td_dd=td_dd, &
+            t_lem=t_lem, &
+            t_lma=t_lma, &
+            is_daylight=is_daylight, &
+            hr=hr, &
+            opt_full_night_recovery=opt_full_night_recovery &
+        )
+        invariants = pack_invariants(ozone_damage_factors, td_dd, t_lse_constant, t_lem, t_lep, t_lse)
+    End Function
+
+    Pure Function calc_loop_invariants_no_O3(&
+        td_dd, &
+        t_lse_constant, &
+        t_lem, &
+        t_lep, &
+        t_lse, &
+        t_lma) result(invariants)
+        ! calc_loop_invariants without ozone damage.
+        !
+        ! Equal to calc_loop_invariants with O3up = O3up_acc = 0 and fO3_d_prev = 1.
+
+        REAL(wp), intent(in) :: td_dd
+        REAL(wp), intent(in) :: t_lse_constant
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: t_lep
+        REAL(wp), intent(in) :: t_lse
+        REAL(wp), intent(in) :: t_lma
+
+        REAL(wp), dimension(9) :: invariants
+
+        invariants = pack_invariants( &
+            Damage_Factors( &
+                fO3_h=1.0_wp, &
+                fO3_d=1.0_wp, &
+                fO3_l=1.0_wp, &
+                f_LA=calc_f_LA(t_lem, t_lma, td_dd), &
+                rO3=1.0_wp &
+            ), &
+            td_dd, t_lse_constant, t_lem, t_lep, t_lse)
+    End Function
+
+    Pure Function pack_invariants(ozone_damage_factors, td_dd, t_lse_constant, t_lem, t_lep, t_lse) &
+            result(invariants)
+        ! The leaf lifespan and senescence factor for the damage factors in the invariants layout.
+        TYPE (Damage_Factors), intent(in) :: ozone_damage_factors
+        REAL(wp), intent(in) :: td_dd
+        REAL(wp), intent(in) :: t_lse_constant
+        REAL(wp), intent(in) :: t_lem
+        REAL(wp), intent(in) :: t_lep
+        REAL(wp), intent(in) :: t_lse
+
+        TYPE (Leaf_Life_Span_Values) :: lifespan_with_ozone
+        REAL(wp):: f_LS
+        REAL(wp), dimension(9) :: invariants
+
+        lifespan_with_ozone = calc_ozone_impact_on_lifespan( &
+            t_lse_constant=t_lse_constant, &
+            t_lep=t_lep, &
+            t_lse=t_lse, &
+            t_lem=t_lem, &
+            fO3_l=ozone_damage_factors%fO3_l &
+        )
+
+        f_LS = calc_senescence_factor( &
+            td_dd=td_dd, &
+            t_l_O3=lifespan_with_ozone%t_l, &
+            t_lem=t_lem, &
+            t_lep_O3=lifespan_with_ozone%t_lep, &
+            t_lse_O3=lifespan_with_ozone%t_lse &
+        )
+
+        invariants(1) = f_LS   ! f_LS
+        invariants(2) = ozone_damage_factors%f_LA   ! f_LA
+        invariants(3) = ozone_damage_factors%fO3_d   ! fO3_d
+        invariants(4) = ozone_damage_factors%fO3_h   ! fO3_h
+        invariants(5) = ozone_damage_factors%fO3_l   ! fO3_l
+        invariants(6) = lifespan_with_ozone%t_lep   ! t_lep_ozone
+        invariants(7) = lifespan_with_ozone%t_lma   ! t_lma_ozone
+        invariants(8) = lifespan_with_ozone%t_lse   ! t_lse_ozone
+        invariants(9) = lifespan_with_ozone%t_l   ! t_l_ozone
+    End Function
+
+    EWERT_PURE Function calc_inner_iteration(&
+        c_a, &
+        m, &
+        Gamma, &
+        Gamma_star, &
+        V_cmax, &
+        J, &
+        R_d, &
+        f_SW, &
+        f_VPD, &
+        coefficients, &
+        invariants, &
+        c_i_in, &
+        damping) result(out)
+        ! A single c_i iteration for a given f_VPD using precalculated invariants
+        ! and timestep coefficients.
+        !
+        ! out has the layout of co2_concentration_in_stomata_iteration.
+
+        REAL(wp), intent(in) :: c_a
+        REAL(wp), intent(in) :: m
+        REAL(wp), intent(in) :: Gamma
+        REAL(wp), intent(in) :: Gamma_star
+        REAL(wp), intent(in) :: V_cmax
+        REAL(wp), intent(in) :: J
+        REAL(wp), intent(in) :: R_d
+        REAL(wp), intent(in) :: f_SW
+        REAL(wp), intent(in) :: f_VPD
+        TYPE(Timestep_Coefficients), intent(in) :: coefficients
+        REAL(wp), dimension(9), intent(in) :: invariants
+        REAL(wp), intent(in) :: c_i_in
+        REAL(wp), intent(in) :: damping
+
+        TYPE (CO2_assimilation_rate_factors) co2_assimilation_rate_values
+        REAL(wp)::g_sto
+        REAL(wp)::co2_supply
+        REAL(wp), dimension(18) :: out
+        INSTRUMENT_CLOCK(clock)
+
+        INSTRUMENT_START(clock)
+        co2_assimilation_rate_values = calc_CO2_assimilation_rate(&
+            c_i_in=c_i_in, &
+            V_cmax=V_cmax, &
+            Gamma_star=Gamma_star, &
+            coefficients=coefficients, &
+            fO3_d=invariants(3), &
+            f_LS=invariants(1), &
+            J=J, &
+            R_d=R_d &
+        )
+        INSTRUMENT_STOP(TIMER_ASSIMILATION_RATE, clock)
+
+        INSTRUMENT_START(clock)
+        g_sto = calc_stomatal_conductance(&
+            coefficients=coefficients, &
+            m=m, &
+            Gamma=Gamma, &
+            c_a=c_a, &
+            A_n=co2_assimilation_rate_values%A_n, &
+            f_SW=f_SW, &
+            f_VPD=f_VPD &
+        )
+        INSTRUMENT_STOP(TIMER_STOMATAL_CONDUCTANCE, clock)
+
+        INSTRUMENT_START(clock)
+        co2_supply = calc_CO2_supply( &
+            A_n=co2_assimilation_rate_values%A_n, &
+            c_a=c_a, &
+            g_sto=g_sto, &
+            coefficients=coefficients &
+        )
+        INSTRUMENT_STOP(TIMER_CO2_SUPPLY, clock)
+
+        out=0.0_wp
+        out(1) = c_i_in - (c_i_in - co2_supply) * damping   ! c_i
+        out(2) = abs(c_i_in - co2_supply)   ! c_i_diff
+        out(3) =  g_sto   ! g_sto
+        out(4) = invariants(1)   ! f_LS
+        out(5) = invariants(2)   ! f_LA
+        out(6) = co2_assimilation_rate_values%A_n   ! A_n
+        out(7) = co2_assimilation_rate_values%A_c   ! A_c
+        out(8) = co2_assimilation_rate_values%A_p   ! A_p
+        out(9) = co2_assimilation_rate_values%A_j   ! A_j
+        out(10) = co2_assimilation_rate_values%A_n_limit_factor   ! A_n_limit_factor
+        out(11) = invariants(3)   ! fO3_d
+        out(12) = invariants(4)   ! fO3_h
+        out(13) = invariants(5)   ! fO3_l
+        out(14) = invariants(6)   ! t_lep_ozone
+        out(15) = invariants(7)   ! t_lma_ozone
+        out(16) = invariants(8)   ! t_lse_ozone
+        out(17) = invariants(9)   ! t_l_ozone
+        out(18) = f_VPD   ! f_VPD
+    End Function
+
+    pure subroutine solver_step(out, k, c_i, g_sto, c_i_prev, residual_prev, damping, tolerance, solver, done)
+        ! Apply the solver update to iteration k's output and decide if the loop is done.
+        !
+        ! c_i and g_sto are the values iteration k started from. c_i_prev and
+        ! residual_prev carry the secant history between iterations.
+        REAL(wp), dimension(19), intent(inout) :: out
+        INTEGER, intent(in) :: k
+        REAL(wp), intent(in) :: c_i
+        REAL(wp), intent(in) :: g_sto
+        REAL(wp), intent(inout) :: c_i_prev
+        REAL(wp), intent(inout) :: residual_prev
+        REAL(wp), intent(in) :: damping
+        REAL(wp), intent(in) :: tolerance
+        INTEGER, intent(in) :: solver
+        LOGICAL, intent(out) :: done
+
+        REAL(wp) :: residual
+        REAL(wp) :: g_sto_step
+
+        if (solver == SOLVER_SECANT) then
+            residual = out(1) - c_i
+            if (k > 1 .and. residual /= residual_prev) then
+                out(1) = c_i - residual * (c_i - c_i_prev) / (residual - residual_prev)
+            else
+                out(1) = c_i + damping * residual
+            end if
+            c_i_prev = c_i
+            residual_prev = residual
+        end if
+        out(19) = k
+        done = .false.
+        if (out(2) < tolerance) then
+            done = solver /= SOLVER_SECANT
+            if (.not. done) then
+                g_sto_step = abs(out(3) - g_sto)
+                done = g_sto_step * max(abs(c_i), 1.0_wp) < tolerance * abs(out(3)) .or. &
+                    g_sto_step <= G_STO_SETTLED_ULPS * spacing(out(3))
+            end if
+        end if
+    end subroutine
+
+#define KERNEL_NAME loop_kernel_o3_full_recovery_calc_fvpd
+#define USE_O3_DAMAGE 1
+#define OPT_FULL_NIGHT_RECOVERY .true.
+#define PRECOMPUTED_F_VPD 0
+#include "ewert_loop_kernel.inc"
+
+#define KERNEL_NAME loop_kernel_o3_full_recovery_fixed_fvpd
+#define USE_O3_DAMAGE 1
+#define OPT_FULL_NIGHT_RECOVERY .true.
+#define PRECOMPUTED_F_VPD 1
+#include "ewert_loop_kernel.inc"
+
+#define KERNEL_NAME loop_kernel_o3_midnight_recovery_calc_fvpd
+#define USE_O3_DAMAGE 1
+#define OPT_FULL_NIGHT_RECOVERY .false.
+#define PRECOMPUTED_F_VPD 0
+#include "ewert_loop_kernel.inc"
+
+#define KERNEL_NAME loop_kernel_o3_midnight_recovery_fixed_fvpd
+#define USE_O3_DAMAGE 1
+#define OPT_FULL_NIGHT_RECOVERY .false.
+#define PRECOMPUTED_F_VPD 1
+#include "ewert_loop_kernel.inc"
+
+#define KERNEL_NAME loop_kernel_no_o3_calc_fvpd
+#define USE_O3_DAMAGE 0
+#define OPT_FULL_NIGHT_RECOVERY .false.
+#define PRECOMPUTED_F_VPD 0
+#include "ewert_loop_kernel.inc"
+
+#define KERNEL_NAME loop_kernel_no_o3_fixed_fvpd
+#define USE_O3_DAMAGE 0
+#define OPT_FULL_NIGHT_RECOVERY .false.
+#define PRECOMPUTED_F_VPD 1
+#include "ewert_loop_kernel.inc"
+
+    function select_loop_kernel(opt_full_night_recovery, use_O3_damage, precomputed_f_VPD) result(kernel)
+        ! The loop kernel specialised for the model options.
+        !
+        ! Call once per run and call the returned kernel for every element.
+        LOGICAL, intent(in) :: opt_full_night_recovery
+        LOGICAL, intent(in) :: use_O3_damage
+        LOGICAL, intent(in) :: precomputed_f_VPD
+        procedure(loop_kernel), pointer :: kernel
+
+        if (.not. use_O3_damage) then
+            if (precomputed_f_VPD) then
+                kernel => loop_kernel_no_o3_fixed_fvpd
+            else
+                kernel => loop_kernel_no_o3_calc_fvpd
+            end if
+        else if (opt_full_night_recovery) then
+            if (precomputed_f_VPD) then
+                kernel => loop_kernel_o3_full_recovery_fixed_fvpd
+            else
+                kernel => loop_kernel_o3_full_recovery_calc_fvpd
+            end if
+        else
+            if (precomputed_f_VPD) then
+                kernel => loop_kernel_o3_midnight_recovery_fixed_fvpd
+            else
+                kernel => loop_kernel_o3_midnight_recovery_calc_fvpd
+            end if
+        end if
+    end function
+
+    EWERT_PURE function run_loop_kernel(&
+        inputs, &
+        c_i_in, &
+        g_sto_in, &
+        opt_full_night_recovery, &
+        use_O3_damage, &
+        precomputed_f_VPD, &
+        max_iterations, &
+        tolerance, &
+        damping, &
+        solver) result(out)
+        ! Run the loop kernel specialised for the model options.
+        !
+        ! The pure equivalent of select_loop_kernel for single solves. The options
+        ! are tested once per solve, not per iteration.
+        TYPE(CO2_Constant_Loop_Inputs), intent(in) :: inputs
+        REAL(wp), intent(in) :: c_i_in
+        REAL(wp), intent(in) :: g_sto_in
+        LOGICAL, intent(in) :: opt_full_night_recovery
+        LOGICAL, intent(in) :: use_O3_damage
+        LOGICAL, intent(in) :: precomputed_f_VPD
+        INTEGER, intent(in) :: max_iterations
+        REAL(wp), intent(in) :: tolerance
+        REAL(wp), intent(in) :: damping
+        INTEGER, intent(in) :: solver
+        REAL(wp), dimension(19) :: out
+
+        if (.not. use_O3_damage) then
+            if (precomputed_f_VPD) then
+                out = loop_kernel_no_o3_fixed_fvpd(inputs, c_i_in, g_sto_in, max_iterations, tolerance, &
+                                                   damping, solver)
+            else
+                out = loop_kernel_no_o3_calc_fvpd(inputs, c_i_in, g_sto_in, max_iterations, tolerance, &
+                                                  damping, solver)
+            end if
+        else if (opt_full_night_recovery) then
+            if (precomputed_f_VPD) then
+                out = loop_kernel_o3_full_recovery_fixed_fvpd(inputs, c_i_in, g_sto_in, max_iterations, &
+                                                              tolerance, damping, solver)
+            else
+                out = loop_kernel_o3_full_recovery_calc_fvpd(inputs, c_i_in, g_sto_in, max_iterations, &
+                                                             tolerance, damping, solver)
+            end if
+        else
+            if (precomputed_f_VPD) then
+                out = loop_kernel_o3_midnight_recovery_fixed_fvpd(inputs, c_i_in, g_sto_in, max_iterations, &
+                                                                  tolerance, damping, solver)
+            else
+                out = loop_kernel_o3_midnight_recovery_calc_fvpd(inputs, c_i_in, g_sto_in, max_iterations, &
+                                                                 tolerance, damping, solver)
+            end if
+        end if
+    end function
+
+    subroutine run_loop_kernel_batch(&
+        n, &
+        params, &
+        c_i_in, &
+        g_sto_in, &
+        opt_full_night_recovery, &
+        use_O3_damage, &
+        precomputed_f_VPD, &
+        max_iterations, &
+        tolerance, &
+        damping, &
+        solver, &
+        num_threads, &
+        out)
+        ! Run the loop kernel specialised for the model options over n packed inputs.
+        !
+        ! params(:, i) is the packed CO2_Constant_Loop_Inputs of element i and
+        ! out(:, i) its 19 loop outputs. The elements run in parallel on
+        ! num_threads OpenMP threads.
+        INTEGER, intent(in) :: n
+        REAL(wp), dimension(N_CO2_CONSTANT_LOOP_INPUTS, n), intent(in) :: params
+        REAL(wp), dimension(n), intent(in) :: c_i_in
+        REAL(wp), dimension(n), intent(in) :: g_sto_in
+        LOGICAL, intent(in) :: opt_full_night_recovery
+        LOGICAL, intent(in) :: use_O3_damage
+        LOGICAL, intent(in) :: precomputed_f_VPD
+        INTEGER, intent(in) :: max_iterations
+        REAL(wp), intent(in) :: tolerance
+        REAL(wp), intent(in) :: damping
+        INTEGER, intent(in) :: solver
+        INTEGER, intent(in) :: num_threads
+        REAL(wp), dimension(19, n), intent(inout) :: out
+
+        INTEGER :: i
+        procedure(loop_kernel), pointer :: kernel
+
+        kernel => select_loop_kernel(opt_full_night_recovery, use_O3_damage, precomputed_f_VPD)
+        !$omp parallel do num_threads(num_threads) schedule(guided)
+        do i=1,n
+            out(:, i) = kernel(&
+                inputs=unpack_CO2_constant_loop_inputs(params(:, i)), &
+                c_i_in=c_i_in(i), &
+                g_sto_in=g_sto_in(i), &
+                max_iterations=max_iterations, &
+                tolerance=tolerance, &
+                damping=damping, &
+                solver=solver &
+            )
+        end do
+        !$omp end parallel do
+    end subroutine
+
+end module ewert_kernels
@@ -1,64 +1,96 @@
 module ewert_types
     implicit none
 
+    ! Working precision of all ewert REAL values.
+    ! Compile with -cpp -DEWERT_REAL64 for the double precision (fewert64) build.
+#ifdef EWERT_REAL64
+    INTEGER, parameter :: wp = 8
+#else
+    INTEGER, parameter :: wp = 4
+#endif
+
+    ! Length of the packed CO2_Constant_Loop_Inputs vector.
+    ! The packed layout is the field order of CO2_Constant_Loop_Inputs.
+    ! is_daylight is 1.0 for True and 0.0 for False and hr is a whole number.
+    INTEGER, parameter :: N_CO2_CONSTANT_LOOP_INPUTS = 31
 
     TYPE :: CO2_Constant_Loop_Inputs
-        REAL:: c_a
-        REAL:: e_a
-        REAL:: g_bl
-        REAL:: g_sto_0
-        REAL:: m
-        REAL:: D_0
-        REAL:: O3up
-        REAL:: O3up_acc
-        REAL:: fO3_d_prev
-        REAL:: td_dd
-        REAL:: gamma_1
-        REAL:: gamma_2
-        REAL:: gamma_3
-        REAL:: is_daylight
-        REAL:: t_lse_constant
-        REAL:: t_l_estimate
-        REAL:: t_lem
-        REAL:: t_lep
-        REAL:: t_lse
-        REAL:: t_lma
-        REAL:: Gamma
-        REAL:: Gamma_star
-        REAL:: V_cmax
-        REAL:: K_C
-        REAL:: K_O
-        REAL:: J
-        REAL:: R_d
-        REAL:: e_sat_i
-        REAL:: hr
-        REAL:: f_SW
+        REAL(wp):: c_a
+        REAL(wp):: e_a
+        REAL(wp):: g_bl
+        REAL(wp):: g_sto_0
+        REAL(wp):: m
+        REAL(wp):: D_0
+        REAL(wp):: O3up
+        REAL(wp):: O3up_acc
+        REAL(wp):: fO3_d_prev
+        REAL(wp):: td_dd
+        REAL(wp):: gamma_1
+        REAL(wp):: gamma_2
+        REAL(wp):: gamma_3
+        REAL(wp):: is_daylight
+        REAL(wp):: t_lse_constant
+        REAL(wp):: t_l_estimate
+        REAL(wp):: t_lem
+        REAL(wp):: t_lep
+        REAL(wp):: t_lse
+        REAL(wp):: t_lma
+        REAL(wp):: Gamma
+        REAL(wp):: Gamma_star
+        REAL(wp):: V_cmax
+        REAL(wp):: K_C
+        REAL(wp):: K_O
+        REAL(wp):: J
+        REAL(wp):: R_d
+        REAL(wp):: e_sat_i
+        REAL(wp):: hr
+        REAL(wp):: f_SW
+        REAL(wp):: f_VPD
+    end type
+
+    ! Length of the packed Timestep_Coefficients vector.
+    ! The packed layout is the field order of Timestep_Coefficients.
+    INTEGER, parameter :: N_TIMESTEP_COEFFICIENTS = 9
+
+    TYPE:: Timestep_Coefficients
+    ! Terms of the c_i iteration that only depend on the timestep inputs.
+    ! Calculated once per timestep by calc_timestep_coefficients.
+
+        REAL(wp):: A_p  ! 0.5 * V_cmax
+        REAL(wp):: K_C_O  ! K_C * (1 + O_i / K_O) Michaelis-Menten term of A_c
+        REAL(wp):: A_j_Gamma_star  ! A_j_b * Gamma_star
+        REAL(wp):: g_sto_0_mol  ! g_sto_0 * 1e-6
+        REAL(wp):: g_bl_mol  ! g_bl * 1e-6
+        REAL(wp):: r_bl  ! 1.37 / g_bl boundary layer resistance to CO2
+        REAL(wp):: r_bl_mol  ! 1.37 / g_bl_mol
+        REAL(wp):: e_sat_i_kPa  ! e_sat_i * 1e-3
+        REAL(wp):: g_bl_e_a  ! g_bl_mol * e_a * 1e-3
     end type
 
     TYPE:: Damage_Factors
-        REAL:: fO3_h
-        REAL:: fO3_d
-        REAL:: fO3_l
-        REAL:: f_LA
-        REAL:: rO3
+        REAL(wp):: fO3_h
+        REAL(wp):: fO3_d
+        REAL(wp):: fO3_l
+        REAL(wp):: f_LA
+        REAL(wp):: rO3
     end type
 
     TYPE:: Leaf_Life_Span_Values
     ! """Values associated with leaf lifespan."""
 
-        REAL:: t_lma
-        REAL:: t_lse
-        REAL:: t_lep
-        REAL:: t_l
+        REAL(wp):: t_lma
+        REAL(wp):: t_lse
+        REAL(wp):: t_lep
+        REAL(wp):: t_l
     end type
 
     TYPE::CO2_assimilation_rate_factors
     ! """Variables associated with CO2 assimilation rate."""
 
-        REAL:: A_c
-        REAL:: A_j
-        REAL:: A_p
-        REAL:: A_n
+        REAL(wp):: A_c
+        REAL(wp):: A_j
+        REAL(wp):: A_p
+        REAL(wp):: A_n
         INTEGER:: a_n_limit_factor ! 0 = NA 1 = A_c 2 = A_j 3 = A_p
     end type
 
@@ -1,8 +1,58 @@
 module config
+    use, intrinsic :: iso_c_binding, only: c_int
     implicit none
 
+    ! Number of fields in ConfigShape
+    integer, parameter :: N_CONFIG = 1
+
     TYPE :: ConfigShape
         Integer :: nL
     end type ConfigShape
 
-end module config
\ No newline at end of file
+    ! Pointer wrapper with the layout of an f90wrap handle
+    private :: ConfigShapePtr
+    TYPE :: ConfigShapePtr
+        TYPE(ConfigShape), pointer :: p => NULL()
+    end type ConfigShapePtr
+
+contains
+
+    pure subroutine pack_config(config, values)
+        TYPE(ConfigShape), intent(in) :: config
+        Integer, intent(out) :: values(N_CONFIG)
+        values(1) = config%nL
+    end subroutine pack_config
+
+    pure function unpack_config(values) result(config)
+        Integer, intent(in) :: values(N_CONFIG)
+        TYPE(ConfigShape) :: config
+        config%nL = values(1)
+    end function unpack_config
+
+    ! Pack the ConfigShape behind each f90wrap handle into a column of values
+    subroutine pack_config_handles(handles, values)
+        integer(c_int), intent(in) :: handles(:, :)
+        Integer, intent(inout) :: values(:, :)
+        TYPE(ConfigShapePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            call pack_config(ptr%p, values(:, i))
+        end do
+    end subroutine pack_config_handles
+
+    ! Overwrite the ConfigShape behind each f90wrap handle with a column of values
+    subroutine unpack_config_handles(values, handles)
+        Integer, intent(in) :: values(:, :)
+        integer(c_int), intent(in) :: handles(:, :)
+        TYPE(ConfigShapePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            ptr%p = unpack_config(values(:, i))
+        end do
+    end subroutine unpack_config_handles
+
+end module config
@@ -1,8 +1,72 @@
 module external_state
+    use, intrinsic :: iso_c_binding, only: c_int
     implicit none
 
+    ! Number of fields in ExternalStateShape. Matches the rows of the packed external state
+    integer, parameter :: N_EXTERNAL_STATE = 1
+
     TYPE :: ExternalStateShape
-        REAL :: TsC
+        REAL :: TsC  ! Surface air temperature [degC]
     end type ExternalStateShape
 
-end module external_state
\ No newline at end of file
+    ! Structure of arrays ExternalStateShape with one row per hour and one column per grid cell
+    TYPE :: ExternalStateArrays
+        REAL, allocatable :: TsC(:, :)  ! (n_cells, n_rows) Surface air temperature [degC]
+    end type ExternalStateArrays
+
+    ! Pointer wrapper with the layout of an f90wrap handle
+    private :: ExternalStateShapePtr
+    TYPE :: ExternalStateShapePtr
+        TYPE(ExternalStateShape), pointer :: p => NULL()
+    end type ExternalStateShapePtr
+
+contains
+
+    pure subroutine pack_external_state(external_state, values)
+        TYPE(ExternalStateShape), intent(in) :: external_state
+        REAL, intent(out) :: values(N_EXTERNAL_STATE)
+        values(1) = external_state%TsC
+    end subroutine pack_external_state
+
+    pure function unpack_external_state(values) result(external_state)
+        REAL, intent(in) :: values(N_EXTERNAL_STATE)
+        TYPE(ExternalStateShape) :: external_state
+        external_state%TsC = values(1)
+    end function unpack_external_state
+
+    ! Pack the ExternalStateShape behind each f90wrap handle into a column of values
+    subroutine pack_external_state_handles(handles, values)
+        integer(c_int), intent(in) :: handles(:, :)
+        REAL, intent(inout) :: values(:, :)
+        TYPE(ExternalStateShapePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            call pack_external_state(ptr%p, values(:, i))
+        end do
+    end subroutine pack_external_state_handles
+
+    ! Overwrite the ExternalStateShape behind each f90wrap handle with a column of values
+    subroutine unpack_external_state_handles(values, handles)
+        REAL, intent(in) :: values(:, :)
+        integer(c_int), intent(in) :: handles(:, :)
+        TYPE(ExternalStateShapePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            ptr%p = unpack_external_state(values(:, i))
+        end do
+    end subroutine unpack_external_state_handles
+
+    subroutine allocate_external_state_arrays(external_states, n_cells, n_rows)
+        TYPE(ExternalStateArrays), intent(inout) :: external_states
+        integer, intent(in) :: n_cells
+        integer, intent(in) :: n_rows
+        if (allocated(external_states%TsC)) deallocate(external_states%TsC)
+        allocate(external_states%TsC(n_cells, n_rows))
+        external_states%TsC = 0.0
+    end subroutine allocate_external_state_arrays
+
+end module external_state
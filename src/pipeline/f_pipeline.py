@@ -2,70 +2,56 @@ from __future__ import print_function, absolute_import, division
 import _pipeline
 import f90wrap.runtime
 import logging
+import numpy
+import warnings
+import weakref
 
 class Config(f90wrap.runtime.FortranModule):
     """
     Module config
-    
-    
-    Defined at config.fpp lines 5-8
-    
+    Defined at config.fpp lines 5-49
     """
     @f90wrap.runtime.register_class("pipeline.ConfigShape")
     class ConfigShape(f90wrap.runtime.FortranDerivedType):
         """
         Type(name=configshape)
-        
-        
-        Defined at config.fpp lines 7-8
-        
+        Defined at config.fpp lines 10-11
         """
         def __init__(self, handle=None):
             """
-            self = Configshape()
-            
-            
-            Defined at config.fpp lines 7-8
+            Automatically generated constructor for configshape
             
+            self = Configshape()
+            Defined at config.fpp lines 10-11
             
             Returns
             -------
             this : Configshape
-            	Object to be constructed
-            
+                Object to be constructed
             
-            Automatically generated constructor for configshape
             """
             f90wrap.runtime.FortranDerivedType.__init__(self)
-            result = _pipeline.f90wrap_configshape_initialise()
-            self._handle = result[0] if isinstance(result, tuple) else result
-        
-        def __del__(self):
-            """
-            Destructor for class Configshape
-            
-            
-            Defined at config.fpp lines 7-8
-            
-            Parameters
-            ----------
-            this : Configshape
-            	Object to be destructed
-            
-            
-            Automatically generated destructor for configshape
-            """
+            if isinstance(handle, numpy.ndarray) and handle.ndim == 1 and handle.dtype.num \
+                == 5:
+                self._handle = handle
+                self._alloc = True
+            else:
+                result = _pipeline.f90wrap_config__configshape_initialise()
+                self._handle = result[0] if isinstance(result, tuple) else result
+                self._alloc = True
+            self._setup_finalizer()
+        
+        def _setup_finalizer(self):
+            """Set up weak reference destructor to prevent Fortran memory leaks."""
             if self._alloc:
-                _pipeline.f90wrap_configshape_finalise(this=self._handle)
+                destructor = getattr(_pipeline, "f90wrap_config__configshape_finalise")
+                self._finalizer = weakref.finalize(self, destructor, self._handle)
         
         @property
         def nl(self):
             """
-            Element nl ftype=integer  pytype=int
-            
-            
-            Defined at config.fpp line 8
-            
+            Element nl ftype=integer  pytype=int32
+            Defined at config.fpp line 11
             """
             return _pipeline.f90wrap_configshape__get__nl(self._handle)
         
@@ -83,83 +69,222 @@ class Config(f90wrap.runtime.FortranModule):
         _dt_array_initialisers = []
         
     
+    @staticmethod
+    def pack_config(self, values, interface_call=False):
+        """
+        pack_config(self, values)
+        Defined at config.fpp lines 19-22
+        
+        Parameters
+        ----------
+        config_ : Configshape
+        values : int array
+        """
+        _pipeline.f90wrap_config__pack_config(config_=self._handle, values=values)
+    
+    @staticmethod
+    def unpack_config(values, interface_call=False):
+        """
+        config_ = unpack_config(values)
+        Defined at config.fpp lines 24-27
+        
+        Parameters
+        ----------
+        values : int array
+        
+        Returns
+        -------
+        config_ : Configshape
+        """
+        config_ = _pipeline.f90wrap_config__unpack_config(values=values)
+        config_ = \
+            f90wrap.runtime.lookup_class("pipeline.ConfigShape").from_handle(config_, \
+            alloc=True)
+        config_._setup_finalizer()
+        return config_
+    
+    @staticmethod
+    def pack_config_handles(handles, values, interface_call=False):
+        """
+        pack_config_handles(handles, values)
+        Defined at config.fpp lines 30-38
+        
+        Parameters
+        ----------
+        handles : int array
+        values : int array
+        """
+        _pipeline.f90wrap_config__pack_config_handles(handles=handles, values=values)
+    
+    @staticmethod
+    def unpack_config_handles(values, handles, interface_call=False):
+        """
+        unpack_config_handles(values, handles)
+        Defined at config.fpp lines 41-49
+        
+        Parameters
+        ----------
+        values : int array
+        handles : int array
+        """
+        _pipeline.f90wrap_config__unpack_config_handles(values=values, handles=handles)
+    
+    @property
+    def n_config(self):
+        """
+        Element n_config ftype=integer pytype=int32
+        Defined at config.fpp line 9
+        """
+        return _pipeline.f90wrap_config__get__n_config()
+    
+    def get_n_config(self):
+        return self.n_config
+    
+    def __str__(self):
+        ret = ['<config>{\n']
+        ret.append('    n_config : ')
+        ret.append(repr(self.n_config))
+        ret.append('}')
+        return ''.join(ret)
+    
     _dt_array_initialisers = []
     
+    
 
 config = Config()
 
 class External_State(f90wrap.runtime.FortranModule):
     """
     Module external_state
-    
-    
-    Defined at external_state.fpp lines 5-8
-    
+    Defined at external_state.fpp lines 5-61
     """
     @f90wrap.runtime.register_class("pipeline.ExternalStateShape")
     class ExternalStateShape(f90wrap.runtime.FortranDerivedType):
         """
         Type(name=externalstateshape)
-        
-        
-        Defined at external_state.fpp lines 7-8
-        
+        Defined at external_state.fpp lines 10-11
         """
         def __init__(self, handle=None):
             """
-            self = Externalstateshape()
-            
-            
-            Defined at external_state.fpp lines 7-8
+            Automatically generated constructor for externalstateshape
             
+            self = Externalstateshape()
+            Defined at external_state.fpp lines 10-11
             
             Returns
             -------
             this : Externalstateshape
-            	Object to be constructed
+                Object to be constructed
             
-            
-            Automatically generated constructor for externalstateshape
             """
             f90wrap.runtime.FortranDerivedType.__init__(self)
-            result = _pipeline.f90wrap_externalstateshape_initialise()
-            self._handle = result[0] if isinstance(result, tuple) else result
+            if isinstance(handle, numpy.ndarray) and handle.ndim == 1 and handle.dtype.num \
+                == 5:
+                self._handle = handle
+                self._alloc = True
+            else:
+                result = _pipeline.f90wrap_external_state__externalstateshape_initialise()
+                self._handle = result[0] if isinstance(result, tuple) else result
+                self._alloc = True
+            self._setup_finalizer()
+        
+        def _setup_finalizer(self):
+            """Set up weak reference destructor to prevent Fortran memory leaks."""
+            if self._alloc:
+                destructor = getattr(_pipeline, \
+                    "f90wrap_external_state__externalstateshape_finalise")
+                self._finalizer = weakref.finalize(self, destructor, self._handle)
         
-        def __del__(self):
+        @property
+        def tsc(self):
             """
-            Destructor for class Externalstateshape
-            
-            
-            Defined at external_state.fpp lines 7-8
+            Element tsc ftype=real  pytype=float32
+            Defined at external_state.fpp line 11
+            """
+            return _pipeline.f90wrap_externalstateshape__get__tsc(self._handle)
+        
+        @tsc.setter
+        def tsc(self, tsc):
+            _pipeline.f90wrap_externalstateshape__set__tsc(self._handle, tsc)
+        
+        def __str__(self):
+            ret = ['<externalstateshape>{\n']
+            ret.append('    tsc : ')
+            ret.append(repr(self.tsc))
+            ret.append('}')
+            return ''.join(ret)
+        
+        _dt_array_initialisers = []
+        
+    
+    @f90wrap.runtime.register_class("pipeline.ExternalStateArrays")
+    class ExternalStateArrays(f90wrap.runtime.FortranDerivedType):
+        """
+        Type(name=externalstatearrays)
+        Defined at external_state.fpp lines 14-15
+        """
+        def __init__(self, handle=None):
+            """
+            Automatically generated constructor for externalstatearrays
             
-            Parameters
-            ----------
-            this : Externalstateshape
-            	Object to be destructed
+            self = Externalstatearrays()
+            Defined at external_state.fpp lines 14-15
             
+            Returns
+            -------
+            this : Externalstatearrays
+                Object to be constructed
             
-            Automatically generated destructor for externalstateshape
             """
+            f90wrap.runtime.FortranDerivedType.__init__(self)
+            if isinstance(handle, numpy.ndarray) and handle.ndim == 1 and handle.dtype.num \
+                == 5:
+                self._handle = handle
+                self._alloc = True
+            else:
+                result = _pipeline.f90wrap_external_state__externalstatearrays_initialise()
+                self._handle = result[0] if isinstance(result, tuple) else result
+                self._alloc = True
+            self._setup_finalizer()
+        
+        def _setup_finalizer(self):
+            """Set up weak reference destructor to prevent Fortran memory leaks."""
             if self._alloc:
-                _pipeline.f90wrap_externalstateshape_finalise(this=self._handle)
+                destructor = getattr(_pipeline, \
+                    "f90wrap_external_state__externalstatearrays_finalise")
+                self._finalizer = weakref.finalize(self, destructor, self._handle)
         
         @property
         def tsc(self):
             """
-            Element tsc ftype=real  pytype=float
-            
-            
-            Defined at external_state.fpp line 8
-            
+            Element tsc ftype=real pytype=float array
+            Defined at external_state.fpp line 15
             """
-            return _pipeline.f90wrap_externalstateshape__get__tsc(self._handle)
+            array_ndim, array_type, array_shape, array_handle = \
+                _pipeline.f90wrap_externalstatearrays__array__tsc(self._handle)
+            array_hash = hash((array_ndim, array_type, tuple(array_shape), array_handle))
+            tsc = self._arrays.get(array_hash)
+            if tsc is not None:
+                # Validate cached array: check data pointer matches current handle (issue #222)
+                # Arrays can be deallocated and reallocated at same address, invalidating cache
+                if tsc.ctypes.data != array_handle:
+                    tsc = None
+            if tsc is None:
+                try:
+                    tsc = f90wrap.runtime.get_array(f90wrap.runtime.sizeof_fortran_t,
+                                            self._handle,
+                                            _pipeline.f90wrap_externalstatearrays__array__tsc)
+                except TypeError:
+                    tsc = f90wrap.runtime.direct_c_array(array_type, array_shape, array_handle)
+                self._arrays[array_hash] = tsc
+            return tsc
         
         @tsc.setter
         def tsc(self, tsc):
-            _pipeline.f90wrap_externalstateshape__set__tsc(self._handle, tsc)
+            self.tsc[...] = tsc
         
         def __str__(self):
-            ret = ['<externalstateshape>{\n']
+            ret = ['<externalstatearrays>{\n']
             ret.append('    tsc : ')
             ret.append(repr(self.tsc))
             ret.append('}')
@@ -168,122 +293,475 @@ class External_State(f90wrap.runtime.FortranModule):
         _dt_array_initialisers = []
         
     
+    @staticmethod
+    def pack_external_state(self, values, interface_call=False):
+        """
+        pack_external_state(self, values)
+        Defined at external_state.fpp lines 23-26
+        
+        Parameters
+        ----------
+        external_state_ : Externalstateshape
+        values : float array
+        """
+        _pipeline.f90wrap_external_state__pack_external_state(external_state_=self._handle, \
+            values=values)
+    
+    @staticmethod
+    def unpack_external_state(values, interface_call=False):
+        """
+        external_state_ = unpack_external_state(values)
+        Defined at external_state.fpp lines 28-31
+        
+        Parameters
+        ----------
+        values : float array
+        
+        Returns
+        -------
+        external_state_ : Externalstateshape
+        """
+        external_state_ = \
+            _pipeline.f90wrap_external_state__unpack_external_state(values=values)
+        external_state_ = \
+            f90wrap.runtime.lookup_class("pipeline.ExternalStateShape").from_handle(external_state_, \
+            alloc=True)
+        external_state_._setup_finalizer()
+        return external_state_
+    
+    @staticmethod
+    def pack_external_state_handles(handles, values, interface_call=False):
+        """
+        pack_external_state_handles(handles, values)
+        Defined at external_state.fpp lines 34-42
+        
+        Parameters
+        ----------
+        handles : int array
+        values : float array
+        """
+        _pipeline.f90wrap_external_state__pack_external_state_handles(handles=handles, \
+            values=values)
+    
+    @staticmethod
+    def unpack_external_state_handles(values, handles, interface_call=False):
+        """
+        unpack_external_state_handles(values, handles)
+        Defined at external_state.fpp lines 45-53
+        
+        Parameters
+        ----------
+        values : float array
+        handles : int array
+        """
+        _pipeline.f90wrap_external_state__unpack_external_state_handles(values=values, \
+            handles=handles)
+    
+    @staticmethod
+    def allocate_external_state_arrays(self, n_cells, n_rows, interface_call=False):
+        """
+        allocate_external_state_arrays(self, n_cells, n_rows)
+        Defined at external_state.fpp lines 55-61
+        
+        Parameters
+        ----------
+        external_states : Externalstatearrays
+        n_cells : int32
+        n_rows : int32
+        """
+        _pipeline.f90wrap_external_state__allocate_external_state_arrays(external_states=self._handle, \
+            n_cells=n_cells, n_rows=n_rows)
+    
+    @property
+    def n_external_state(self):
+        """
+        Element n_external_state ftype=integer pytype=int32
+        Defined at external_state.fpp line 9
+        """
+        return _pipeline.f90wrap_external_state__get__n_external_state()
+    
+    def get_n_external_state(self):
+        return self.n_external_state
+    
+    def __str__(self):
+        ret = ['<external_state>{\n']
+        ret.append('    n_external_state : ')
+        ret.append(repr(self.n_external_state))
+        ret.append('}')
+        return ''.join(ret)
+    
     _dt_array_initialisers = []
     
+    
 
 external_state = External_State()
 
 class Model_State(f90wrap.runtime.FortranModule):
     """
     Module model_state
-    
-    
-    Defined at model_state.fpp lines 5-8
-    
+    Defined at model_state.fpp lines 5-65
     """
     @f90wrap.runtime.register_class("pipeline.ModelState")
     class ModelState(f90wrap.runtime.FortranDerivedType):
         """
         Type(name=modelstate)
-        
-        
-        Defined at model_state.fpp lines 7-8
-        
+        Defined at model_state.fpp lines 10-12
         """
         def __init__(self, handle=None):
             """
-            self = Modelstate()
-            
-            
-            Defined at model_state.fpp lines 7-8
+            Automatically generated constructor for modelstate
             
+            self = Modelstate()
+            Defined at model_state.fpp lines 10-12
             
             Returns
             -------
             this : Modelstate
-            	Object to be constructed
+                Object to be constructed
             
-            
-            Automatically generated constructor for modelstate
             """
             f90wrap.runtime.FortranDerivedType.__init__(self)
-            result = _pipeline.f90wrap_modelstate_initialise()
-            self._handle = result[0] if isinstance(result, tuple) else result
+            if isinstance(handle, numpy.ndarray) and handle.ndim == 1 and handle.dtype.num \
+                == 5:
+                self._handle = handle
+                self._alloc = True
+            else:
+                result = _pipeline.f90wrap_model_state__modelstate_initialise()
+                self._handle = result[0] if isinstance(result, tuple) else result
+                self._alloc = True
+            self._setup_finalizer()
+        
+        def _setup_finalizer(self):
+            """Set up weak reference destructor to prevent Fortran memory leaks."""
+            if self._alloc:
+                destructor = getattr(_pipeline, "f90wrap_model_state__modelstate_finalise")
+                self._finalizer = weakref.finalize(self, destructor, self._handle)
         
-        def __del__(self):
+        @property
+        def hr(self):
             """
-            Destructor for class Modelstate
-            
-            
-            Defined at model_state.fpp lines 7-8
+            Element hr ftype=real  pytype=float32
+            Defined at model_state.fpp line 11
+            """
+            return _pipeline.f90wrap_modelstate__get__hr(self._handle)
+        
+        @hr.setter
+        def hr(self, hr):
+            _pipeline.f90wrap_modelstate__set__hr(self._handle, hr)
+        
+        @property
+        def td(self):
+            """
+            Element td ftype=real  pytype=float32
+            Defined at model_state.fpp line 12
+            """
+            return _pipeline.f90wrap_modelstate__get__td(self._handle)
+        
+        @td.setter
+        def td(self, td):
+            _pipeline.f90wrap_modelstate__set__td(self._handle, td)
+        
+        def __str__(self):
+            ret = ['<modelstate>{\n']
+            ret.append('    hr : ')
+            ret.append(repr(self.hr))
+            ret.append(',\n    td : ')
+            ret.append(repr(self.td))
+            ret.append('}')
+            return ''.join(ret)
+        
+        _dt_array_initialisers = []
+        
+    
+    @f90wrap.runtime.register_class("pipeline.ModelStateArrays")
+    class ModelStateArrays(f90wrap.runtime.FortranDerivedType):
+        """
+        Type(name=modelstatearrays)
+        Defined at model_state.fpp lines 15-17
+        """
+        def __init__(self, handle=None):
+            """
+            Automatically generated constructor for modelstatearrays
             
-            Parameters
-            ----------
-            this : Modelstate
-            	Object to be destructed
+            self = Modelstatearrays()
+            Defined at model_state.fpp lines 15-17
             
+            Returns
+            -------
+            this : Modelstatearrays
+                Object to be constructed
             
-            Automatically generated destructor for modelstate
             """
+            f90wrap.runtime.FortranDerivedType.__init__(self)
+            if isinstance(handle, numpy.ndarray) and handle.ndim == 1 and handle.dtype.num \
+                == 5:
+                self._handle = handle
+                self._alloc = True
+            else:
+                result = _pipeline.f90wrap_model_state__modelstatearrays_initialise()
+                self._handle = result[0] if isinstance(result, tuple) else result
+                self._alloc = True
+            self._setup_finalizer()
+        
+        def _setup_finalizer(self):
+            """Set up weak reference destructor to prevent Fortran memory leaks."""
             if self._alloc:
-                _pipeline.f90wrap_modelstate_finalise(this=self._handle)
+                destructor = getattr(_pipeline, \
+                    "f90wrap_model_state__modelstatearrays_finalise")
+                self._finalizer = weakref.finalize(self, destructor, self._handle)
         
         @property
         def hr(self):
             """
-            Element hr ftype=real  pytype=float
-            
-            
-            Defined at model_state.fpp line 8
-            
+            Element hr ftype=real pytype=float array
+            Defined at model_state.fpp line 16
             """
-            return _pipeline.f90wrap_modelstate__get__hr(self._handle)
+            array_ndim, array_type, array_shape, array_handle = \
+                _pipeline.f90wrap_modelstatearrays__array__hr(self._handle)
+            array_hash = hash((array_ndim, array_type, tuple(array_shape), array_handle))
+            hr = self._arrays.get(array_hash)
+            if hr is not None:
+                # Validate cached array: check data pointer matches current handle (issue #222)
+                # Arrays can be deallocated and reallocated at same address, invalidating cache
+                if hr.ctypes.data != array_handle:
+                    hr = None
+            if hr is None:
+                try:
+                    hr = f90wrap.runtime.get_array(f90wrap.runtime.sizeof_fortran_t,
+                                            self._handle,
+                                            _pipeline.f90wrap_modelstatearrays__array__hr)
+                except TypeError:
+                    hr = f90wrap.runtime.direct_c_array(array_type, array_shape, array_handle)
+                self._arrays[array_hash] = hr
+            return hr
         
         @hr.setter
         def hr(self, hr):
-            _pipeline.f90wrap_modelstate__set__hr(self._handle, hr)
+            self.hr[...] = hr
+        
+        @property
+        def td(self):
+            """
+            Element td ftype=real pytype=float array
+            Defined at model_state.fpp line 17
+            """
+            array_ndim, array_type, array_shape, array_handle = \
+                _pipeline.f90wrap_modelstatearrays__array__td(self._handle)
+            array_hash = hash((array_ndim, array_type, tuple(array_shape), array_handle))
+            td = self._arrays.get(array_hash)
+            if td is not None:
+                # Validate cached array: check data pointer matches current handle (issue #222)
+                # Arrays can be deallocated and reallocated at same address, invalidating cache
+                if td.ctypes.data != array_handle:
+                    td = None
+            if td is None:
+                try:
+                    td = f90wrap.runtime.get_array(f90wrap.runtime.sizeof_fortran_t,
+                                            self._handle,
+                                            _pipeline.f90wrap_modelstatearrays__array__td)
+                except TypeError:
+                    td = f90wrap.runtime.direct_c_array(array_type, array_shape, array_handle)
+                self._arrays[array_hash] = td
+            return td
+        
+        @td.setter
+        def td(self, td):
+            self.td[...] = td
         
         def __str__(self):
-            ret = ['<modelstate>{\n']
+            ret = ['<modelstatearrays>{\n']
             ret.append('    hr : ')
             ret.append(repr(self.hr))
+            ret.append(',\n    td : ')
+            ret.append(repr(self.td))
             ret.append('}')
             return ''.join(ret)
         
         _dt_array_initialisers = []
         
     
+    @staticmethod
+    def pack_model_state(self, values, interface_call=False):
+        """
+        pack_model_state(self, values)
+        Defined at model_state.fpp lines 25-29
+        
+        Parameters
+        ----------
+        state : Modelstate
+        values : float array
+        """
+        _pipeline.f90wrap_model_state__pack_model_state(state=self._handle, \
+            values=values)
+    
+    @staticmethod
+    def unpack_model_state(values, interface_call=False):
+        """
+        state = unpack_model_state(values)
+        Defined at model_state.fpp lines 31-35
+        
+        Parameters
+        ----------
+        values : float array
+        
+        Returns
+        -------
+        state : Modelstate
+        """
+        state = _pipeline.f90wrap_model_state__unpack_model_state(values=values)
+        state = f90wrap.runtime.lookup_class("pipeline.ModelState").from_handle(state, \
+            alloc=True)
+        state._setup_finalizer()
+        return state
+    
+    @staticmethod
+    def pack_model_state_handles(handles, values, interface_call=False):
+        """
+        pack_model_state_handles(handles, values)
+        Defined at model_state.fpp lines 38-46
+        
+        Parameters
+        ----------
+        handles : int array
+        values : float array
+        """
+        _pipeline.f90wrap_model_state__pack_model_state_handles(handles=handles, \
+            values=values)
+    
+    @staticmethod
+    def unpack_model_state_handles(values, handles, interface_call=False):
+        """
+        unpack_model_state_handles(values, handles)
+        Defined at model_state.fpp lines 49-57
+        
+        Parameters
+        ----------
+        values : float array
+        handles : int array
+        """
+        _pipeline.f90wrap_model_state__unpack_model_state_handles(values=values, \
+            handles=handles)
+    
+    @staticmethod
+    def allocate_model_state_arrays(self, n_cells, interface_call=False):
+        """
+        allocate_model_state_arrays(self, n_cells)
+        Defined at model_state.fpp lines 59-65
+        
+        Parameters
+        ----------
+        states : Modelstatearrays
+        n_cells : int32
+        """
+        _pipeline.f90wrap_model_state__allocate_model_state_arrays(states=self._handle, \
+            n_cells=n_cells)
+    
+    @property
+    def n_model_state(self):
+        """
+        Element n_model_state ftype=integer pytype=int32
+        Defined at model_state.fpp line 9
+        """
+        return _pipeline.f90wrap_model_state__get__n_model_state()
+    
+    def get_n_model_state(self):
+        return self.n_model_state
+    
+    def __str__(self):
+        ret = ['<model_state>{\n']
+        ret.append('    n_model_state : ')
+        ret.append(repr(self.n_model_state))
+        ret.append('}')
+        return ''.join(ret)
+    
     _dt_array_initialisers = []
     
+    
 
 model_state = Model_State()
 
 class Pipeline(f90wrap.runtime.FortranModule):
     """
     Module pipeline
-    
-    
-    Defined at pipeline.fpp lines 5-28
-    
+    Defined at pipeline.fpp lines 5-87
     """
     @staticmethod
-    def hello(val_in):
+    def run_rows(self, external_state, interface_call=False):
         """
-        outval = hello(val_in)
+        final_state = run_rows(self, external_state)
+        Defined at pipeline.fpp lines 41-49
         
+        Parameters
+        ----------
+        initial_state : Modelstate
+        external_state : float array
         
-        Defined at pipeline.fpp lines 25-28
+        Returns
+        -------
+        final_state : Modelstate
+        """
+        final_state = _pipeline.f90wrap_pipeline__run_rows(initial_state=self._handle, \
+            external_state=external_state)
+        final_state = \
+            f90wrap.runtime.lookup_class("pipeline.ModelState").from_handle(final_state, \
+            alloc=True)
+        final_state._setup_finalizer()
+        return final_state
+    
+    @staticmethod
+    def run_rows_trace(self, external_state, trace, interface_call=False):
+        """
+        final_state = run_rows_trace(self, external_state, trace)
+        Defined at pipeline.fpp lines 56-69
         
         Parameters
         ----------
-        val_in : float
+        initial_state : Modelstate
+        external_state : float array
+        trace : float array
         
         Returns
         -------
-        outval : float
+        final_state : Modelstate
+        """
+        final_state = \
+            _pipeline.f90wrap_pipeline__run_rows_trace(initial_state=self._handle, \
+            external_state=external_state, trace=trace)
+        final_state = \
+            f90wrap.runtime.lookup_class("pipeline.ModelState").from_handle(final_state, \
+            alloc=True)
+        final_state._setup_finalizer()
+        return final_state
+    
+    @staticmethod
+    def run_rows_cells(self, external_states, interface_call=False):
+        """
+        run_rows_cells(self, external_states)
+        Defined at pipeline.fpp lines 75-82
         
+        Parameters
+        ----------
+        states : Modelstatearrays
+        external_states : Externalstatearrays
+        """
+        _pipeline.f90wrap_pipeline__run_rows_cells(states=self._handle, \
+            external_states=external_states._handle)
+    
+    @staticmethod
+    def hello(val_in, interface_call=False):
+        """
+        outval = hello(val_in)
+        Defined at pipeline.fpp lines 84-87
+        
+        Parameters
+        ----------
+        val_in : float32
+        
+        Returns
+        -------
+        outval : float32
         """
-        outval = _pipeline.f90wrap_hello(val_in=val_in)
+        outval = _pipeline.f90wrap_pipeline__hello(val_in=val_in)
         return outval
     
     _dt_array_initialisers = []
@@ -291,3 +769,58 @@ class Pipeline(f90wrap.runtime.FortranModule):
 
 pipeline = Pipeline()
 
+class Build_Info(f90wrap.runtime.FortranModule):
+    """
+    Module build_info
+    Defined at build_info.fpp lines 6-8
+    """
+    @property
+    def build_profile(self):
+        """
+        Element build_profile ftype=character(len=16) pytype=str
+        Defined at build_info.fpp line 8
+        """
+        return _pipeline.f90wrap_build_info__get__build_profile()
+    
+    @build_profile.setter
+    def build_profile(self, build_profile):
+        _pipeline.f90wrap_build_info__set__build_profile(build_profile)
+    
+    def get_build_profile(self):
+        return self.build_profile
+    
+    def set_build_profile(self, value):
+        self.build_profile = value
+    
+    @property
+    def instrumented(self):
+        """
+        Element instrumented ftype=integer  pytype=int32
+        Defined at build_info.fpp line 9
+        """
+        return _pipeline.f90wrap_build_info__get__instrumented()
+    
+    @instrumented.setter
+    def instrumented(self, instrumented):
+        _pipeline.f90wrap_build_info__set__instrumented(instrumented)
+    
+    def get_instrumented(self):
+        return self.instrumented
+    
+    def set_instrumented(self, value):
+        self.instrumented = value
+    
+    def __str__(self):
+        ret = ['<build_info>{\n']
+        ret.append('    build_profile : ')
+        ret.append(repr(self.build_profile))
+        ret.append(',\n    instrumented : ')
+        ret.append(repr(self.instrumented))
+        ret.append('}')
+        return ''.join(ret)
+    
+    _dt_array_initialisers = []
+    
+
+build_info = Build_Info()
+
@@ -1,8 +1,76 @@
 module model_state
+    use, intrinsic :: iso_c_binding, only: c_int
     implicit none
 
+    ! Number of fields in ModelState. Matches the rows of the run_rows_trace trace buffer
+    integer, parameter :: N_MODEL_STATE = 2
+
     TYPE :: ModelState
-        REAL :: hr
+        REAL :: hr  ! Hour of day [0-23]
+        REAL :: td  ! Thermal time [degC days]
     end type ModelState
 
-end module model_state
\ No newline at end of file
+    ! Structure of arrays ModelState with one element per grid cell
+    TYPE :: ModelStateArrays
+        REAL, allocatable :: hr(:)  ! Hour of day [0-23]
+        REAL, allocatable :: td(:)  ! Thermal time [degC days]
+    end type ModelStateArrays
+
+    ! Pointer wrapper with the layout of an f90wrap handle
+    private :: ModelStatePtr
+    TYPE :: ModelStatePtr
+        TYPE(ModelState), pointer :: p => NULL()
+    end type ModelStatePtr
+
+contains
+
+    pure subroutine pack_model_state(state, values)
+        TYPE(ModelState), intent(in) :: state
+        REAL, intent(out) :: values(N_MODEL_STATE)
+        values(1) = state%hr
+        values(2) = state%td
+    end subroutine pack_model_state
+
+    pure function unpack_model_state(values) result(state)
+        REAL, intent(in) :: values(N_MODEL_STATE)
+        TYPE(ModelState) :: state
+        state%hr = values(1)
+        state%td = values(2)
+    end function unpack_model_state
+
+    ! Pack the ModelState behind each f90wrap handle into a column of values
+    subroutine pack_model_state_handles(handles, values)
+        integer(c_int), intent(in) :: handles(:, :)
+        REAL, intent(inout) :: values(:, :)
+        TYPE(ModelStatePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            call pack_model_state(ptr%p, values(:, i))
+        end do
+    end subroutine pack_model_state_handles
+
+    ! Overwrite the ModelState behind each f90wrap handle with a column of values
+    subroutine unpack_model_state_handles(values, handles)
+        REAL, intent(in) :: values(:, :)
+        integer(c_int), intent(in) :: handles(:, :)
+        TYPE(ModelStatePtr) :: ptr
+        integer :: i
+
+        do i = 1, size(handles, 2)
+            ptr = transfer(handles(:, i), ptr)
+            ptr%p = unpack_model_state(values(:, i))
+        end do
+    end subroutine unpack_model_state_handles
+
+    subroutine allocate_model_state_arrays(states, n_cells)
+        TYPE(ModelStateArrays), intent(inout) :: states
+        integer, intent(in) :: n_cells
+        if (allocated(states%hr)) deallocate(states%hr, states%td)
+        allocate(states%hr(n_cells), states%td(n_cells))
+        states%hr = 0.0
+        states%td = 0.0
+    end subroutine allocate_model_state_arrays
+
+end module model_state
@@ -1,29 +1,94 @@
 module pipeline
-    ! use model_state
-    ! use config
-    ! use external_state
+    use model_state, only: ModelState, ModelStateArrays, N_MODEL_STATE, pack_model_state
+    use external_state, only: ExternalStateShape, ExternalStateArrays, N_EXTERNAL_STATE, &
+        unpack_external_state
     implicit none
 
-    ! public :: run_rows
+    private
+    public :: run_rows
+    public :: run_rows_trace
+    public :: run_rows_cells
     public :: hello
     contains
-    ! pure TYPE(ModelState) Function run_rows(initial_state, config,external_state, start_day, end_day) result(final_state)
 
-    !     TYPE(ModelState), intent(in):: initial_state
-    !     TYPE(ConfigShape), intent(in):: config
-    !     TYPE(ExternalStateShape), intent(in):: external_state
-    !     INTEGER, intent(in):: start_day
-    !     INTEGER, intent(in):: end_day
+    elemental function next_hr(hr)
+        REAL, intent(in) :: hr
+        REAL :: next_hr
+        next_hr = mod(hr + 1.0, 24.0)
+    end function next_hr
 
-    !     final_state = initial_state
-    ! end function
+    ! Placeholder thermal time step so a row has state to carry, not the DO3SE
+    ! thermal time model. Hours below 0 degC add nothing rather than reducing td.
+    elemental function next_td(td, TsC)
+        REAL, intent(in) :: td
+        REAL, intent(in) :: TsC
+        REAL :: next_td
+        next_td = td + max(TsC, 0.0) / 24.0
+    end function next_td
 
-!     pure TYPE(ModelState) Function run_rows(initial_state) result(final_state)
+    ! Advance the model state by one hourly row
+    pure function run_row(state, external_state) result(next_state)
+        TYPE(ModelState), intent(in) :: state
+        TYPE(ExternalStateShape), intent(in) :: external_state
+        TYPE(ModelState) :: next_state
 
-!         TYPE(ModelState), intent(in):: initial_state
+        next_state%hr = next_hr(state%hr)
+        next_state%td = next_td(state%td, external_state%TsC)
+    end function run_row
+
+    ! Run every row of the packed external state and return the final model state.
+    !
+    ! external_state is (N_EXTERNAL_STATE, n_rows) with one column per hourly row in the
+    ! field order of ExternalStateShape, so the rows are read without leaving Fortran.
+    subroutine run_rows(initial_state, external_state, final_state)
+        TYPE(ModelState), intent(in) :: initial_state
+        REAL, intent(in) :: external_state(:, :)
+        TYPE(ModelState), intent(out) :: final_state
+        integer :: row
+
+        final_state = initial_state
+        do row = 1, size(external_state, 2)
+            final_state = run_row(final_state, unpack_external_state(external_state(:, row)))
+        end do
+    end subroutine run_rows
+
+    ! As run_rows but also writes the model state after each row into trace.
+    !
+    ! trace is (N_MODEL_STATE, n_rows) or wider in the field order of ModelState. It is
+    ! passed in so the same buffer can be reused between runs. Any other shape raises a
+    ! RuntimeError through f90wrap_abort before anything is written.
+    subroutine run_rows_trace(initial_state, external_state, final_state, trace)
+        TYPE(ModelState), intent(in) :: initial_state
+        REAL, intent(in) :: external_state(:, :)
+        TYPE(ModelState), intent(out) :: final_state
+        REAL, intent(inout) :: trace(:, :)
+        integer :: row
+
+        if (size(trace, 1) /= N_MODEL_STATE .or. size(trace, 2) < size(external_state, 2)) then
+            call f90wrap_abort("run_rows_trace: trace must be (N_MODEL_STATE, n_rows)")
+        end if
+        final_state = initial_state
+        do row = 1, size(external_state, 2)
+            final_state = run_row(final_state, unpack_external_state(external_state(:, row)))
+            call pack_model_state(final_state, trace(:, row))
+        end do
+    end subroutine run_rows_trace
+
+    ! Advance every grid cell of states in place through every row of external_states.
+    !
+    ! Each row updates whole field arrays so the cells are read with unit stride.
+    ! external_states%TsC must be (n_cells, n_rows) with the n_cells of states.
+    subroutine run_rows_cells(states, external_states)
+        TYPE(ModelStateArrays), intent(inout) :: states
+        TYPE(ExternalStateArrays), intent(in) :: external_states
+        integer :: row
+
+        do row = 1, size(external_states%TsC, 2)
+            states%hr = next_hr(states%hr)
+            states%td = next_td(states%td, external_states%TsC(:, row))
+        end do
+    end subroutine run_rows_cells
 
-!         final_state = initial_state
-! end function
     function hello(val_in) result(outval)
         REAL, intent(in):: val_in
         REAL :: outval